@@ -1,19 +1,28 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, UploadFile, File, Form, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import logging
 from app.service.anthropic import AnthropicService
 from app.service.pht import PHT
-from app.service.audio_transcription import WhisperHandler, TranscriptionMode
+from app.service.audio_dsp import encode_wav, load_audio
+from app.service.audio_transcription import TranscriptionMode
+from app.service.long_audio import NoUsableSpeech, join_entries, split_at_silence, translate_chunks
+from app.service.metrics import Stage, count_request, timed
+from app.service.task_supervisor import task_supervisor
+from app.service.transcript_filter import transcript_filter
+from app.service.transcription_scheduler import get_scheduler, scheduler_stats
+from app.service.translation_jobs import Job, JobManager, JobQueueFull, JobTooLarge
+from app.api.session_registry import session_registry
+from app.api.stream_session import AudioStreamSession, get_hardcoded_gender
+from app.config import ADMIN_API_TOKEN, TRANSLATION_MAX_TARGETS
 import io
+import json
 from urllib.parse import quote
 import asyncio
-import numpy as np
+import secrets
+import time
 from collections import deque
-import json
-import wave
-import re
 
 # Create logger for this module
 logger = logging.getLogger(__name__)
@@ -21,71 +30,23 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1")
 anthropic_service = AnthropicService()
 
-# Create a connection manager for WebSockets
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"WebSocket connected. Active connections: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            logger.info(f"WebSocket disconnected. Active connections: {len(self.active_connections)}")
-
-manager = ConnectionManager()
-
-# Voice Activity Detection helper class
-class SimpleVAD:
-    def __init__(self, sample_rate=16000, frame_duration_ms=30, threshold=0.01):
-        self.sample_rate = sample_rate
-        self.frame_duration_ms = frame_duration_ms
-        self.threshold = threshold
-        self.frame_size = int(sample_rate * frame_duration_ms / 1000)
-        # Number of frames of silence to consider speech segment complete
-        self.silence_frames_threshold = 2  # Roughly 450ms of silence
-
-    def is_speech(self, audio_data):
-        """Simple energy-based VAD"""
-        try:
-            # Make sure we have valid data
-            if not audio_data or len(audio_data) < 2:
-                logger.debug("Received empty or too small audio chunk")
-                return False
-                
-            # Get the buffer length and ensure it's a multiple of 2 (for int16)
-            buffer_length = len(audio_data)
-            if buffer_length % 2 != 0:
-                # If we have an odd number of bytes, trim the last byte
-                logger.debug(f"Trimming audio buffer from {buffer_length} to {buffer_length - 1} bytes")
-                audio_data = audio_data[:-1]
-                buffer_length -= 1
-                
-            if buffer_length == 0:
-                return False
-                
-            # Convert audio bytes to numpy array (assuming 16-bit PCM)
-            audio_array = np.frombuffer(audio_data, dtype=np.int16)
-            
-            # Calculate energy
-            energy = np.mean(np.abs(audio_array)) / 32768.0  # Normalize by max int16 value
-            
-            # Log energy level for debugging
-            if energy > self.threshold:
-                logger.debug(f"Speech detected - Energy level: {energy:.4f}")
-            
-            return energy > self.threshold
-        except Exception as e:
-            logger.error(f"Error in VAD processing: {str(e)}", exc_info=True)
-            return False
+async def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    if ADMIN_API_TOKEN and not secrets.compare_digest(x_admin_token or "", ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
 class TranslationRequest(BaseModel):
     text: str
     source_language: Optional[str] = None
     target_language: Optional[str] = None
+    target_locale: Optional[str] = None
+
+class TranslationTarget(BaseModel):
+    language: str
+    locale: Optional[str] = None
+
+class MultiTargetTranslationRequest(BaseModel):
+    text: str
+    targets: List[TranslationTarget]
 
 class TranslationResponse(BaseModel):
     translated_text: str
@@ -94,6 +55,9 @@ class TranslationResponse(BaseModel):
     transcribed_text: str
     audio_url: Optional[str] = None
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 class AudioTranslationRequest(BaseModel):
     audio_data: bytes
     detect_language: bool = False
@@ -101,7 +65,9 @@ class AudioTranslationRequest(BaseModel):
 @router.post("/translate/text", response_model=TranslationResponse)
 async def translate_text(request: TranslationRequest):
     try:
-        translation = await anthropic_service.get_response(user_input=request.text)
+        translation = await anthropic_service.get_response(
+            user_input=request.text, language=request.target_language, locale=request.target_locale
+        )
         return TranslationResponse(
             translated_text=translation,
             original_text=request.text,
@@ -110,47 +76,133 @@ async def translate_text(request: TranslationRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/translate/text/stream")
+async def translate_text_stream(request: TranslationRequest, http_request: Request):
+    """Server-sent "delta" events as the translation is generated, then "done" with model, cache and latency metadata"""
+    received = time.perf_counter()
+
+    async def events():
+        stream = anthropic_service.stream_response(
+            user_input=request.text, language=request.target_language, locale=request.target_locale
+        )
+        try:
+            async for event in stream:
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected, cancelling translation stream")
+                    return
+                if event["type"] == "delta":
+                    yield sse_event("delta", {"text": event["text"]})
+                else:
+                    event["latency_ms"]["request"] = round((time.perf_counter() - received) * 1000, 1)
+                    yield sse_event("done", {key: value for key, value in event.items() if key != "type"})
+        except Exception as e:
+            logger.error(f"Error in translate_text_stream: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            # Closes the upstream stream, so generation stops when nobody is listening
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/translate/text/targets")
+async def translate_text_targets(request: MultiTargetTranslationRequest):
+    """Translate into every target concurrently: a server-sent "translation" event per target as it finishes, then done"""
+    if not 1 <= len(request.targets) <= TRANSLATION_MAX_TARGETS:
+        raise HTTPException(status_code=422, detail=f"Between 1 and {TRANSLATION_MAX_TARGETS} targets are supported")
+    received = time.perf_counter()
+    targets = [target.model_dump() for target in request.targets]
+
+    async def events():
+        translations = anthropic_service.translate_many(request.text, targets)
+        failed = 0
+        try:
+            async for translation in translations:
+                failed += not translation["translated_text"]
+                yield sse_event("translation", translation)
+            yield sse_event("done", {
+                "targets": len(targets),
+                "failed": failed,
+                "latency_ms": round((time.perf_counter() - received) * 1000, 1),
+            })
+        finally:
+            # Cancels the targets still running if the client went away
+            await translations.aclose()
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/translate/audio")
 async def translate_audio(
     audio_data: UploadFile = File(...),
     return_audio: bool = True,
     gender: Optional[str] = Form(None),
-    language: Optional[str] = Form(None)
+    language: Optional[str] = Form(None),
+    long_audio: bool = False
 ):
     
+    outcome = "ok"
     try:
         # Read uploaded file as bytes
         voice_data = await audio_data.read()
+        if long_audio:
+            # Chunked mode answers with the timestamped segments; stitched audio is served by the jobs API
+            try:
+                result, _ = await translate_long_recording(voice_data, {"gender": gender, "language": language})
+            except NoUsableSpeech as e:
+                logger.info("Ignoring long recording (%s): %s", e.reason, e)
+                outcome = "filtered"
+                return JSONResponse(status_code=422, content={"detail": str(e), "reason": e.reason})
+            return JSONResponse(content=result)
+
         pht_client = PHT()
         
-        # Helper function to return hardcoded gender
-        async def get_hardcoded_gender(gender_value):
-            """Simple async function to return the provided gender value"""
-            return gender_value
-        
         # Transcribe the audio
-        handler = WhisperHandler(TranscriptionMode.HF.value, model_name="large")
+        scheduler = get_scheduler(TranscriptionMode.HF.value, model_name="large")
         
         # Use provided gender if available, otherwise detect gender
         if gender:
-            logger.info(f"Using provided gender: {gender}")
+            logger.info("Using provided gender: %s", gender)
             gender_task = asyncio.create_task(get_hardcoded_gender(gender))
         else:
             logger.info("Detecting gender from audio")
-            gender_task = asyncio.create_task(pht_client.detect_gender(bytearray(voice_data)))
+            gender_task = asyncio.create_task(
+                timed(pht_client.detect_gender(bytearray(voice_data)), "rest_audio", "gender")
+            )
             
-        transcribed_text = await handler.transcribe_voice(voice_data)
-        logger.info(f"Transcribed text: {transcribed_text}")
+        with Stage("rest_audio", "transcribe", mode=TranscriptionMode.HF.value, model="large") as timer:
+            transcribed_text = await scheduler.transcribe_voice(voice_data)
+            if not transcribed_text:
+                timer.outcome = "empty"
+        logger.info("Transcribed text: %s", transcribed_text)
         
         if not transcribed_text:
             logger.warning("Empty transcription")
+            outcome = "empty_transcription"
             raise HTTPException(status_code=400, detail="Could not transcribe the audio")
         
+        # Don't pay for translation and TTS of ASR repetition loops; a lone "Gracias" upload is a real message
+        reason = transcript_filter.check(transcribed_text, filler_phrases=False)
+        if reason:
+            gender_task.cancel()
+            logger.info("Ignoring transcription (%s): '%s'", reason, transcribed_text)
+            outcome = "filtered"
+            return JSONResponse(
+                status_code=422,
+                content={"detail": "No usable speech in the audio", "reason": reason, "transcribed_text": transcribed_text}
+            )
+        
         # Translate the transcribed text
-        translation = await anthropic_service.get_response(user_input=transcribed_text)
+        with Stage("rest_audio", "translate", model="anthropic") as timer:
+            translation = await anthropic_service.get_response(user_input=transcribed_text)
+            if not translation:
+                timer.outcome = "empty"
         
         if not translation:
             logger.warning("Empty translation from Anthropic")
+            outcome = "empty_translation"
             raise HTTPException(status_code=500, detail="Could not get translation")
         
         # Set up response data
@@ -165,7 +217,8 @@ async def translate_audio(
             
             try:
                 logger.info("Starting TTS generation")
-                tts_response = await pht_client.text_to_speech(voice_data, translation, gender_task, language)
+                with Stage("rest_audio", "tts", model="playht"):
+                    tts_response = await pht_client.text_to_speech(voice_data, translation, gender_task, language)
                 logger.info("TTS generation successful")
                 
                 # Return audio with text metadata in headers
@@ -184,6 +237,7 @@ async def translate_audio(
                 
             except Exception as e:
                 logger.error(f"TTS generation failed: {str(e)}")
+                outcome = "tts_error"
                 # Fall back to JSON response if TTS fails
                 return JSONResponse(
                     content=result,
@@ -195,302 +249,205 @@ async def translate_audio(
         return JSONResponse(content=result)
             
     except Exception as e:
+        if outcome == "ok":
+            outcome = "error"
         logger.error(f"Error in translate_audio: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+    finally:
+        count_request("rest_audio", outcome)
+
+async def translate_long_recording(voice_data: bytes, params: dict, report=None):
+    """Long-audio mode: translate silence-delimited chunks in parallel; returns the result and stitched TTS audio"""
+    samples = await load_audio(voice_data)
+    chunks = await asyncio.to_thread(split_at_silence, samples)
+    if not chunks:
+        raise NoUsableSpeech("No speech detected in the audio", "no_speech")
+    logger.info("Split recording into %s chunks, last ending at %.0fs", len(chunks), chunks[-1].end)
+
+    scheduler = get_scheduler(TranscriptionMode.HF.value, model_name="large")
+    pht_client = PHT()
+    gender_task = None
+    synthesize = None
+    if params.get("return_audio"):
+        if params.get("gender"):
+            gender_task = asyncio.create_task(get_hardcoded_gender(params["gender"]))
+        else:
+            gender_task = asyncio.create_task(pht_client.detect_gender(bytearray(encode_wav(chunks[0].samples))))
+
+        async def synthesize(text: str) -> bytes:
+            return bytes(await pht_client.text_to_speech(bytearray(), text, gender_task, params.get("language")))
+
+    async def transcribe(chunk) -> str:
+        transcription = await scheduler.transcribe(encode_wav(chunk.samples), samples=chunk.samples)
+        return transcription.text
+
+    def on_chunk(done: int, total: int):
+        if report is not None:
+            report("translating", 0.1 + 0.85 * done / total)
+
+    try:
+        entries = await translate_chunks(
+            chunks,
+            transcribe,
+            lambda text: anthropic_service.get_response(user_input=text),
+            synthesize,
+            accept=lambda text: transcript_filter.check(text, filler_phrases=False),
+            on_chunk=on_chunk,
+        )
+    finally:
+        if gender_task is not None:
+            gender_task.cancel()
+    result = join_entries(entries)
+    if not result["translated_text"]:
+        skipped = [entry["skipped"] for entry in entries if "skipped" in entry]
+        if len(skipped) == len(entries):
+            raise NoUsableSpeech("No usable speech in the audio", skipped[0])
+        # Chunks with speech failed: an upstream error, not bad input
+        errors = [entry["error"] for entry in entries if "error" in entry]
+        raise RuntimeError(errors[0] if errors else "Could not get translation")
+    return result, result.pop("audio")
+
+async def process_audio_job(job: Job, voice_data: bytes, report):
+    """translate_audio for a queued job: returns the result and the TTS audio (if requested)"""
+    params = job.params
+    if params.get("long_audio"):
+        return await translate_long_recording(voice_data, params, report)
+
+    pht_client = PHT()
+    if params.get("gender"):
+        gender_task = asyncio.create_task(get_hardcoded_gender(params["gender"]))
+    else:
+        gender_task = asyncio.create_task(pht_client.detect_gender(bytearray(voice_data)))
+
+    try:
+        report("transcribing", 0.1)
+        scheduler = get_scheduler(TranscriptionMode.HF.value, model_name="large")
+        transcribed_text = await scheduler.transcribe_voice(voice_data)
+        if not transcribed_text:
+            raise ValueError("Could not transcribe the audio")
+        reason = transcript_filter.check(transcribed_text, filler_phrases=False)
+        if reason:
+            raise ValueError(f"No usable speech in the audio ({reason})")
+
+        report("translating", 0.5)
+        translation = await anthropic_service.get_response(user_input=transcribed_text)
+        if not translation:
+            raise ValueError("Could not get translation")
+        result = {"transcribed_text": transcribed_text, "translated_text": translation}
+        if not params.get("return_audio", True):
+            return result, None
+
+        report("synthesizing", 0.7)
+        try:
+            tts_response = await pht_client.text_to_speech(voice_data, translation, gender_task, params.get("language"))
+            return result, bytes(tts_response)
+        except Exception as e:
+            logger.error(f"TTS generation failed for job {job.id}: {str(e)}")
+            result["tts_error"] = str(e)
+            return result, None
+    finally:
+        gender_task.cancel()
+
+job_manager = JobManager(process_audio_job)
+
+def job_response(job: Job) -> dict:
+    response = job.snapshot()
+    response["status_url"] = f"{router.prefix}/jobs/{job.id}"
+    response["events_url"] = f"{router.prefix}/jobs/{job.id}/events"
+    if job.has_audio:
+        response["audio_url"] = f"{router.prefix}/jobs/{job.id}/audio"
+    return response
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+@router.post("/translate/audio/jobs", status_code=202)
+async def create_translation_job(
+    audio_data: UploadFile = File(...),
+    return_audio: bool = True,
+    gender: Optional[str] = Form(None),
+    language: Optional[str] = Form(None),
+    long_audio: bool = False
+):
+    """Queue a long recording; poll /jobs/{id} or follow /jobs/{id}/events for the result"""
+    async def chunks():
+        while chunk := await audio_data.read(1024 * 1024):
+            yield chunk
+
+    params = {"return_audio": return_audio, "gender": gender, "language": language, "long_audio": long_audio}
+    try:
+        job = await job_manager.submit(chunks(), params)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    except JobTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return job_response(job)
+
+@router.get("/jobs/{job_id}")
+async def get_translation_job(job_id: str):
+    return job_response(get_job_or_404(job_id))
+
+@router.get("/jobs/{job_id}/audio")
+async def get_translation_job_audio(job_id: str):
+    audio_path = job_manager.audio_path(get_job_or_404(job_id))
+    if audio_path is None:
+        raise HTTPException(status_code=404, detail="Job has no audio")
+    return FileResponse(audio_path, media_type="audio/mp3")
+
+@router.get("/jobs/{job_id}/events")
+async def translation_job_events(job_id: str):
+    """Server-sent events with the job's state on every change, ending when it is done or failed"""
+    get_job_or_404(job_id)
+
+    async def events():
+        async for snapshot in job_manager.watch(job_id):
+            if snapshot is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_event(snapshot["status"], snapshot)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@router.get("/jobs")
+async def translation_job_stats():
+    """Job counts by status and the worker pool size"""
+    return job_manager.stats()
+
+@router.get("/transcription/stats")
+async def transcription_stats():
+    """Batch size distribution and queueing delay per transcription scheduler"""
+    return scheduler_stats()
 
 @router.websocket("/ws/stream-audio")
 async def websocket_audio_stream(websocket: WebSocket):
     logger.info("WebSocket connection attempt received")
-    await manager.connect(websocket)
-    vad = SimpleVAD(frame_duration_ms=500, threshold=0.0125)  # Lower threshold for better sensitivity
-    
-    # Buffer for collecting audio chunks
-    audio_buffer = b""
-    speech_chunks = []
-    silence_frames = 0
-    is_speech_active = False
-    
-    # TEMPORARY: Hardcoded testing mode to limit API calls
-    testing_mode = False # Set to True to process only one segment per connection
-    processed_segment = False
-    
-    # Variable to store gender if provided
-    provided_gender = None
-    provided_language = None
-    
+    session = AudioStreamSession(websocket, anthropic_service)
+    if not session_registry.admit(session):
+        # 1013: try again later. Accept first: a close before the handshake is sent as HTTP 403,
+        # and the client would never see the code or the reason.
+        await websocket.accept()
+        await websocket.close(code=1013, reason="server busy")
+        return
+    await websocket.accept()
     try:
-        logger.info("WebSocket connection established for audio streaming")
-        await websocket.send_json({"type": "connection_status", "status": "connected"})
-        
-        # Wait for initial config message that might contain gender or language
-        try:
-            init_data = await asyncio.wait_for(websocket.receive_json(), timeout=2.0)
-            if 'gender' in init_data:
-                provided_gender = init_data['gender']
-                logger.info(f"Received gender parameter: {provided_gender}")
-                await websocket.send_json({
-                    "type": "status",
-                    "message": f"Using provided gender: {provided_gender}"
-                })
-            
-            if 'language' in init_data:
-                provided_language = init_data['language']
-                logger.info(f"Received language parameter: {provided_language}")
-                await websocket.send_json({
-                    "type": "status",
-                    "message": f"Using provided language: {provided_language}"
-                })
-        except (asyncio.TimeoutError, ValueError, TypeError):
-            # Continue without parameters if timeout or invalid message
-            logger.info("No initial parameters received, will use detection")
-            
-        async def get_hardcoded_gender(gender_value):
-            """Simple async function to return the provided gender value"""
-            return gender_value
-        
-        while True:
-            # Receive message from client - handle both text and binary messages
-            message = await websocket.receive()
-            
-            # Check message type
-            if "bytes" in message:
-                # Process binary audio data
-                audio_chunk = message["bytes"]
-                
-                # Log the size of received chunks for debugging
-                logger.debug(f"Received audio chunk of size: {len(audio_chunk)} bytes")
-                
-                # Check if this frame contains speech
-                frame_has_speech = vad.is_speech(audio_chunk)
-                
-                if frame_has_speech:
-                    silence_frames = 0
-                    if not is_speech_active:
-                        is_speech_active = True
-                        logger.debug("Speech detected, starting to collect audio")
-                    
-                    # Add chunk to the current speech segment
-                    speech_chunks.append(audio_chunk)
-                else:
-                    # No speech detected in this frame
-                    if is_speech_active:
-                        silence_frames += 1
-                        
-                        # Still add the silence to the current speech segment (for natural pauses)
-                        if silence_frames < vad.silence_frames_threshold:
-                            speech_chunks.append(audio_chunk)
-                        
-                        # If enough silent frames detected, consider this speech segment complete
-                        if silence_frames >= vad.silence_frames_threshold and speech_chunks:
-                            logger.debug(f"Speech segment complete, processing {len(speech_chunks)} chunks")
-                            
-                            # Process the complete speech segment
-                            complete_audio = b"".join(speech_chunks)
-                            
-                            # Only process if we have enough audio data (to avoid processing very short noises)
-                            if len(complete_audio) > 10000:  # Arbitrary threshold
-                                try:
-                                    # Send status update to client
-                                    await websocket.send_json({
-                                        "type": "status",
-                                        "message": "Processing speech segment..."
-                                    })
-                                    
-                                    # Convert raw PCM data to WAV format
-                                    # Create a BytesIO buffer for the WAV file
-                                    wav_buffer = io.BytesIO()
-                                    
-                                    # Create WAV file with the correct parameters
-                                    with wave.open(wav_buffer, 'wb') as wav_file:
-                                        wav_file.setnchannels(1)  # Mono
-                                        wav_file.setsampwidth(2)  # 2 bytes for int16
-                                        wav_file.setframerate(16000)  # Sample rate
-                                        wav_file.writeframes(complete_audio)
-                                    
-                                    # Reset buffer position
-                                    wav_buffer.seek(0)
-                                    wav_data = wav_buffer.read()
-                                    
-                                    # Initialize PHT client
-                                    pht_client = PHT()
-                                    
-                                    # Use provided gender if available, otherwise detect gender
-                                    if provided_gender:
-                                        gender_task = asyncio.create_task(get_hardcoded_gender(provided_gender))
-                                        logger.info(f"Using provided gender: {provided_gender}")
-                                    else:
-                                        gender_task = asyncio.create_task(pht_client.detect_gender(bytearray(wav_data)))
-                                        logger.info("Detecting gender from audio")
-                                    
-                                    # Check and normalize the audio format
-                                    if wav_data.startswith(b'RIFF'):
-                                        logger.info("Detected WAV format audio data from client")
-                                        # WAV format - keep as is, the transcription service can handle it
-                                        audio_data = bytearray(wav_data)
-                                    else:
-                                        logger.info("Detected raw PCM format audio data from client")
-                                        # Convert raw PCM to a format the transcription service can handle
-                                        audio_data = await convert_pcm_to_audio_format(bytearray(wav_data))
-                                    
-                                    # Send the normalized audio to the transcription service
-                                    handler = WhisperHandler(TranscriptionMode.HF.value, model_name="large")
-                                    
-                                    transcribed_text = await handler.transcribe_voice(audio_data)
-                                    
-                                    if transcribed_text:
-                                        logger.info(f"Transcribed speech segment: {transcribed_text}")
-                                        
-                                        # Clean text more thoroughly - strip ALL non-alphanumeric characters
-                                        cleaned_text = re.sub(r'[^a-zA-Z\s]', '', transcribed_text.lower()).strip()
-                                        words = cleaned_text.split()
-                                        
-                                        # List of common short phrases we want to FILTER OUT
-                                        common_phrases = ["thank you", "gracias"]
-                                        
-                                        # Check if it's a common phrase we want to ignore
-                                        is_common_phrase = any(re.search(r'\b' + re.escape(phrase) + r'\b', cleaned_text) for phrase in common_phrases)
-                                        
-                                        # Check for highly repetitive content
-                                        is_repetitive = False
-                                        if len(words) >= 10:  # Only check longer transcriptions
-                                            # Count unique words
-                                            unique_words = set(words)
-                                            # Calculate ratio of unique words to total words
-                                            uniqueness_ratio = len(unique_words) / len(words)
-                                            
-                                            # If less than 20% of words are unique, consider it repetitive
-                                            if uniqueness_ratio < 0.2:
-                                                is_repetitive = True
-                                                logger.info(f"Detected repetitive content with uniqueness ratio: {uniqueness_ratio:.2f}")
-                                        
-                                        if len(words) <= 1 or is_common_phrase or is_repetitive:
-                                            logger.info(f"Ignoring transcription: '{transcribed_text}', cleaned: '{cleaned_text}'")
-                                            await websocket.send_json({
-                                                "type": "status",
-                                                "message": "Ignored transcription (single word, filtered phrase, or repetitive content)"
-                                            })
-                                            # Reset for the next speech segment
-                                            speech_chunks = []
-                                            is_speech_active = False
-                                            # Skip further processing
-                                            continue
-                                        
-                                        # Translate the transcribed text
-                                        translation = await anthropic_service.get_response(user_input=transcribed_text)
-                                        
-                                        # Send the results back to the client
-                                        await websocket.send_json({
-                                            "type": "transcription",
-                                            "transcribed_text": transcribed_text,
-                                            "translated_text": translation
-                                        })
-                                        
-                                        # Optionally generate TTS for the translation
-                                        try:
-                                            # Use the WAV-formatted audio data instead of the raw PCM data
-                                            tts_response = await pht_client.text_to_speech(bytearray(wav_data), translation, gender_task, provided_language)
-                                            
-                                            # Send the audio back to the client
-                                            await websocket.send_bytes(bytes(tts_response))
-                                            await websocket.send_json({"type": "audio_complete"})
-                                        except Exception as e:
-                                            logger.error(f"TTS generation failed: {str(e)}")
-                                            await websocket.send_json({
-                                                "type": "error",
-                                                "message": f"TTS generation failed: {str(e)}"
-                                            })
-                                    else:
-                                        logger.warning("Empty transcription returned")
-                                        await websocket.send_json({
-                                            "type": "status",
-                                            "message": "No speech detected in the audio segment"
-                                        })
-                                    
-                                    # TEMPORARY: Mark segment as processed in testing mode
-                                    if testing_mode:
-                                        processed_segment = True
-                                        await websocket.send_json({
-                                            "type": "status", 
-                                            "message": "Testing mode: One segment processed. Restart connection for more."
-                                        })
-                                except Exception as e:
-                                    logger.error(f"Error processing speech segment: {str(e)}", exc_info=True)
-                                    await websocket.send_json({
-                                        "type": "error",
-                                        "message": f"Error processing speech: {str(e)}"
-                                    })
-                            else:
-                                logger.debug(f"Audio segment too short ({len(complete_audio)} bytes), ignoring")
-                            
-                            # Reset for the next speech segment
-                            speech_chunks = []
-                            is_speech_active = False
-            elif "text" in message:
-                # Process text message (JSON config)
-                try:
-                    data = json.loads(message["text"])
-                    logger.info(f"Received JSON config: {data}")
-                    
-                    # Update gender if provided
-                    if "gender" in data:
-                        provided_gender = data["gender"]
-                        logger.info(f"Updated gender parameter: {provided_gender}")
-                        await websocket.send_json({
-                            "type": "status",
-                            "message": f"Updated gender to: {provided_gender}"
-                        })
-                    
-                    # Update language if provided
-                    if "language" in data:
-                        provided_language = data["language"]
-                        logger.info(f"Updated language parameter: {provided_language}")
-                        await websocket.send_json({
-                            "type": "status",
-                            "message": f"Updated language to: {provided_language}"
-                        })
-                    
-                except json.JSONDecodeError:
-                    logger.error("Received invalid JSON message")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Invalid configuration format"
-                    })
-            else:
-                logger.warning(f"Received unknown message type: {message}")
+        logger.info("WebSocket connection established for audio streaming (session %s)", session.id)
+        await session.run()
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
-        manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"Error in WebSocket connection: {str(e)}", exc_info=True)
-        manager.disconnect(websocket)
+    finally:
+        session_registry.remove(session)
 
-async def convert_pcm_to_audio_format(pcm_data: bytearray) -> bytearray:
-    """Convert raw PCM audio data to WAV format."""
-    logger.info(f"Converting {len(pcm_data)} bytes of PCM data to WAV format")
-    try:
-        # Process the PCM data asynchronously to avoid blocking
-        return await asyncio.to_thread(_create_wav_from_pcm, pcm_data)
-    except Exception as e:
-        logger.error(f"Error converting PCM to WAV: {str(e)}", exc_info=True)
-        # Return the original data if conversion fails
-        return pcm_data
-
-def _create_wav_from_pcm(pcm_data: bytearray) -> bytearray:
-    """Create a WAV file from PCM data (synchronous function)."""
-    # Assume 16-bit mono PCM at 16kHz (adjust parameters if your audio differs)
-    sample_rate = 16000
-    channels = 1
-    sample_width = 2  # 16-bit
-
-    import wave
-    import io
-    
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wav_file:
-        wav_file.setnchannels(channels)
-        wav_file.setsampwidth(sample_width)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_data)
-    
-    return bytearray(wav_buffer.getvalue())
+@router.get("/admin/sessions", dependencies=[Depends(require_admin_token)])
+async def stream_sessions():
+    """Live WebSocket sessions and lifetime totals"""
+    return session_registry.stats()
 
+@router.get("/admin/tasks", dependencies=[Depends(require_admin_token)])
+async def background_tasks():
+    """Background tasks by name with the age of the oldest, and lifetime totals"""
+    return task_supervisor.stats()
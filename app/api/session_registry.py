@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Dict
+
+from app.api.stream_session import AudioStreamSession
+from app.config import STREAM_MAX_SESSIONS
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRegistry:
+    """Live /ws/stream-audio sessions keyed by session id.
+
+    admit() refuses connections beyond max_sessions and while draining.
+    Counters of closed sessions are folded into the totals, so stats() covers
+    the whole process lifetime.
+    """
+
+    def __init__(self, max_sessions: int = STREAM_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.draining = False
+        self.rejected = 0
+        self._sessions: Dict[str, AudioStreamSession] = {}
+        self._closed_totals = {"sessions": 0, "bytes_in": 0, "bytes_out": 0, "segments": 0, "dropped": 0}
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def admit(self, session: AudioStreamSession) -> bool:
+        if self.draining or len(self._sessions) >= self.max_sessions:
+            self.rejected += 1
+            logger.warning(f"Refusing stream session: {len(self._sessions)} active, draining: {self.draining}")
+            return False
+        self._sessions[session.id] = session
+        logger.info(f"Stream session {session.id} registered. Active sessions: {len(self._sessions)}")
+        return True
+
+    def remove(self, session: AudioStreamSession):
+        if self._sessions.pop(session.id, None) is None:
+            return
+        self._closed_totals["sessions"] += 1
+        for key in ("bytes_in", "bytes_out", "segments", "dropped"):
+            self._closed_totals[key] += getattr(session, key)
+        logger.info(f"Stream session {session.id} removed. Active sessions: {len(self._sessions)}")
+
+    async def drain(self, timeout: float):
+        """Refuse new sessions and let every live one finish its in-flight segments (up to timeout)."""
+        self.draining = True
+        if not self._sessions:
+            return
+        logger.info(f"Draining {len(self._sessions)} stream sessions")
+        await asyncio.gather(
+            *(session.drain(timeout) for session in list(self._sessions.values())), return_exceptions=True
+        )
+
+    def stats(self) -> dict:
+        sessions = [session.stats() for session in self._sessions.values()]
+        totals = dict(self._closed_totals)
+        totals["sessions"] += len(sessions)
+        for key in ("bytes_in", "bytes_out", "segments", "dropped"):
+            totals[key] += sum(session[key] for session in sessions)
+        return {
+            "active": len(sessions),
+            "max_sessions": self.max_sessions,
+            "draining": self.draining,
+            "rejected": self.rejected,
+            "in_flight": sum(session["in_flight"] for session in sessions),
+            "totals": totals,
+            "sessions": sessions,
+        }
+
+
+session_registry = SessionRegistry()
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import STATIC_ASSETS_DIR, STATIC_COMPRESS_MIN_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+INDEX = "index.html"
+# Angular puts a content hash in bundle names (main.1a2b3c4d5e6f7a8b.js, chunk-AB12CD34.js), so they never change
+HASHED_NAME = re.compile(r"[.-](?:[0-9a-f]{16,20}|[0-9A-Z]{8})\.[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "application/xml", "image/svg+xml",
+                      "application/wasm", "application/manifest+json")
+# Preferred first when the client accepts several
+ENCODINGS = ("br", "gzip")
+
+mimetypes.add_type("application/javascript", ".js")
+mimetypes.add_type("application/javascript", ".mjs")
+mimetypes.add_type("application/manifest+json", ".webmanifest")
+
+
+@dataclass
+class Asset:
+    body: bytes
+    media_type: str
+    etag: str  # strong validator of the identity body, quoted
+    cache_control: str
+    last_modified: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)  # content-coding -> precompressed body
+
+    def variant(self, accept_encoding: str):
+        """(content-coding or None, body, ETag) for the best representation the client accepts."""
+        accepted = parse_accept_encoding(accept_encoding)
+        for coding in ENCODINGS:
+            if coding in self.encoded and accepted.get(coding, accepted.get("*", 0)) > 0:
+                return coding, self.encoded[coding], f'{self.etag[:-1]}-{coding}"'
+        return None, self.body, self.etag
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (as If-None-Match uses), ignoring the content-coding suffix of our own tags."""
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"').split("-", 1)[0]
+    for candidate in if_none_match.split(","):
+        tag = candidate.strip().removeprefix("W/").strip('"')
+        if tag and tag.split("-", 1)[0] == base:
+            return True
+    return False
+
+
+class StaticAssets:
+    """The Angular bundle, indexed once into memory.
+
+    load() reads every file under root, computes its strong ETag and keeps
+    gzip (and, if the brotli package is installed, brotli) variants of
+    compressible files when they are smaller. Requests are then answered from
+    the table without touching the disk: 304 when If-None-Match matches,
+    otherwise the best encoding the client accepts. Content-hashed bundle
+    files are cached as immutable; everything else is revalidated.
+    """
+
+    def __init__(self, root: str = STATIC_ASSETS_DIR, compress_min_bytes: int = STATIC_COMPRESS_MIN_BYTES):
+        self.root = root
+        self.compress_min_bytes = compress_min_bytes
+        self.assets: Dict[str, Asset] = {}
+        self.bytes = 0
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.assets)
+
+    def load(self) -> int:
+        """(Re)index root; returns the number of files. Missing root leaves the table empty."""
+        if not os.path.isdir(self.root):
+            logger.warning(f"Angular build directory not found at {self.root}")
+            self.assets = {}
+            return 0
+
+        started = time.perf_counter()
+        assets = {}
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+                assets[relative] = self._build(relative, path)
+        self.assets = assets
+        self.bytes = sum(len(asset.body) + sum(map(len, asset.encoded.values())) for asset in assets.values())
+        logger.info(f"Indexed {len(assets)} static assets ({self.bytes / 1e6:.1f}MB with compressed variants) "
+                    f"from {self.root} in {time.perf_counter() - started:.2f}s")
+        return len(assets)
+
+    def _build(self, relative: str, path: str) -> Asset:
+        with open(path, "rb") as f:
+            body = f.read()
+        media_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+        asset = Asset(
+            body=body,
+            media_type=media_type,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            cache_control=IMMUTABLE if HASHED_NAME.search(relative) else REVALIDATE,
+            last_modified=formatdate(os.path.getmtime(path), usegmt=True),
+        )
+        if len(body) >= self.compress_min_bytes and media_type.startswith(COMPRESSIBLE_TYPES):
+            candidates = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                candidates["br"] = brotli.compress(body, quality=11)
+            asset.encoded = {coding: data for coding, data in candidates.items() if len(data) < len(body)}
+        return asset
+
+    def lookup(self, path: str) -> Optional[Asset]:
+        """The asset for a URL path; extensionless paths are client-side routes and get index.html."""
+        path = path.strip("/")
+        asset = self.assets.get(path or INDEX)
+        if asset is None and "." not in path.rsplit("/", 1)[-1]:
+            asset = self.assets.get(INDEX)
+        return asset
+
+    def response(self, request: Request, asset: Asset) -> Response:
+        coding, body, etag = asset.variant(request.headers.get("accept-encoding", ""))
+        headers = {
+            "ETag": etag,
+            "Cache-Control": asset.cache_control,
+            "Last-Modified": asset.last_modified,
+            "Vary": "Accept-Encoding",
+        }
+        if etag_matches(request.headers.get("if-none-match", ""), etag):
+            return Response(status_code=304, headers=headers)
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=b"" if request.method == "HEAD" else body, media_type=asset.media_type,
+                        headers={**headers, "Content-Length": str(len(body))})
+
+    def stats(self) -> Dict:
+        return {
+            "files": len(self.assets),
+            "bytes": self.bytes,
+            "immutable": sum(asset.cache_control == IMMUTABLE for asset in self.assets.values()),
+            "compressed": sum(bool(asset.encoded) for asset in self.assets.values()),
+            "brotli": brotli is not None,
+        }
+
+
+static_assets = StaticAssets()
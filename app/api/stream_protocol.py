@@ -0,0 +1,69 @@
+"""Binary framing for /ws/stream-audio (protocol version 2).
+
+Version 1 (the default) sends raw 16-bit 16kHz PCM upstream and each TTS reply
+as one binary blob followed by an audio_complete event. A client opts into
+version 2 with {"protocol": 2, "codec": "opus"} in its initial config message.
+The server confirms with a {"type": "protocol", ...} event.
+
+In version 2 every binary message starts with a 12-byte big-endian header:
+
+    version  uint8   always 2
+    type     uint8   FRAME_AUDIO (client -> server) or FRAME_TTS (server -> client)
+    flags    uint16  FLAG_END marks the last TTS frame of a segment
+    segment  uint32  segment id (0 for uplink audio, which the server segments itself)
+    sequence uint32  per-direction counter (uplink) or per-segment chunk index (downlink)
+
+Uplink payloads are single Opus packets (48kHz, mono, as produced by WebCodecs)
+or, with codec "pcm16", raw PCM. Downlink payloads are TTS audio chunks of at
+most STREAM_DOWNLINK_CHUNK_BYTES, so a segment's reply can be played while it
+arrives and frames of different segments can be told apart. JSON events stay
+text messages and carry segment_id as before.
+"""
+import struct
+from dataclasses import dataclass
+from typing import List
+
+PROTOCOL_VERSION = 2
+CODECS = ("pcm16", "opus")
+
+FRAME_AUDIO = 1
+FRAME_TTS = 2
+
+FLAG_END = 0x0001
+
+HEADER = struct.Struct("!BBHII")
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+@dataclass
+class Frame:
+    type: int
+    flags: int
+    segment_id: int
+    sequence: int
+    payload: bytes
+
+
+def encode_frame(frame_type: int, segment_id: int, sequence: int, payload: bytes, flags: int = 0) -> bytes:
+    return HEADER.pack(PROTOCOL_VERSION, frame_type, flags, segment_id, sequence) + payload
+
+
+def decode_frame(data: bytes) -> Frame:
+    if len(data) < HEADER.size:
+        raise ProtocolError(f"frame of {len(data)} bytes is shorter than the {HEADER.size}-byte header")
+    version, frame_type, flags, segment_id, sequence = HEADER.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"unsupported frame version {version}")
+    return Frame(frame_type, flags, segment_id, sequence, bytes(data[HEADER.size:]))
+
+
+def tts_frames(segment_id: int, audio: bytes, chunk_bytes: int) -> List[bytes]:
+    """Split one segment's TTS audio into FRAME_TTS frames, flagging the last."""
+    chunks = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)] or [b""]
+    return [
+        encode_frame(FRAME_TTS, segment_id, sequence, chunk, FLAG_END if sequence == len(chunks) - 1 else 0)
+        for sequence, chunk in enumerate(chunks)
+    ]
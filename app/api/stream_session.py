@@ -0,0 +1,537 @@
+import asyncio
+import io
+import json
+import logging
+import time
+import uuid
+import wave
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.config import (
+    PARTIAL_AGREEMENT,
+    PARTIAL_INTERVAL_MS,
+    PARTIAL_TRANSCRIPTS,
+    STREAM_AUDIO_QUEUE_CHUNKS,
+    STREAM_DOWNLINK_CHUNK_BYTES,
+    STREAM_IDLE_TIMEOUT_SECONDS,
+    STREAM_MAX_PENDING_SEGMENTS,
+    STREAM_SEGMENT_MAX_AGE_SECONDS,
+    STREAM_SEGMENT_WORKERS,
+)
+from app.service.anthropic import AnthropicService
+from app.api.stream_protocol import (
+    CODECS,
+    FRAME_AUDIO,
+    PROTOCOL_VERSION,
+    ProtocolError,
+    decode_frame,
+    tts_frames,
+)
+from app.service.audio_transcription import OpusPacketDecoder, TranscriptionMode, av
+from app.service.logging_setup import log_context
+from app.service.metrics import STAGE_SECONDS, Stage, count_request, timed
+from app.service.partial_transcript import LocalAgreement
+from app.service.pht import PHT
+from app.service.segmenter import SpeechSegment, SpeechSegmenter
+from app.service.transcript_filter import transcript_filter
+from app.service.transcription_scheduler import get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Segments this short (16-bit PCM bytes) are clicks or coughs, not utterances
+MIN_SEGMENT_BYTES = 10000
+# A lone word from a VAD segment is almost always noise
+STREAM_MIN_WORDS = 2
+
+# A JSON event or a binary TTS frame
+Message = Union[dict, bytes]
+
+
+@dataclass
+class SegmentJob:
+    id: int
+    segment: SpeechSegment
+    queued_at: float = field(default_factory=time.monotonic)
+    result: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class AudioStreamSession:
+    """One /ws/stream-audio connection, run as a pipeline of tasks.
+
+    The receiver only reads the socket, so frames never pile up behind a
+    translation. Audio goes through a bounded queue to the segmenter stage,
+    which numbers finished segments and hands them to a pool of workers
+    (transcribe, translate, TTS). The delivery stage sends each segment's
+    results in segment order. When more than max_pending segments are waiting,
+    the oldest is dropped, and a segment that waited longer than max_age is
+    skipped; either way the client gets a segment_dropped event in its place.
+
+    With partials on, the open segment is re-transcribed every
+    PARTIAL_INTERVAL_MS of speech and partial_transcription events (committed
+    plus unstable text, see LocalAgreement) go out right away under the id the
+    segment will get when it completes.
+
+    Clients that negotiate protocol 2 (see stream_protocol) send framed,
+    optionally Opus-compressed audio and get TTS back as framed chunks.
+
+    The session closes itself after idle_timeout without client messages
+    (unless results are still on the way); drain() finishes the open and
+    in-flight segments before closing, for shutdown.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        anthropic_service: AnthropicService,
+        workers: int = STREAM_SEGMENT_WORKERS,
+        max_pending: int = STREAM_MAX_PENDING_SEGMENTS,
+        max_age: float = STREAM_SEGMENT_MAX_AGE_SECONDS,
+        audio_queue_size: int = STREAM_AUDIO_QUEUE_CHUNKS,
+        idle_timeout: float = STREAM_IDLE_TIMEOUT_SECONDS,
+    ):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.anthropic_service = anthropic_service
+        self.workers = workers
+        self.max_age = max_age
+        self.idle_timeout = idle_timeout
+        self.segmenter = SpeechSegmenter()
+        self.scheduler = get_scheduler(TranscriptionMode.HF.value, model_name="large")
+        self.gender: Optional[str] = None
+        self.language: Optional[str] = None
+        self.partials = PARTIAL_TRANSCRIPTS
+        self.protocol = 1
+        self.codec = "pcm16"
+        self.lost_frames = 0
+        self._opus: Optional[OpusPacketDecoder] = None
+        self._uplink_sequence: Optional[int] = None  # next expected uplink frame
+
+        self.connected_at = time.time()
+        self.last_activity = time.monotonic()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.segments = 0  # delivered, including dropped ones
+        self.dropped = 0
+        self.draining = False
+        self._undelivered = 0
+        self._all_delivered = asyncio.Event()
+        self._all_delivered.set()
+        self._closed = asyncio.Event()
+
+        self._audio: asyncio.Queue = asyncio.Queue(maxsize=audio_queue_size)
+        self._pending: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self._outbox: asyncio.Queue = asyncio.Queue()
+        self._send_lock = asyncio.Lock()
+        self._next_id = 0
+        self._agreement = LocalAgreement(PARTIAL_AGREEMENT)
+        self._partial_task: Optional[asyncio.Task] = None
+        self._partial_at = 0.0  # open segment length at the last partial request
+
+    async def run(self):
+        """Serve the connection until the client disconnects (raises WebSocketDisconnect)."""
+        # Stage tasks are created inside the context, so their records carry the session id
+        with log_context(session_id=self.id):
+            await self._run()
+
+    async def _run(self):
+        await self.send({"type": "connection_status", "status": "connected"})
+        await self._read_initial_config()
+
+        tasks = [asyncio.create_task(self._receive()), asyncio.create_task(self._segment_stage()), asyncio.create_task(self._deliver())]
+        tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        tasks += [asyncio.create_task(self._watch_idle()), asyncio.create_task(self._closed.wait())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            if self._partial_task is not None:
+                tasks.append(self._partial_task)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    @property
+    def in_flight(self) -> int:
+        """Segments whose results have not been delivered yet."""
+        return self._undelivered
+
+    async def send(self, message: Message):
+        async with self._send_lock:
+            if isinstance(message, bytes):
+                self.bytes_out += len(message)
+                await self.websocket.send_bytes(message)
+            else:
+                self.bytes_out += len(json.dumps(message))
+                await self.websocket.send_json(message)
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except RuntimeError:
+            pass  # the client already went away
+
+    async def drain(self, timeout: float):
+        """Stop taking audio, finish the open and in-flight segments, then close."""
+        self.draining = True
+        segment = self.segmenter.flush()
+        if segment is not None and len(segment.pcm) > MIN_SEGMENT_BYTES:
+            await self._enqueue(segment)
+        try:
+            await asyncio.wait_for(self._all_delivered.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Stream session %s still had %s segments in flight after %ss", self.id, self.in_flight, timeout)
+        await self.close(code=1001, reason="server shutting down")
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+            "idle_seconds": round(time.monotonic() - self.last_activity, 1),
+            "protocol": self.protocol,
+            "codec": self.codec,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "segments": self.segments,
+            "dropped": self.dropped,
+            "in_flight": self.in_flight,
+            "draining": self.draining,
+        }
+
+    async def _read_initial_config(self):
+        # Wait for initial config message that might contain gender or language
+        try:
+            init_data = await asyncio.wait_for(self.websocket.receive_json(), timeout=2.0)
+            if 'gender' in init_data:
+                self.gender = init_data['gender']
+                logger.info("Received gender parameter: %s", self.gender)
+                await self.send({"type": "status", "message": f"Using provided gender: {self.gender}"})
+            if 'language' in init_data:
+                self.language = init_data['language']
+                logger.info("Received language parameter: %s", self.language)
+                await self.send({"type": "status", "message": f"Using provided language: {self.language}"})
+            if 'partials' in init_data:
+                self.partials = bool(init_data['partials'])
+            if 'protocol' in init_data:
+                await self._negotiate(init_data)
+        except (asyncio.TimeoutError, ValueError, TypeError):
+            # Continue without parameters if timeout or invalid message
+            logger.info("No initial parameters received, will use detection")
+
+    async def _negotiate(self, config: dict):
+        try:
+            version = int(config['protocol'])
+        except (TypeError, ValueError):
+            version = None
+        codec = config.get('codec', 'pcm16')
+        if version not in (1, PROTOCOL_VERSION) or codec not in CODECS:
+            logger.warning("Unsupported stream protocol %r / codec %r, using version 1", config['protocol'], codec)
+            await self.send({"type": "error", "message": "Unsupported protocol or codec, using protocol 1 with pcm16"})
+            return
+        if version == 1:
+            return
+
+        self.protocol = version
+        self.codec = codec
+        if codec == "opus":
+            self._opus = OpusPacketDecoder()
+        logger.info("Using stream protocol %s with %s uplink", version, codec)
+        await self.send({
+            "type": "protocol",
+            "version": version,
+            "codec": codec,
+            "downlink_chunk_bytes": STREAM_DOWNLINK_CHUNK_BYTES,
+        })
+
+    async def _receive(self):
+        while True:
+            message = await self.websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            self.last_activity = time.monotonic()
+
+            if message.get("bytes") is not None:
+                self.bytes_in += len(message["bytes"])
+                if self.draining:
+                    continue
+                logger.debug("Received audio chunk of size: %d bytes", len(message["bytes"]))
+                audio = message["bytes"] if self.protocol == 1 else await self._unframe(message["bytes"])
+                if audio:
+                    # Blocks (and stops reading the socket) if the segmenter falls behind
+                    await self._audio.put(audio)
+            elif message.get("text") is not None:
+                await self._update_config(message["text"])
+            else:
+                logger.warning("Received unknown message type: %s", message)
+
+    async def _watch_idle(self):
+        while True:
+            remaining = self.last_activity + self.idle_timeout - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            elif self.in_flight:
+                # The client is waiting on results; the idle clock restarts once they are out
+                await self._all_delivered.wait()
+                self.last_activity = time.monotonic()
+            else:
+                logger.info("Closing stream session %s after %ss idle", self.id, self.idle_timeout)
+                await self.close(code=1000, reason="idle timeout")
+                return
+
+    async def _unframe(self, data: bytes) -> Optional[bytes]:
+        try:
+            frame = decode_frame(data)
+        except ProtocolError as e:
+            logger.warning("Invalid stream frame: %s", e)
+            await self.send({"type": "error", "message": f"Invalid frame: {str(e)}"})
+            return None
+        if frame.type != FRAME_AUDIO:
+            logger.warning("Ignoring unexpected uplink frame type %s", frame.type)
+            return None
+        if self._uplink_sequence is not None and frame.sequence != self._uplink_sequence:
+            self.lost_frames += max(0, frame.sequence - self._uplink_sequence)
+            logger.debug("Uplink frame %d arrived, expected %d", frame.sequence, self._uplink_sequence)
+        self._uplink_sequence = frame.sequence + 1
+        return frame.payload
+
+    def _decode_uplink(self, payload: bytes) -> bytes:
+        if self._opus is None:
+            return payload
+        try:
+            return self._opus.decode(payload)
+        except (ValueError, av.FFmpegError) as e:
+            logger.warning("Dropping undecodable Opus packet: %s", e)
+            return b""
+
+    async def _update_config(self, text: str):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            logger.error("Received invalid JSON message")
+            await self.send({"type": "error", "message": "Invalid configuration format"})
+            return
+
+        logger.info("Received JSON config: %s", data)
+        if "gender" in data:
+            self.gender = data["gender"]
+            logger.info("Updated gender parameter: %s", self.gender)
+            await self.send({"type": "status", "message": f"Updated gender to: {self.gender}"})
+        if "language" in data:
+            self.language = data["language"]
+            logger.info("Updated language parameter: %s", self.language)
+            await self.send({"type": "status", "message": f"Updated language to: {self.language}"})
+        if "partials" in data:
+            self.partials = bool(data["partials"])
+            logger.info("Updated partial transcripts: %s", self.partials)
+
+    async def _segment_stage(self):
+        while True:
+            chunk = await self._audio.get()
+            if self.draining:
+                continue
+            chunk = self._decode_uplink(chunk)
+            # Completed segments: speech followed by the VAD hangover, or cut at the maximum length
+            segments = self.segmenter.feed(chunk)
+            for segment in segments:
+                if len(segment.pcm) <= MIN_SEGMENT_BYTES:
+                    logger.debug("Audio segment too short (%d bytes), ignoring", len(segment.pcm))
+                    continue
+                await self._enqueue(segment)
+            if segments:
+                self._reset_partials()
+            self._maybe_start_partial()
+
+    def _reset_partials(self):
+        # The final transcription supersedes whatever partial is still running
+        if self._partial_task is not None:
+            self._partial_task.cancel()
+            self._partial_task = None
+        self._agreement = LocalAgreement(PARTIAL_AGREEMENT)
+        self._partial_at = 0.0
+
+    def _maybe_start_partial(self):
+        if not self.partials or not self.segmenter.active:
+            return
+        if self._partial_task is not None and not self._partial_task.done():
+            return  # at most one partial in flight per connection
+        if self.segmenter.open_seconds - self._partial_at < PARTIAL_INTERVAL_MS / 1000:
+            return
+        self._partial_at = self.segmenter.open_seconds
+        self._partial_task = asyncio.create_task(self._partial(self._next_id, self.segmenter.snapshot()))
+
+    async def _partial(self, segment_id: int, snapshot: SpeechSegment):
+        wav_data = await convert_pcm_to_audio_format(bytearray(snapshot.pcm))
+        try:
+            # One-off prefixes would only evict useful cache entries
+            transcription = await self.scheduler.transcribe(wav_data, cache=False)
+        except Exception as e:
+            logger.warning("Partial transcription of segment %s failed: %s", segment_id, e)
+            return
+        if segment_id != self._next_id or not transcription.text:
+            return
+        committed, unstable = self._agreement.update(transcription.text)
+        await self.send({
+            "type": "partial_transcription",
+            "segment_id": segment_id,
+            "committed_text": committed,
+            "unstable_text": unstable,
+        })
+
+    async def _enqueue(self, segment: SpeechSegment):
+        job = SegmentJob(self._next_id, segment)
+        self._next_id += 1
+        self._undelivered += 1
+        self._all_delivered.clear()
+        logger.debug("Speech segment %d complete: %.2fs-%.2fs, forced split: %s", job.id, segment.start, segment.end, segment.forced)
+
+        await self._outbox.put(job)
+        if self._pending.full():
+            self._drop(self._pending.get_nowait(), "backlog")
+        self._pending.put_nowait(job)
+
+    def _drop(self, job: SegmentJob, reason: str):
+        logger.warning("Dropping speech segment %s (%s) after %.1fs in queue", job.id, reason, time.monotonic() - job.queued_at)
+        self.dropped += 1
+        count_request("stream", f"dropped_{reason}")
+        job.result.set_result([{"type": "segment_dropped", "segment_id": job.id, "reason": reason}])
+
+    async def _worker(self):
+        while True:
+            job = await self._pending.get()
+            if time.monotonic() - job.queued_at > self.max_age:
+                self._drop(job, "stale")
+                continue
+            STAGE_SECONDS.observe(time.monotonic() - job.queued_at, pipeline="stream", stage="queue", mode="", model="",
+                                  outcome="ok")
+            try:
+                with log_context(segment_id=job.id):
+                    messages = await self.process_segment(job)
+            except Exception as e:
+                count_request("stream", "error")
+                logger.error(f"Error processing speech segment {job.id}: {str(e)}", exc_info=True)
+                messages = [{"type": "error", "segment_id": job.id, "message": f"Error processing speech: {str(e)}"}]
+            job.result.set_result(messages)
+
+    async def _deliver(self):
+        # Results go out in segment order even when a later segment finishes first
+        while True:
+            job = await self._outbox.get()
+            messages = await job.result
+            with Stage("stream", "send"):
+                for message in messages:
+                    await self.send(message)
+            self.segments += 1
+            self._undelivered -= 1
+            if self._undelivered == 0:
+                self._all_delivered.set()
+
+    async def process_segment(self, job: SegmentJob) -> List[Message]:
+        """Transcribe, translate and synthesize one segment; returns the messages for the client."""
+        await self.send({"type": "status", "segment_id": job.id, "message": "Processing speech segment..."})
+
+        wav_data = await convert_pcm_to_audio_format(bytearray(job.segment.pcm))
+
+        # Initialize PHT client
+        pht_client = PHT()
+
+        # Use provided gender if available, otherwise detect gender
+        if self.gender:
+            gender_task = asyncio.create_task(get_hardcoded_gender(self.gender))
+            logger.info("Using provided gender: %s", self.gender)
+        else:
+            gender_task = asyncio.create_task(
+                timed(pht_client.detect_gender(bytearray(wav_data)), "stream", "gender")
+            )
+            logger.info("Detecting gender from audio")
+
+        # Segments from concurrent sessions are batched together by the scheduler
+        with Stage("stream", "transcribe", mode=TranscriptionMode.HF.value, model="large") as timer:
+            transcribed_text = await self.scheduler.transcribe_voice(wav_data)
+            if not transcribed_text:
+                timer.outcome = "empty"
+
+        if not transcribed_text:
+            count_request("stream", "empty_transcription")
+            gender_task.cancel()
+            logger.warning("Empty transcription returned")
+            return [{"type": "status", "segment_id": job.id, "message": "No speech detected in the audio segment"}]
+
+        logger.info("Transcribed speech segment %s: %s", job.id, transcribed_text)
+        reason = transcript_filter.check(transcribed_text, min_words=STREAM_MIN_WORDS)
+        if reason:
+            count_request("stream", "filtered")
+            gender_task.cancel()
+            logger.info("Ignoring transcription of segment %s (%s): '%s'", job.id, reason, transcribed_text)
+            return [{
+                "type": "status",
+                "segment_id": job.id,
+                "reason": reason,
+                "message": "Ignored transcription (single word, filtered phrase, or repetitive content)"
+            }]
+
+        # Translate the transcribed text
+        with Stage("stream", "translate", model="anthropic") as timer:
+            translation = await self.anthropic_service.get_response(user_input=transcribed_text)
+            if not translation:
+                timer.outcome = "empty"
+        messages: List[Message] = [{
+            "type": "transcription",
+            "segment_id": job.id,
+            "transcribed_text": transcribed_text,
+            "translated_text": translation
+        }]
+
+        # Optionally generate TTS for the translation
+        try:
+            with Stage("stream", "tts", model="playht"):
+                tts_response = await pht_client.text_to_speech(bytearray(wav_data), translation, gender_task, self.language)
+            count_request("stream", "ok")
+            if self.protocol == PROTOCOL_VERSION:
+                messages += tts_frames(job.id, bytes(tts_response), STREAM_DOWNLINK_CHUNK_BYTES)
+            else:
+                messages += [bytes(tts_response), {"type": "audio_complete", "segment_id": job.id}]
+        except Exception as e:
+            count_request("stream", "tts_error")
+            logger.error(f"TTS generation failed: {str(e)}")
+            messages.append({"type": "error", "segment_id": job.id, "message": f"TTS generation failed: {str(e)}"})
+        return messages
+
+
+async def get_hardcoded_gender(gender_value):
+    """Simple async function to return the provided gender value"""
+    return gender_value
+
+
+async def convert_pcm_to_audio_format(pcm_data: bytearray) -> bytearray:
+    """Convert raw PCM audio data to WAV format."""
+    logger.debug("Converting %d bytes of PCM data to WAV format", len(pcm_data))
+    try:
+        # Process the PCM data asynchronously to avoid blocking
+        return await asyncio.to_thread(_create_wav_from_pcm, pcm_data)
+    except Exception as e:
+        logger.error(f"Error converting PCM to WAV: {str(e)}", exc_info=True)
+        # Return the original data if conversion fails
+        return pcm_data
+
+
+def _create_wav_from_pcm(pcm_data: bytearray) -> bytearray:
+    """Create a WAV file from PCM data (synchronous function)."""
+    # Assume 16-bit mono PCM at 16kHz (adjust parameters if your audio differs)
+    sample_rate = 16000
+    channels = 1
+    sample_width = 2  # 16-bit
+
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(sample_width)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_data)
+
+    return bytearray(wav_buffer.getvalue())
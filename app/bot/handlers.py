@@ -1,17 +1,26 @@
-import asyncio
+from __future__ import annotations
+
 import io
 import pickle
 import re
-from telegram import Update
-from telegram.ext import ContextTypes
+from typing import TYPE_CHECKING, Optional
 import emoji
-from app.config import ALLOWED_GROUP_ID, ADMIN_USER_ID
+from app.config import ALLOWED_GROUP_ID, ADMIN_USER_ID, TRANSLATION_MAX_TARGETS
 import logging
 from types import MappingProxyType
 
-from app.service.audio_transcription import TranscriptionMode, WhisperHandler
+from app.service.audio_transcription import TranscriptionMode, download_voice
+from app.service.transcript_filter import transcript_filter
+from app.service.transcription_scheduler import get_scheduler
 from app.service.pht import PHT, generate_tts
+from app.service.transcription_cache import CacheEntry, transcription_cache
 from app.service.anthropic import AnthropicService
+from app.service.metrics import Stage, count_request, timed
+from app.service.task_supervisor import task_supervisor
+
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
 
 logger = logging.getLogger(__name__)
 
@@ -23,17 +32,15 @@ def is_emoji_only(text: str) -> bool:
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Start command from user {update.message.from_user.id}")
+    logger.info("Start command from user %s", update.message.from_user.id)
     await send_message(update, context, "Hello! I'm ready to translate")
 
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(
-        f"Handling message from user {update.message.from_user.id}: {update.message.text[:100]}"
-    )
+    logger.info("Handling message from user %s: %s", update.message.from_user.id, update.message.text[:100])
     # Fire and forget the filter and typing indicator
-    asyncio.create_task(message_filter(update, context))
-    asyncio.create_task(update.message.chat.send_action("typing"))
+    task_supervisor.spawn(message_filter(update, context), "message_filter")
+    task_supervisor.spawn(update.message.chat.send_action("typing"), "typing", optional=True)
 
     if update.message.text.startswith("-"):
         logger.info("Skipping message starting with -")
@@ -43,63 +50,146 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info("Skipping emoji-only message")
         return
 
+    targets = context.application.bot_data.get("translation_targets")
+    if targets:
+        await send_translations(update, context, targets)
+        return
+
+    outcome = "ok"
     try:
         logger.info("Getting response from Anthropic service")
-        response = await anthropic_service.get_response(user_input=update.message.text)
-        logger.info(f"Got response from Anthropic: {response[:100]}...")
+        with Stage("telegram_text", "translate", model="anthropic") as timer:
+            response = await anthropic_service.get_response(user_input=update.message.text)
+            if not response:
+                timer.outcome = "empty"
+        logger.info("Got response from Anthropic: %s...", response[:100])
         
         if response:
             logger.info("Sending response to user")
-            await send_message(update, context, response)
+            with Stage("telegram_text", "send"):
+                await send_message(update, context, response)
         else:
             logger.warning("Empty response from Anthropic")
+            outcome = "empty_translation"
             await send_message(update, context, 
                 "Sorry, I received an empty response. Please try again."
             )
     except Exception as e:
+        outcome = "error"
         logger.error(f"Error in handle_message: {str(e)}", exc_info=True)
         await send_message(update, context, 
             f"Sorry, I encountered an error: {str(e)}"
         )
+    finally:
+        count_request("telegram_text", outcome)
+
+async def send_translations(update: Update, context: ContextTypes.DEFAULT_TYPE, targets: list):
+    """Multilingual chats: one message per target language, sent as each translation finishes"""
+    logger.info("Translating into %s targets", len(targets))
+    outcome = "ok"
+    sent = 0
+    try:
+        with Stage("telegram_text", "translate_targets", model="anthropic") as timer:
+            async for translation in anthropic_service.translate_many(update.message.text, targets):
+                if translation["translated_text"]:
+                    with Stage("telegram_text", "send"):
+                        await send_message(update, context, f"[{translation['language']}] {translation['translated_text']}")
+                    sent += 1
+                else:
+                    logger.warning("Empty response from Anthropic for %s", translation['language'])
+            if not sent:
+                timer.outcome = "empty"
+        if not sent:
+            outcome = "empty_translation"
+        elif sent < len(targets):
+            outcome = "partial"
+    except Exception as e:
+        outcome = "error"
+        logger.error(f"Error in send_translations: {str(e)}", exc_info=True)
+        await send_message(update, context, f"Sorry, I encountered an error: {str(e)}")
+    finally:
+        count_request("telegram_text", outcome)
 
 async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Handling voice message from user {update.message.from_user.id}")
+    logger.info("Handling voice message from user %s", update.message.from_user.id)
+    outcome = "ok"
     try:
         voice = update.message.voice
         if voice:
             # Fire off typing indicator and message filter
-            asyncio.create_task(update.message.chat.send_action("typing"))
-            asyncio.create_task(message_filter(update, context))
+            task_supervisor.spawn(update.message.chat.send_action("typing"), "typing", optional=True)
+            task_supervisor.spawn(message_filter(update, context), "message_filter")
 
             model_name = context.application.bot_data.get("translation_mode", "base")
             mode = context.application.bot_data.get("transcription_mode", TranscriptionMode.LOCAL.value)
             detect_language = context.application.bot_data.get("translation_detect", False)
 
-            logger.info(f"Using mode: {mode} with model: {model_name}")
-
-            file = await context.bot.get_file(voice.file_id)
-            voice_data = await file.download_as_bytearray()
-            handler = WhisperHandler(mode, model_name)
-
-            transcribed_text = await handler.transcribe_voice(voice_data, detect_language)
-            logger.info(f"Transcribed text: {transcribed_text}")
+            logger.info("Using mode: %s with model: %s", mode, model_name)
+
+            scheduler = get_scheduler(mode, model_name)
+            # Forwards and retries carry the same file_unique_id; a hit skips the download and ASR.
+            # Keys include the model/mode/detection variant, so changing settings re-transcribes.
+            variant = scheduler.handler.cache_variant(detect_language)
+            file_key = transcription_cache.file_key(voice.file_unique_id, variant)
+            voice_data = None
+            with Stage("telegram_voice", "cache_lookup", mode=mode, model=model_name) as timer:
+                cache_entry = transcription_cache.get_entry(file_key)
+                transcription = cache_entry.transcription if cache_entry is not None else None
+                timer.outcome = "miss" if transcription is None else "hit"
+            if transcription is not None:
+                logger.info("Transcription cache hit for %s (model: %s)", file_key, transcription.model)
+            else:
+                with Stage("telegram_voice", "download", mode=mode):
+                    file = await context.bot.get_file(voice.file_id)
+                    # Local ASR takes PCM, so decode the OGG/Opus while it downloads instead of afterwards
+                    voice_data, samples = await download_voice(file, decode=mode == TranscriptionMode.LOCAL.value)
+
+                with Stage("telegram_voice", "transcribe", mode=mode, model=model_name) as timer:
+                    transcription = await scheduler.transcribe(voice_data, detect_language, samples=samples)
+                    if not transcription.text:
+                        timer.outcome = "empty"
+                if transcription.text:
+                    cache_entry = transcription_cache.put(
+                        [file_key, transcription_cache.content_key(bytes(voice_data), variant)], transcription
+                    )
+            transcribed_text = transcription.text
+            logger.info("Transcribed text: %s", transcribed_text)
 
-            asyncio.create_task(update.message.chat.send_action("typing"))
+            task_supervisor.spawn(update.message.chat.send_action("typing"), "typing", optional=True)
             
-            if transcribed_text:
-                translation = await anthropic_service.get_response(user_input=transcribed_text)
-                asyncio.create_task(message_filter(update, context, translation))
+            # Don't pay for translation and TTS of ASR repetition loops (filler phrases only matter for VAD segments)
+            filter_reason = transcript_filter.check(
+                transcribed_text, transcription.language, filler_phrases=False
+            ) if transcribed_text else None
+            if filter_reason:
+                logger.info("Ignoring transcription (%s): '%s'", filter_reason, transcribed_text)
+                outcome = "filtered"
+                task_supervisor.spawn(
+                    send_message(update, context, "Sorry, I couldn't make out any speech in that voice message."), "reply"
+                )
+            elif transcribed_text:
+                with Stage("telegram_voice", "translate", model="anthropic") as timer:
+                    translation = await anthropic_service.get_response(user_input=transcribed_text)
+                    if not translation:
+                        timer.outcome = "empty"
+                task_supervisor.spawn(message_filter(update, context, translation), "message_filter")
                 
                 if translation:
                     logger.info("Sending translation to user")
-                    await send_message(update, context, f"{translation} ({transcribed_text})")
+                    with Stage("telegram_voice", "send"):
+                        await send_message(update, context, f"{translation} ({transcribed_text})")
                     
                     # Generate TTS response
                     logger.info("Initializing PHT client for TTS")
                     pht_client = PHT()
                     try:
                         logger.info("Starting TTS generation")
-                        tts_response = await pht_client.text_to_speech(voice_data, translation)
+                        # Supervised, so its error is still logged if text_to_speech fails before awaiting it
+                        gender_task = task_supervisor.spawn(timed(
+                            cached_gender(context, voice, cache_entry, voice_data, pht_client), "telegram_voice", "gender"
+                        ), "gender")
+                        with Stage("telegram_voice", "tts", model="playht"):
+                            tts_response = await pht_client.text_to_speech(bytearray(), translation, gender_task)
                         logger.info("TTS generation successful")
                         
                         audio_bytes = bytes(tts_response)     
@@ -107,30 +197,51 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         audio_buffer.name = "audio.mp3" 
                         
                         logger.info("Sending voice message back to user")
-                        await context.bot.send_voice(
-                            update.message.chat_id, 
-                            audio_buffer
-                        )
+                        with Stage("telegram_voice", "send_voice"):
+                            await context.bot.send_voice(
+                                update.message.chat_id, 
+                                audio_buffer
+                            )
                         logger.info("Voice message sent successfully")
                     except Exception as e:
+                        outcome = "tts_error"
                         logger.error(f"TTS generation failed: {str(e)}", exc_info=True)
                         await send_message(update, context, "Sorry, I couldn't generate the voice response.")
                 else:
                     logger.warning("Empty translation from Anthropic")
-                    asyncio.create_task(
-                        send_message(update, context, "Sorry, couldn't get translation. Original text: " + transcribed_text)
+                    outcome = "empty_translation"
+                    task_supervisor.spawn(
+                        send_message(update, context, "Sorry, couldn't get translation. Original text: " + transcribed_text), "reply"
                     )
             else:
                 logger.warning("Empty transcription")
-                asyncio.create_task(
-                    send_message(update, context, "Sorry, couldn't transcribe the audio. Please try again.")
+                outcome = "empty_transcription"
+                task_supervisor.spawn(
+                    send_message(update, context, "Sorry, couldn't transcribe the audio. Please try again."), "reply"
                 )
 
     except Exception as e:
+        outcome = "error"
         logger.error(f"Error in handle_voice: {str(e)}", exc_info=True)
-        asyncio.create_task(
-            send_message(update, context, "Sorry, there was an error processing your voice message.")
+        task_supervisor.spawn(
+            send_message(update, context, "Sorry, there was an error processing your voice message."), "reply"
         )
+    finally:
+        count_request("telegram_voice", outcome)
+
+async def cached_gender(context: ContextTypes.DEFAULT_TYPE, voice, entry: Optional[CacheEntry], voice_data,
+                        pht_client: PHT):
+    """Speaker gender for a voice note, detected once and then remembered on its cache entry (if it has one)"""
+    if entry is not None and entry.gender:
+        return entry.gender
+    if voice_data is None:
+        # Cache hit from before the gender was known; only now is the audio needed
+        file = await context.bot.get_file(voice.file_id)
+        voice_data = await file.download_as_bytearray()
+    gender = await pht_client.detect_gender(voice_data)
+    if entry is not None and gender:
+        entry.gender = gender
+    return gender
 
 # async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
 #     logger.info(f"Handling voice message from user {update.message.from_user.id}")
@@ -182,12 +293,12 @@ async def handle_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def t_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"T command from user {update.message.from_user.id}")
+    logger.info("T command from user %s", update.message.from_user.id)
     await handle_message(update, context)
 
 
 async def get_chat_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Get chat ID command from user {update.message.from_user.id}")
+    logger.info("Get chat ID command from user %s", update.message.from_user.id)
     await send_message(update, context, 
         "This chat's ID is: {}".format(update.message.chat.id)
     )
@@ -196,7 +307,7 @@ async def get_chat_id(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def message_filter(
     update: Update, context: ContextTypes.DEFAULT_TYPE, translation: str = ""
 ):
-    logger.info(f"Filtering message from chat ID: {update.message.chat.id}")
+    logger.info("Filtering message from chat ID: %s", update.message.chat.id)
 
     if (
         update.message.chat.type == "private"
@@ -217,7 +328,7 @@ async def message_filter(
         notification = "Message from outside:\nGroup: {}\n{}\nMessage: {}".format(
             update.message.chat.title, "\n".join(user_info), update.message.text
         )
-        logger.info(f"Sending notification to admin about message from user {user.id}")
+        logger.info("Sending notification to admin about message from user %s", user.id)
         await context.bot.send_message(chat_id=ADMIN_USER_ID, text=notification)
         if update.message.voice:
             await context.bot.send_voice(
@@ -233,7 +344,7 @@ async def send_message(update: Update, context: ContextTypes.DEFAULT_TYPE, respo
        await context.bot.send_message(chat_id=update.effective_chat.id, text=response)
 
 async def set_translation_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Set translation mode command from user {update.message.from_user.id}")
+    logger.info("Set translation mode command from user %s", update.message.from_user.id)
     
     if not context.args:
         await send_message(update, context,
@@ -254,7 +365,7 @@ async def set_translation_mode(update: Update, context: ContextTypes.DEFAULT_TYP
     await save_context(update, context, current_data, message)
 
 async def set_transcription_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Set transcription mode command from user {update.message.from_user.id}")
+    logger.info("Set transcription mode command from user %s", update.message.from_user.id)
     
     if not context.args:
         await send_message(update, context,
@@ -275,7 +386,7 @@ async def set_transcription_mode(update: Update, context: ContextTypes.DEFAULT_T
     await save_context(update, context, current_data, message)
 
 async def toggle_detection(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Toggle detection command from user {update.message.from_user.id}")
+    logger.info("Toggle detection command from user %s", update.message.from_user.id)
     
     current_data = dict(context.application.bot_data)
     current_data["translation_detect"] = not current_data.get("translation_detect", False)
@@ -285,7 +396,7 @@ async def toggle_detection(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await save_context(update, context, current_data, message)
 
 async def toggle_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Toggle reply command from user {update.message.from_user.id}")
+    logger.info("Toggle reply command from user %s", update.message.from_user.id)
     
     current_data = dict(context.application.bot_data)
     current_data["reply"] = not current_data.get("reply", False)
@@ -295,7 +406,7 @@ async def toggle_reply(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await save_context(update, context, current_data, message)
 
 async def set_voice_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Set voice type command from user {update.message.from_user.id}")
+    logger.info("Set voice type command from user %s", update.message.from_user.id)
     
     if not context.args:
         current_voice = context.application.bot_data.get("voice_type", "en0")
@@ -316,6 +427,39 @@ async def set_voice_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await save_context(update, context, current_data, message)
 
+async def set_targets(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    logger.info("Set targets command from user %s", update.message.from_user.id)
+
+    current_targets = context.application.bot_data.get("translation_targets") or []
+    if not context.args:
+        current = "; ".join(f"{t['language']}:{t['locale']}" if t.get("locale") else t["language"] for t in current_targets)
+        await send_message(update, context,
+            f"Usage: /targets language[:locale]; language[:locale] ... or /targets off\n"
+            f"Example: /targets spanish:Cartagena, Colombia; french\n"
+            f"Current targets: {current or 'off'}"
+        )
+        return
+
+    current_data = dict(context.application.bot_data)
+    spec = " ".join(context.args)
+    if spec.lower() == "off":
+        current_data["translation_targets"] = []
+        await save_context(update, context, current_data, "Multi-language translation disabled")
+        return
+
+    targets = []
+    for part in filter(None, (part.strip() for part in spec.split(";"))):
+        language, _, locale = part.partition(":")
+        targets.append({"language": language.strip().lower(), "locale": locale.strip() or None})
+    if not 1 <= len(targets) <= TRANSLATION_MAX_TARGETS:
+        await send_message(update, context, f"Use between 1 and {TRANSLATION_MAX_TARGETS} targets")
+        return
+
+    current_data["translation_targets"] = targets
+    message = f"Translating into: {', '.join(target['language'] for target in targets)}"
+
+    await save_context(update, context, current_data, message)
+
 async def save_context(update: Update, context: ContextTypes.DEFAULT_TYPE, current_data: dict, message: str):
     logger.info(message)
     context.application.bot_data = MappingProxyType(current_data)
@@ -328,7 +472,7 @@ async def save_context(update: Update, context: ContextTypes.DEFAULT_TYPE, curre
         logger.error("Failed to save pickle: %s", e)
 
 async def show_commands(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    logger.info(f"Help command from user {update.message.from_user.id}")
+    logger.info("Help command from user %s", update.message.from_user.id)
     
     current_data = context.application.bot_data
     help_text = """
@@ -345,6 +489,8 @@ Available Commands:
     Current: {reply_status}
 /voice [lang][num] - Set voice type (e.g., en0, es1)
     Current: {voice_type}
+/targets [lang:locale; ...|off] - Translate text into several languages
+    Current: {targets}
 /getchatid - Get current chat ID
 /help - Show this help message
 """.format(
@@ -352,7 +498,8 @@ Available Commands:
         transcription_mode=current_data.get('transcription_mode', 'local'),
         detect_status='enabled' if current_data.get('translation_detect', False) else 'disabled',
         reply_status='enabled' if current_data.get('reply', False) else 'disabled',
-        voice_type=current_data.get('voice_type', 'en0')
+        voice_type=current_data.get('voice_type', 'en0'),
+        targets=", ".join(t["language"] for t in current_data.get('translation_targets') or []) or 'off'
     )
     
     await send_message(update, context, help_text)
\ No newline at end of file
@@ -20,3 +20,102 @@ PLAY_HT_API_KEY = os.getenv('PLAY_HT_API_KEY')
 
 # anthropic API credentials
 ANTHROPIC_API_KEY = os.getenv('ANTHROPIC_API_KEY')
+
+# gender detection: accept the local pitch estimate above this confidence, otherwise ask HF
+GENDER_PITCH_CONFIDENCE = float(os.getenv('GENDER_PITCH_CONFIDENCE', '0.6'))
+
+# local whisper transcription (ENV=prod only)
+WHISPER_MODEL_PATH = os.getenv('WHISPER_MODEL_PATH', '/data/models')  # one subdirectory per model name
+WHISPER_COMPUTE_TYPE = os.getenv('WHISPER_COMPUTE_TYPE', 'int8')
+WHISPER_WORKERS = int(os.getenv('WHISPER_WORKERS', '2'))  # worker processes in the ASR pool
+WHISPER_CPU_THREADS = int(os.getenv('WHISPER_CPU_THREADS', '16'))  # total, split evenly across workers
+# languages to choose from when auto-detection is off; a single entry forces that language
+WHISPER_LANGUAGES = [lang.strip() for lang in os.getenv('WHISPER_LANGUAGES', 'en,es').split(',') if lang.strip()]
+WHISPER_MODEL_MEMORY_MB = int(os.getenv('WHISPER_MODEL_MEMORY_MB', '4096'))  # resident model budget per worker
+# models every worker loads at startup, e.g. "base,small:int8,large:float32"
+WHISPER_PRELOAD_MODELS = [spec.strip() for spec in os.getenv('WHISPER_PRELOAD_MODELS', '').split(',') if spec.strip()]
+
+# huggingface inference API (async client)
+HF_INFERENCE_URL = os.getenv('HF_INFERENCE_URL', 'https://router.huggingface.co/hf-inference/models')
+HF_TIMEOUT_SECONDS = float(os.getenv('HF_TIMEOUT_SECONDS', '30'))
+HF_MAX_RETRIES = int(os.getenv('HF_MAX_RETRIES', '3'))
+HF_RETRY_BACKOFF_SECONDS = float(os.getenv('HF_RETRY_BACKOFF_SECONDS', '0.5'))
+HF_POOL_SIZE = int(os.getenv('HF_POOL_SIZE', '32'))  # max open connections in the shared session
+
+# transcription cache (Telegram file_unique_id / audio content hash)
+TRANSCRIPTION_CACHE_SIZE = int(os.getenv('TRANSCRIPTION_CACHE_SIZE', '2048'))
+TRANSCRIPTION_CACHE_TTL_SECONDS = float(os.getenv('TRANSCRIPTION_CACHE_TTL_SECONDS', str(24 * 3600)))
+# transcription micro-batching (local whisper only; HF requests are sent as they arrive)
+# transcription micro-batching
+TRANSCRIPTION_BATCH_SIZE = int(os.getenv('TRANSCRIPTION_BATCH_SIZE', '8'))
+TRANSCRIPTION_BATCH_WAIT_MS = float(os.getenv('TRANSCRIPTION_BATCH_WAIT_MS', '40'))  # max wait for a batch to fill
+TRANSCRIPTION_CONCURRENT_BATCHES = int(os.getenv('TRANSCRIPTION_CONCURRENT_BATCHES', str(WHISPER_WORKERS)))
+
+# voice activity detection for the WebSocket stream
+VAD_FRAME_MS = int(os.getenv('VAD_FRAME_MS', '20'))  # 10-30ms analysis frames
+VAD_SNR_DB = float(os.getenv('VAD_SNR_DB', '6'))  # frame energy needed above the noise floor
+VAD_ONSET_MS = int(os.getenv('VAD_ONSET_MS', '60'))  # consecutive speech needed to open a segment
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', '450'))  # silence needed to close a segment
+
+# speech segment assembly for the WebSocket stream
+SEGMENT_MAX_SECONDS = float(os.getenv('SEGMENT_MAX_SECONDS', '15'))  # longer speech is force-split
+SEGMENT_SPLIT_SEARCH_MS = int(os.getenv('SEGMENT_SPLIT_SEARCH_MS', '3000'))  # tail searched for the quietest split frame
+SEGMENT_OVERLAP_MS = int(os.getenv('SEGMENT_OVERLAP_MS', '300'))  # audio repeated at the start of the next piece
+SEGMENT_PRE_ROLL_MS = int(os.getenv('SEGMENT_PRE_ROLL_MS', '300'))  # audio kept from before the VAD onset
+
+# per-connection WebSocket pipeline
+STREAM_SEGMENT_WORKERS = int(os.getenv('STREAM_SEGMENT_WORKERS', '2'))  # segments processed concurrently per connection
+STREAM_MAX_PENDING_SEGMENTS = int(os.getenv('STREAM_MAX_PENDING_SEGMENTS', '4'))  # oldest is dropped beyond this
+STREAM_SEGMENT_MAX_AGE_SECONDS = float(os.getenv('STREAM_SEGMENT_MAX_AGE_SECONDS', '20'))  # stale segments are skipped
+STREAM_AUDIO_QUEUE_CHUNKS = int(os.getenv('STREAM_AUDIO_QUEUE_CHUNKS', '64'))  # receiver blocks when the segmenter falls behind
+STREAM_DOWNLINK_CHUNK_BYTES = int(os.getenv('STREAM_DOWNLINK_CHUNK_BYTES', '16384'))  # TTS frame size with protocol 2
+STREAM_MAX_SESSIONS = int(os.getenv('STREAM_MAX_SESSIONS', '100'))  # concurrent connections; more are refused
+STREAM_IDLE_TIMEOUT_SECONDS = float(os.getenv('STREAM_IDLE_TIMEOUT_SECONDS', '120'))  # no client messages and nothing in flight
+STREAM_DRAIN_TIMEOUT_SECONDS = float(os.getenv('STREAM_DRAIN_TIMEOUT_SECONDS', '20'))  # shutdown wait for in-flight segments
+
+# interim transcripts while the speaker is still talking (clients can also opt in with {"partials": true})
+PARTIAL_TRANSCRIPTS = os.getenv('PARTIAL_TRANSCRIPTS', 'false').lower() in ('1', 'true', 'yes')
+PARTIAL_INTERVAL_MS = int(os.getenv('PARTIAL_INTERVAL_MS', '600'))  # speech between re-transcriptions
+PARTIAL_AGREEMENT = int(os.getenv('PARTIAL_AGREEMENT', '2'))  # hypotheses that must agree to commit a word
+
+# admin endpoints (/api/v1/admin/...) require this in the X-Admin-Token header when set
+ADMIN_API_TOKEN = os.getenv('ADMIN_API_TOKEN')
+
+# post-ASR noise/hallucination filter: optional {"lang": ["phrase", ...]} JSON extending the built-in filler phrases
+TRANSCRIPT_FILTER_PHRASES_FILE = os.getenv('TRANSCRIPT_FILTER_PHRASES_FILE')
+
+# asynchronous translation jobs (/api/v1/translate/audio/jobs)
+JOBS_DIR = os.getenv('JOBS_DIR', '/tmp/translation-jobs')  # uploads, state and results; unfinished jobs resume after a restart
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # jobs processed concurrently
+JOB_MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', '100'))  # submissions beyond this get a 503
+JOB_MAX_UPLOAD_MB = float(os.getenv('JOB_MAX_UPLOAD_MB', '200'))
+JOB_RESULT_TTL_SECONDS = float(os.getenv('JOB_RESULT_TTL_SECONDS', '3600'))  # finished jobs are deleted after this
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))  # runs cut short by a crash before a job is failed
+
+# long recordings (long_audio=true on /translate/audio and the jobs API)
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv('LONG_AUDIO_CHUNK_SECONDS', '28'))  # silence-delimited chunks, under Whisper's 30s window
+LONG_AUDIO_PARALLELISM = int(os.getenv('LONG_AUDIO_PARALLELISM', '4'))  # chunks in flight per recording
+
+# multi-target translation (/api/v1/translate/text/targets and the bot's /targets)
+TRANSLATION_MAX_TARGETS = int(os.getenv('TRANSLATION_MAX_TARGETS', '8'))  # languages per request
+
+# warm-up in startup(); /ready reports ready once it has finished (set WARMUP_STEPS='' to skip it)
+WARMUP_STEPS = [step.strip() for step in os.getenv(
+    'WARMUP_STEPS', 'imports,langdetect,dsp,gender,whisper_local,hf_asr,anthropic,tts'
+).split(',') if step.strip()]
+WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '120'))  # ready anyway after this, with a warning
+
+# Angular bundle, indexed into memory at startup with precompressed variants (brotli only if the package is installed)
+STATIC_ASSETS_DIR = os.getenv('STATIC_ASSETS_DIR', './universal-translator/dist/universal-translator')
+STATIC_COMPRESS_MIN_BYTES = int(os.getenv('STATIC_COMPRESS_MIN_BYTES', '1024'))  # smaller files are served as-is
+
+# background tasks (webhook updates, bot replies); the webhook answers 503 beyond the limit so Telegram retries
+TASK_MAX_BACKGROUND = int(os.getenv('TASK_MAX_BACKGROUND', '500'))
+TASK_DRAIN_TIMEOUT_SECONDS = float(os.getenv('TASK_DRAIN_TIMEOUT_SECONDS', '25'))  # in-flight work finished on shutdown before cancelling
+
+# logging: records go through a bounded queue to a writer thread, so disk I/O never blocks the event loop
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json (one object per line, with correlation ids) or text
+LOG_FILE = os.getenv('LOG_FILE')  # also write here (e.g. tts_generation.log); stderr only when unset
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # records beyond this are dropped, not waited for
+LOG_SAMPLE_EVERY = int(os.getenv('LOG_SAMPLE_EVERY', '100'))  # DEBUG: keep 1 in N records per call site
@@ -5,18 +5,19 @@ import pickle
 from pathlib import Path
 from types import MappingProxyType
 import sys
+import uuid
+from typing import TYPE_CHECKING
 
 from fastapi import FastAPI, Request, HTTPException
-from telegram import Update
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response
 
+from app.bot import handlers
 from app.bot.handlers import (
     set_transcription_mode,
     set_translation_mode,
     set_voice_type,
+    set_targets,
     show_commands,
     start,
     handle_message,
@@ -26,18 +27,30 @@ from app.bot.handlers import (
     toggle_detection,
     toggle_reply,
 )
-from app.config import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH, RUN_MODE
-from app.service.audio_transcription import TranscriptionMode
-from app.api.routes import router as api_router
+from app.config import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH, RUN_MODE, STREAM_DRAIN_TIMEOUT_SECONDS
+from app.service import audio_dsp, pht
+from app.service.audio_transcription import LocalWhisperEngine, TranscriptionMode, close_download_client
+from app.service.hf_inference import close_session as close_hf_session, session_open as hf_session_open
+from app.service.lazy_import import is_loaded, lazy_import_stats
+from app.service.logging_setup import configure_logging, log_context
+from app.service.metrics import registry as metrics_registry
+from app.service.task_supervisor import task_supervisor
+from app.service.transcription_scheduler import close_schedulers
+from app.service.warmup import WarmUp, default_steps
+from app.api.routes import anthropic_service, job_manager, router as api_router
+from app.api.session_registry import session_registry
+from app.api.static_assets import static_assets
 
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", 
-    level=logging.INFO
-)
+if TYPE_CHECKING:
+    from telegram import Update
+
+configure_logging()
 logger = logging.getLogger(__name__)
 
 fastapi_app = FastAPI()
 telegram_app = None
+ready = False  # set once startup() and the warm-up have finished
+warmup = WarmUp(default_steps(anthropic_service, handlers.anthropic_service))
 
 @fastapi_app.on_event("startup")
 async def startup():
@@ -67,16 +80,38 @@ async def startup():
     else:
         logger.info("Running in REST API mode - Telegram bot disabled")
 
-    # Check if Angular build directory exists
-    angular_build_path = Path("./universal-translator/dist/universal-translator")
-    if angular_build_path.exists() and angular_build_path.is_dir():
-        logger.info(f"Mounting Angular build directory: {angular_build_path}")
-        fastapi_app.mount("/", StaticFiles(directory=angular_build_path, html=True), name="angular")
-    else:
-        logger.warning(f"Angular build directory not found at {angular_build_path}")
+    await job_manager.start()
+
+    # Index the Angular bundle once; serve_angular answers from memory
+    await asyncio.to_thread(static_assets.load)
+
+    # Warm up in the background (whisper model preloads included) so "/" answers at once;
+    # /ready stays 503 until it's done
+    task_supervisor.spawn(warm_up(), "warmup", drain=False)
+
+async def warm_up():
+    global ready
+    await warmup.run()
+    ready = True
+
+@fastapi_app.on_event("shutdown")
+async def shutdown():
+    logger.info("Shutting down application")
+    # Finish the updates, replies and segments users are waiting on before the HF session goes away
+    await asyncio.gather(task_supervisor.drain(), session_registry.drain(STREAM_DRAIN_TIMEOUT_SECONDS))
+    await job_manager.stop()
+    # Requests still queued for a batch fail now instead of hanging on a stopped collector
+    await close_schedulers()
+    if LocalWhisperEngine._instance is not None:
+        # Stop the worker processes here rather than leaving them to interpreter teardown
+        await asyncio.to_thread(LocalWhisperEngine._instance.shutdown, True)
+    await asyncio.gather(close_hf_session(), close_download_client())
 
 async def create_application():
     logger.info("Creating application")
+    # REST mode never loads python-telegram-bot
+    from telegram.ext import Application, CommandHandler, MessageHandler, filters
+
     app = Application.builder().token(BOT_TOKEN).build()
 
     app.add_handler(CommandHandler("start", start))
@@ -87,6 +122,7 @@ async def create_application():
     app.add_handler(CommandHandler("detect", toggle_detection))
     app.add_handler(CommandHandler("reply", toggle_reply))
     app.add_handler(CommandHandler("voice", set_voice_type))
+    app.add_handler(CommandHandler("targets", set_targets))
     app.add_handler(CommandHandler("help", show_commands))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_handler(MessageHandler(filters.VOICE, handle_voice))
@@ -105,64 +141,104 @@ async def webhook_handler(request: Request):
         logger.error("Telegram app not initialized")
         return {"error": "Application not initialized"}
 
+    # A non-2xx makes Telegram redeliver the update, to this instance later or to the one replacing it
+    if task_supervisor.full:
+        logger.warning(f"Refusing update: {len(task_supervisor)} background tasks, draining: {task_supervisor.draining}")
+        return JSONResponse(status_code=503, content={"error": "Busy, retry later"})
+
     update_data = await request.json()
-    logger.info(f"Received update data: {update_data}")
+    logger.info("Received update %s", update_data.get("update_id"))
+    logger.debug("Update payload: %s", update_data)
     
-    # Create background task for processing
+    # Process in the background; the supervisor keeps the task alive and logs its failure
+    from telegram import Update
     update = Update.de_json(update_data, telegram_app.bot)
-    background_task = asyncio.create_task(process_update(update))
-    
-    # Add error handling for the background task
-    background_task.add_done_callback(lambda t: handle_background_task_result(t))
+    task_supervisor.spawn(process_update(update), "telegram_update")
     
     return {"ok": True}
 
-async def process_update(update: Update):
+async def process_update(update: "Update"):
     """Process the update in the background"""
-    try:
-        logger.info(f"Processing Update object in background: {update}")
-        await telegram_app.process_update(update)
-        logger.info("Successfully processed update in background")
-    except Exception as e:
-        logger.error(f"Error processing update in background: {e}", exc_info=True)
-        raise
+    with log_context(update_id=update.update_id):
+        try:
+            logger.info("Processing update in background")
+            await telegram_app.process_update(update)
+            logger.info("Successfully processed update in background")
+        except Exception as e:
+            logger.error(f"Error processing update in background: {e}", exc_info=True)
+            raise
 
-def handle_background_task_result(task):
-    """Handle any errors from the background task"""
-    try:
-        task.result()
-    except Exception as e:
-        logger.error(f"Background task failed: {e}", exc_info=True)
+@fastapi_app.get("/ready")
+async def readiness():
+    """Readiness probe: 503 until startup has finished and again once shutdown starts draining"""
+    engines = {
+        "anthropic": anthropic_service.warm,
+        "tts": is_loaded(pht.Client),
+        "audio_dsp": is_loaded(audio_dsp.signal),
+        "hf_inference": hf_session_open(),
+        "whisper_local": LocalWhisperEngine._instance is not None,
+        "telegram": telegram_app is not None,
+    }
+    return JSONResponse(
+        status_code=200 if ready and not task_supervisor.draining else 503,
+        content={"ready": ready and not task_supervisor.draining, "engines": engines, "warmup": warmup.results, "lazy_imports_ms": lazy_import_stats(),
+                 "static_assets": static_assets.stats()},
+    )
+
+@fastapi_app.get("/metrics")
+async def metrics():
+    """Per-stage latency histograms and request counters in Prometheus text format"""
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Include the API router before the catch-all below, which would otherwise shadow its GET routes
+fastapi_app.include_router(api_router)
 
-@fastapi_app.get("/{full_path:path}")
-async def serve_angular(full_path: str):
+@fastapi_app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+async def serve_angular(full_path: str, request: Request):
     # Skip API routes
     if full_path.startswith("api/") or full_path == WEBHOOK_PATH.lstrip("/"):
         raise HTTPException(status_code=404, detail="Not found")
-    
-    # For static assets (.js, .css, etc), serve them directly with correct MIME type
-    angular_dir = Path("./universal-translator/dist/universal-translator")
-    requested_file = angular_dir / full_path
-    
-    if requested_file.exists() and requested_file.is_file():
-        # If the file exists, serve it directly
-        if full_path.endswith('.js'):
-            return FileResponse(requested_file, media_type="application/javascript")
-        elif full_path.endswith('.css'):
-            return FileResponse(requested_file, media_type="text/css")
-        elif full_path.endswith('.ico'):
-            return FileResponse(requested_file, media_type="image/x-icon")
-        else:
-            # For other file types, let FastAPI guess the MIME type
-            return FileResponse(requested_file)
-    else:
-        logger.warning(f"Angular index.html not found at {requested_file}")
+
+    if not static_assets.loaded:
         return {"error": "Frontend not available"}
 
+    # Files by path, client-side routes get index.html; a missing file with an extension is a real 404
+    asset = static_assets.lookup(full_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return static_assets.response(request, asset)
+
 @fastapi_app.get("/")
 async def health_check():
     return {"status": "ok"}
 
+class CorrelateRequests:
+    """Every record logged while handling a request (and by tasks it starts) carries its id.
+
+    Pure ASGI rather than @app.middleware("http"): that one leaves the context as soon as the
+    endpoint returns, before a StreamingResponse (SSE, job events) has produced its body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = header or uuid.uuid4().hex[:16]
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        with log_context(request_id=request_id):
+            await self.app(scope, receive, send_with_id)
+
+fastapi_app.add_middleware(CorrelateRequests)
+
 # Add CORS middleware
 fastapi_app.add_middleware(
     CORSMiddleware,
@@ -172,9 +248,6 @@ fastapi_app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include the API router
-fastapi_app.include_router(api_router)
-
 def main():
     try:
         logger.info("Starting application initialization...")
@@ -1,14 +1,34 @@
 import logging
 from app.config import ANTHROPIC_API_KEY
-from anthropic.types import TextBlock, Message
-from anthropic import Anthropic
+from app.service.lazy_import import LazyImport
+from app.service.metrics import MODEL_SECONDS
 from app.service.prompts.prompts import PROMPTS
 import asyncio
+import time
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from anthropic.types import TextBlock, Message
+
+# The SDK takes well over a second to import, so it's loaded when the first client is created
+Anthropic = LazyImport("anthropic", "Anthropic")
+AsyncAnthropic = LazyImport("anthropic", "AsyncAnthropic")
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=256)
+def format_prompt(prompt_key: str, locale: str, language: str, conversation_type: str,
+                  user_gender: str, recipient_gender: str) -> str:
+    """System prompt for one target; formatted once per distinct combination"""
+    return PROMPTS.get(prompt_key, "").format(
+        locale=locale,
+        language=language,
+        conversation_type=conversation_type,
+        user_gender=user_gender,
+        recipient_gender=recipient_gender
+    )
+
 class AnthropicService:
     sonnet_35_20240620 = "claude-3-5-sonnet-20240620"
     sonnet_35_20241022 = "claude-3-5-sonnet-20241022"
@@ -20,21 +40,52 @@ class AnthropicService:
                  conversation_type: str = "romantic",  # Default conversation type
                  user_gender: str = "male",  # Default user gender
                  recipient_gender: str = "female"):  # Default recipient gender
-        self.client = Anthropic(api_key=ANTHROPIC_API_KEY)  # Initialize the Anthropic client
+        self._client = None
+        self._async_client = None
         self.locale = locale
         self.language = language
         self.conversation_type = conversation_type
         self.user_gender = user_gender
         self.recipient_gender = recipient_gender
 
-    async def get_response(self, prompt_key: str = "translate", user_input: str = "") -> str:
-        system_prompt = PROMPTS.get(prompt_key, "").format(
-            locale=self.locale,
-            language=self.language,
-            conversation_type=self.conversation_type,
-            user_gender=self.user_gender,
-            recipient_gender=self.recipient_gender
-        )  # Format the prompt with the instance variables
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = Anthropic(api_key=ANTHROPIC_API_KEY)  # Initialize the Anthropic client
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            self._async_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)  # Streaming and fan-out paths
+        return self._async_client
+
+    @property
+    def warm(self) -> bool:
+        return self._client is not None or self._async_client is not None
+
+    def _default_locale(self, language: Optional[str] = None) -> str:
+        return self.locale if not language or language == self.language else language
+
+    def _system_prompt(self, prompt_key: str, language: Optional[str] = None, locale: Optional[str] = None) -> str:
+        # The instance settings are the defaults; language and locale can be overridden per request.
+        # The default locale only fits the default language, so another language without a locale
+        # is written for the language itself rather than for the default city's idioms.
+        return format_prompt(
+            prompt_key,
+            locale or self._default_locale(language),
+            language or self.language,
+            self.conversation_type,
+            self.user_gender,
+            self.recipient_gender
+        )
+
+    async def get_response(self, prompt_key: str = "translate", user_input: str = "",
+                           language: Optional[str] = None, locale: Optional[str] = None,
+                           cancellable: bool = False) -> str:
+        # cancellable: use the async client, so cancelling the caller aborts the request instead of a thread
+        system_prompt = self._system_prompt(prompt_key, language, locale)
+        create = self._create_async if cancellable else self._create
         
         if not system_prompt or not user_input:
             logger.error(f"missing system prompt: {prompt_key} or user input: {user_input}")
@@ -43,20 +94,7 @@ class AnthropicService:
         try:
             # Try with the primary model
             try:
-                # Run the API call in a thread pool since it's blocking
-                result: Message = await asyncio.to_thread(
-                    self.client.messages.create,
-                    max_tokens=150,
-                    model=self.sonnet_37_20250219,
-                    system=system_prompt,
-                    temperature=0.2,
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": user_input
-                        }
-                    ]
-                )
+                result: Message = await create(self.sonnet_37_20250219, system_prompt, user_input)
                 content: list[TextBlock] = result.content
                 return content[0].text
             except Exception as primary_model_error:
@@ -64,11 +102,83 @@ class AnthropicService:
                 logger.warning(f"Primary model failed: {str(primary_model_error)}. Trying fallback model.")
                 
                 # Try with the fallback model
-                result: Message = await asyncio.to_thread(
-                    self.client.messages.create,
+                result: Message = await create(self.sonnet_35_20241022, system_prompt, user_input)
+                content: list[TextBlock] = result.content
+                return content[0].text
+        except Exception as e:
+            logger.error(f"Error getting response from Anthropics API (both models failed): {str(e)}")
+            return ""
+
+    async def _create(self, model: str, system_prompt, user_input: str) -> "Message":
+        # Run the API call in a thread pool since it's blocking; timed per model so fallbacks show up in /metrics
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await asyncio.to_thread(
+                self.client.messages.create,
+                max_tokens=150,
+                model=model,
+                system=system_prompt,
+                temperature=0.2,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": user_input
+                    }
+                ]
+            )
+            outcome = "ok"
+            return result
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+    async def _create_async(self, model: str, system_prompt, user_input: str) -> "Message":
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self.async_client.messages.create(
+                max_tokens=150,
+                model=model,
+                system=system_prompt,
+                temperature=0.2,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": user_input
+                    }
+                ]
+            )
+            outcome = "ok"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            MODEL_SECONDS.observe(time.perf_counter() - started, model=model, outcome=outcome)
+
+    async def stream_response(self, prompt_key: str = "translate", user_input: str = "",
+                              language: Optional[str] = None, locale: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Yield {"type": "delta", "text"} events as the response is generated, then one {"type": "done"} event
+        with the model, token usage, prompt cache hit and latency breakdown.
+
+        The system prompt is marked cacheable, so repeated requests with the same settings read it from
+        Anthropic's prompt cache. The fallback model is only tried if the primary fails before producing any
+        text. Closing the generator (e.g. when the client disconnects) closes the upstream stream, which
+        stops generation.
+        """
+        system_prompt = self._system_prompt(prompt_key, language, locale)
+        if not system_prompt or not user_input:
+            logger.error(f"missing system prompt: {prompt_key} or user input: {user_input}")
+            raise ValueError("Missing prompt or input")
+
+        started = time.perf_counter()
+        for model in (self.sonnet_37_20250219, self.sonnet_35_20241022):
+            first_token = None
+            try:
+                async with self.async_client.messages.stream(
                     max_tokens=150,
-                    model=self.sonnet_35_20241022,
-                    system=system_prompt,
+                    model=model,
+                    system=[{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}],
                     temperature=0.2,
                     messages=[
                         {
@@ -76,10 +186,63 @@ class AnthropicService:
                             "content": user_input
                         }
                     ]
-                )
-                content: list[TextBlock] = result.content
-                return content[0].text
-        except Exception as e:
-            logger.error(f"Error getting response from Anthropics API (both models failed): {str(e)}")
-            return ""
+                ) as stream:
+                    async for text in stream.text_stream:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        yield {"type": "delta", "text": text}
+                    message: Message = await stream.get_final_message()
+            except Exception as e:
+                if first_token is not None or model == self.sonnet_35_20241022:
+                    logger.error(f"Streaming response from {model} failed: {str(e)}")
+                    raise
+                logger.warning(f"Primary model failed: {str(e)}. Trying fallback model.")
+                continue
 
+            finished = time.perf_counter()
+            cache_read = message.usage.cache_read_input_tokens or 0
+            yield {
+                "type": "done",
+                "model": message.model,
+                "stop_reason": message.stop_reason,
+                "cache_hit": cache_read > 0,
+                "usage": {
+                    "input_tokens": message.usage.input_tokens,
+                    "output_tokens": message.usage.output_tokens,
+                    "cache_read_input_tokens": cache_read,
+                    "cache_creation_input_tokens": message.usage.cache_creation_input_tokens or 0,
+                },
+                "latency_ms": {
+                    "first_token": round(((first_token or finished) - started) * 1000, 1),
+                    "generation": round((finished - (first_token or finished)) * 1000, 1),
+                    "total": round((finished - started) * 1000, 1),
+                },
+            }
+            return
+
+    async def translate_many(self, user_input: str, targets: List[Dict[str, str]]) -> AsyncIterator[Dict]:
+        """Translate one input into every target ({"language", "locale"}) concurrently.
+
+        Yields {"language", "locale", "translated_text", "latency_ms"} as each target finishes, fastest first;
+        a failed target has an empty translated_text. Closing the generator cancels the targets still running.
+        """
+        started = time.perf_counter()
+
+        async def translate(target: Dict[str, str]) -> Dict:
+            language = target.get("language") or self.language
+            locale = target.get("locale")
+            text = await self.get_response(user_input=user_input, language=language, locale=locale, cancellable=True)
+            return {
+                "language": language,
+                "locale": locale or self._default_locale(language),
+                "translated_text": text,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+
+        tasks = [asyncio.create_task(translate(target)) for target in targets]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
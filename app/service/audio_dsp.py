@@ -0,0 +1,196 @@
+import asyncio
+from io import BytesIO
+import logging
+from math import gcd
+import struct
+from typing import Tuple
+import wave
+
+import numpy as np
+
+from app.service.lazy_import import LazyImport
+
+# scipy.signal takes over a second to import; only the resampling/filter path needs it
+signal = LazyImport("scipy.signal")
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+HIGHPASS_HZ = 100
+LOWPASS_HZ = 8000
+# Same headroom as pydub's AudioSegment.normalize()
+NORMALIZE_HEADROOM_DB = 0.1
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UnsupportedAudioFormat(ValueError):
+    """Raised when audio can't be decoded in-process and needs ffmpeg."""
+
+
+def decode_wav(data: bytes) -> Tuple[np.ndarray, int]:
+    """Decode a RIFF/WAVE file into float32 samples shaped (frames, channels) and its sample rate."""
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise UnsupportedAudioFormat("not a RIFF/WAVE file")
+
+    fmt = None
+    payload = None
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk_id, chunk_size = struct.unpack_from("<4sI", data, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                # The real format tag is the first two bytes of the SubFormat GUID
+                fmt = (struct.unpack_from("<H", data, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            # Streamed WAVs often leave the data size at 0 or 0xFFFFFFFF; read to the end
+            end = body + chunk_size if 0 < chunk_size <= len(data) - body else len(data)
+            payload = data[body:end]
+        if fmt is not None and payload is not None:
+            break
+        offset = body + chunk_size + (chunk_size & 1)
+
+    if fmt is None or payload is None:
+        raise UnsupportedAudioFormat("WAV file without fmt or data chunk")
+
+    format_tag, channels, sample_rate, _, _, bits = fmt
+    if channels < 1:
+        raise UnsupportedAudioFormat("WAV file without channels")
+    if format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+        samples = _decode_pcm(payload, bits)
+    elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+        dtype = np.float32 if bits == 32 else np.float64
+        usable = len(payload) - len(payload) % (bits // 8)
+        samples = np.frombuffer(payload[:usable], dtype=f"<{np.dtype(dtype).char}").astype(np.float32)
+    else:
+        raise UnsupportedAudioFormat(f"unsupported WAV encoding (format {format_tag:#x}, {bits} bits)")
+
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels), sample_rate
+
+
+def _decode_pcm(payload: bytes, bits: int) -> np.ndarray:
+    width = bits // 8
+    usable = len(payload) - len(payload) % width
+    raw = np.frombuffer(payload[:usable], dtype=np.uint8)
+    if bits == 8:
+        return (raw.astype(np.float32) - 128.0) / 128.0
+    if bits == 24:
+        # Sign-extend three little-endian bytes into the top of an int32
+        triples = raw.reshape(-1, 3).astype(np.int32)
+        ints = (triples[:, 0] << 8) | (triples[:, 1] << 16) | (triples[:, 2] << 24)
+        return ints.astype(np.float32) / 2147483648.0
+    dtype = "<i2" if bits == 16 else "<i4"
+    return np.frombuffer(payload[:usable], dtype=dtype).astype(np.float32) / float(2 ** (bits - 1))
+
+
+def decode_pcm16(data: bytes, channels: int = 1) -> np.ndarray:
+    """Decode raw little-endian 16-bit PCM into float32 samples shaped (frames, channels)."""
+    samples = _decode_pcm(data, 16)
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels)
+
+
+def to_mono(samples: np.ndarray) -> np.ndarray:
+    if samples.ndim == 1:
+        return samples
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def biquad_sos(kind: str, cutoff: float, sample_rate: int, q: float = 0.7071) -> np.ndarray:
+    """RBJ cookbook high/low-pass biquad as a single second-order section."""
+    w0 = 2 * np.pi * cutoff / sample_rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    if kind == "highpass":
+        b = np.array([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2])
+    elif kind == "lowpass":
+        b = np.array([(1 - cos_w0) / 2, 1 - cos_w0, (1 - cos_w0) / 2])
+    else:
+        raise ValueError(f"unknown biquad type: {kind}")
+    a = np.array([1 + alpha, -2 * cos_w0, 1 - alpha])
+    return np.concatenate([b / a[0], a / a[0]])
+
+
+def band_limit(samples: np.ndarray, sample_rate: int, highpass: float = HIGHPASS_HZ, lowpass: float = LOWPASS_HZ) -> np.ndarray:
+    """Apply the high-pass and (when below Nyquist) low-pass biquads in one cascaded pass."""
+    sections = [biquad_sos("highpass", highpass, sample_rate)]
+    # At or above ~Nyquist the low-pass is a no-op; the resampler's anti-alias filter covers it
+    if lowpass < 0.45 * sample_rate:
+        sections.append(biquad_sos("lowpass", lowpass, sample_rate))
+    return signal.sosfilt(np.vstack(sections), samples).astype(np.float32)
+
+
+def resample(samples: np.ndarray, sample_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Polyphase resampling by the reduced rational factor target_rate / sample_rate."""
+    if sample_rate == target_rate:
+        return samples
+    divisor = gcd(sample_rate, target_rate)
+    return signal.resample_poly(samples, target_rate // divisor, sample_rate // divisor).astype(np.float32)
+
+
+def normalize(samples: np.ndarray, headroom_db: float = NORMALIZE_HEADROOM_DB) -> np.ndarray:
+    """Scale so the peak sits headroom_db below full scale."""
+    peak = np.max(np.abs(samples)) if len(samples) else 0.0
+    if peak == 0:
+        return samples
+    return samples * np.float32(10 ** (-headroom_db / 20) / peak)
+
+
+def process(samples: np.ndarray, sample_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Mono, band-limit, resample and normalize decoded samples."""
+    mono = to_mono(samples)
+    filtered = band_limit(mono, sample_rate)
+    return normalize(resample(filtered, sample_rate, target_rate))
+
+
+def decode_and_process(data: bytes) -> np.ndarray:
+    samples, sample_rate = decode_wav(data)
+    return process(samples, sample_rate)
+
+
+def can_decode_natively(data: bytes) -> bool:
+    return data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+async def decode_with_ffmpeg(data: bytes, target_rate: int = TARGET_SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """Decode any container ffmpeg understands into mono float32 at target_rate."""
+    ffmpeg = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(target_rate), "pipe:1",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await ffmpeg.communicate(data)
+    if ffmpeg.returncode != 0:
+        raise UnsupportedAudioFormat(f"ffmpeg failed: {stderr.decode(errors='replace')[:200]}")
+    return np.frombuffer(stdout, dtype=np.float32), target_rate
+
+
+async def load_audio(data: bytes) -> np.ndarray:
+    """Decode and preprocess audio to mono float32 at 16kHz, using ffmpeg only for codecs we can't decode."""
+    data = bytes(data)
+    if can_decode_natively(data):
+        try:
+            return await asyncio.to_thread(decode_and_process, data)
+        except UnsupportedAudioFormat as e:
+            logger.info(f"Falling back to ffmpeg: {str(e)}")
+    samples, sample_rate = await decode_with_ffmpeg(data)
+    return await asyncio.to_thread(process, samples, sample_rate)
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int = TARGET_SAMPLE_RATE) -> bytes:
+    """Encode mono float samples as 16-bit PCM WAV."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return buffer.getvalue()
@@ -1,19 +1,50 @@
+from __future__ import annotations
+
 import asyncio
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
 import logging
+import multiprocessing
 import os
 from enum import Enum
+from pathlib import Path
 import re
-from huggingface_hub import InferenceClient
-from app.config import HF_TOKEN
-from pydub import AudioSegment
-from typing import Optional
-from telegram.ext import ContextTypes
-from langdetect import detect
+import struct
+import threading
+import time
+from app.service.hf_inference import HFInferenceClient
+from app.service.logging_setup import configure_logging
+from app.service.transcription_cache import transcription_cache
+from app.config import (
+    HF_TOKEN,
+    WHISPER_COMPUTE_TYPE,
+    WHISPER_CPU_THREADS,
+    WHISPER_LANGUAGES,
+    WHISPER_MODEL_MEMORY_MB,
+    WHISPER_MODEL_PATH,
+    WHISPER_PRELOAD_MODELS,
+    WHISPER_WORKERS,
+)
+from app.service.audio_dsp import TARGET_SAMPLE_RATE, can_decode_natively, encode_wav, load_audio
+import numpy as np
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Union
+from app.service.lazy_import import LazyImport
+
+if TYPE_CHECKING:
+    from telegram import File
+    from telegram.ext import ContextTypes
+
+# Imported on first use so cold starts don't pay for engines a request may never touch
+av = LazyImport("av")
+httpx = LazyImport("httpx")
+InferenceClient = LazyImport("huggingface_hub", "InferenceClient")
+detect = LazyImport("langdetect", "detect")
 
 # Only import whisper-related modules if in prod
 if os.getenv('ENV') == 'prod':
-    from faster_whisper import WhisperModel
+    WhisperModel = LazyImport("faster_whisper", "WhisperModel")
 else:
     WhisperModel = None  # type: ignore
 
@@ -23,24 +54,33 @@ class TranscriptionMode(Enum):
     LOCAL = "local"
     HF = "hf"
 
+def whisper_model_path(model_name: str) -> str:
+    return os.path.join(WHISPER_MODEL_PATH, model_name)
+
+def parse_model_spec(spec: str) -> Tuple[str, str]:
+    """Turn a "name[:compute_type]" preload entry into (model_path, compute_type)."""
+    name, _, compute_type = spec.partition(":")
+    return whisper_model_path(name), compute_type or WHISPER_COMPUTE_TYPE
+
+@dataclass
+class Transcription:
+    text: str
+    language: Optional[str] = None
+    model: Optional[str] = None
+
 class WhisperHandler:
     def __init__(self, mode: TranscriptionMode, model_name: str = "base"):
         self.mode = mode
         # Only use local models if ENV=prod
         if mode == TranscriptionMode.LOCAL.value and os.getenv('ENV') == 'prod':
-            WHISPER_MODEL_PATH = os.environ.get("WHISPER_MODEL_PATH", f"/data/models/{model_name}")
-            WHISPER_COMPUTE_TYPE = os.environ.get("WHISPER_COMPUTE_TYPE", "int8")
-            WHISPER_CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", "16"))
+            self.model_path = whisper_model_path(model_name)
+            self.compute_type = WHISPER_COMPUTE_TYPE
             
-            logger.info(f"WHISPER_MODEL_PATH: {WHISPER_MODEL_PATH}")
-            logger.info(f"WHISPER_COMPUTE_TYPE: {WHISPER_COMPUTE_TYPE}")
-            logger.info(f"WHISPER_CPU_THREADS: {WHISPER_CPU_THREADS}")
+            logger.info(f"Whisper model path: {self.model_path}")
+            logger.info(f"WHISPER_COMPUTE_TYPE: {self.compute_type}")
             
-            self.model = WhisperModelSingleton.get_instance(
-                WHISPER_MODEL_PATH, 
-                WHISPER_COMPUTE_TYPE, 
-                WHISPER_CPU_THREADS
-            )
+            # Models are loaded inside the pool's worker processes, not on the event loop
+            self.engine = LocalWhisperEngine.get_instance()
         else:
             # Default to API mode if not prod or not LOCAL mode
             if model_name == 'small':
@@ -51,10 +91,7 @@ class WhisperHandler:
                 model = "openai/whisper-small"  # Default to small if unspecified
             
             logger.info(f"Using HuggingFace API with model: {model}")
-            self.client = InferenceClient(
-                model,
-                token=HF_TOKEN
-            )
+            self.client = HFInferenceClient(model, token=HF_TOKEN)
 
     async def cloneAudioTTS(self, context: ContextTypes.DEFAULT_TYPE, text: str, input_audio):
         client = InferenceClient(token=HF_TOKEN)
@@ -72,12 +109,108 @@ class WhisperHandler:
         
         return result
 
+    @property
+    def local(self) -> bool:
+        return self.mode == TranscriptionMode.LOCAL.value and os.getenv('ENV') == 'prod'
+
+    def cache_variant(self, detect_language: bool) -> str:
+        """Part of every cache key, so results are only shared between identical configurations."""
+        if self.local:
+            return transcription_cache.variant("local", self.model_path, detect_language)
+        # The HF endpoint doesn't take a language hint, so detection doesn't change its output
+        return transcription_cache.variant("hf", self.client.model, False)
+
     async def transcribe_voice(self, voice_data: bytearray, detect_language: bool = False) -> str:
-        # processed_data = await preprocess_audio(voice_data)
-        
+        transcription = await self.transcribe(voice_data, detect_language)
+        return transcription.text
+
+    async def transcribe(
+        self,
+        voice_data: bytearray,
+        detect_language: bool = False,
+        samples: Optional[np.ndarray] = None,
+        cache: bool = True,
+    ) -> Transcription:
+        """Transcribe audio, returning the text along with the detected language and producing model.
+
+        samples may carry the already decoded 16kHz PCM (see download_voice) to skip decoding in local mode.
+        Identical audio is answered from the transcription cache unless cache is False (one-off audio such
+        as partial-transcript prefixes, which would only evict useful entries).
+        """
+        key = transcription_cache.content_key(bytes(voice_data), self.cache_variant(detect_language)) if cache else None
+        cached = transcription_cache.get(key) if cache else None
+        if cached is not None:
+            logger.info(f"Transcription cache hit for {key}")
+            return cached
+
         if self.mode == TranscriptionMode.LOCAL.value and os.getenv('ENV') == 'prod':
-            return await self._transcribe_local(voice_data, detect_language)
-        return await self._transcribe_hf(voice_data)
+            transcription = await self._transcribe_local(voice_data, detect_language, samples)
+        else:
+            transcription = Transcription(text=await self._transcribe_hf(voice_data), model=self.client.model)
+
+        if transcription.text and cache:
+            transcription_cache.put([key], transcription)
+        return transcription
+
+    async def transcribe_batch(
+        self, items: List[Tuple[bytearray, bool, Optional[np.ndarray]]], cache: Optional[List[bool]] = None
+    ) -> List[Transcription]:
+        """Transcribe (voice_data, detect_language, samples) items together.
+
+        Local mode runs the cache misses as one batched inference in a worker; HF mode
+        sends them as concurrent requests over the pooled session. cache optionally
+        gives the per-item cache flag of transcribe().
+        """
+        cache = cache or [True] * len(items)
+        if not (self.mode == TranscriptionMode.LOCAL.value and os.getenv('ENV') == 'prod') or len(items) == 1:
+            return list(await asyncio.gather(*(self.transcribe(*item, cache=use) for item, use in zip(items, cache))))
+
+        results: List[Optional[Transcription]] = []
+        keys = []
+        for (voice_data, detect_language, _), use in zip(items, cache):
+            keys.append(transcription_cache.content_key(bytes(voice_data), self.cache_variant(detect_language)) if use else None)
+            results.append(transcription_cache.get(keys[-1]) if use else None)
+
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            batch = []
+            for i in misses:
+                voice_data, detect_language, samples = items[i]
+                audio = bytes(voice_data) if samples is None else samples
+                if samples is None and can_decode_natively(audio):
+                    audio = await load_audio(audio)
+                batch.append((audio, None if detect_language else WHISPER_LANGUAGES))
+            try:
+                transcriptions = await self.engine.transcribe_batch(batch, self.model_path, self.compute_type)
+            except Exception as e:
+                logger.error(f"Local batch transcription error: {str(e)}", exc_info=True)
+                transcriptions = [Transcription(text="", model=self.model_path) for _ in misses]
+            for i, transcription in zip(misses, transcriptions):
+                results[i] = transcription
+                if transcription.text and cache[i]:
+                    transcription_cache.put([keys[i]], transcription)
+        return results
+
+    async def _transcribe_local(
+        self, voice_data: bytearray, detect_language: bool, samples: Optional[np.ndarray] = None
+    ) -> Transcription:
+        """Transcribe audio with faster-whisper in the local worker pool."""
+        logger.info(f"Transcribing locally, data size: {len(voice_data)} bytes")
+        # With detection off, only the configured languages are considered
+        languages = None if detect_language else WHISPER_LANGUAGES
+        try:
+            # WAV/PCM is decoded and resampled here with NumPy; anything else is decoded by the worker
+            audio = bytes(voice_data) if samples is None else samples
+            if samples is None and can_decode_natively(audio):
+                audio = await load_audio(audio)
+            transcription = await self.engine.transcribe(
+                audio, self.model_path, self.compute_type, languages
+            )
+            logger.info(f"Local transcription done, language: {transcription.language}")
+            return transcription
+        except Exception as e:
+            logger.error(f"Local transcription error: {str(e)}", exc_info=True)
+            return Transcription(text="", model=self.model_path)
 
     async def _transcribe_hf(self, voice_data: bytearray) -> str:
         """Transcribe audio using Hugging Face API."""
@@ -88,51 +221,452 @@ class WhisperHandler:
                 logger.warning("Audio data too small, might not be valid")
                 return ""
             
-            # Try direct method first (with explicit bytes conversion)
-            try:
-                return self.client.automatic_speech_recognition(bytes(voice_data)).text
-            except ValueError as e:
-                # If direct method fails, immediately fall back to file-based method
-                logger.info("Direct API call failed, falling back to file-based method")
-                import io
-                from huggingface_hub.utils import temp_file_manager
-                
-                # Save to a temporary file which the API can read
-                with temp_file_manager() as temp_path:
-                    with open(temp_path, "wb") as f:
-                        f.write(voice_data)
-                    
-                    # Try transcription with file path
-                    return self.client.automatic_speech_recognition(temp_path).text
+            # Bytes go straight to the endpoint with their sniffed content type
+            return await self.client.automatic_speech_recognition(bytes(voice_data))
             
         except Exception as e:
             logger.error(f"Transcription error: {str(e)}")
             return ""  # Return empty string on error
 
-class WhisperModelSingleton:
-    _instance: Optional[WhisperModel] = None
-    _model_path: Optional[str] = None
+class LocalWhisperEngine:
+    """Runs faster-whisper in a pool of worker processes so inference never blocks the event loop."""
+    _instance: Optional["LocalWhisperEngine"] = None
+
+    def __init__(self, workers: int = WHISPER_WORKERS, cpu_threads: int = WHISPER_CPU_THREADS):
+        self.workers = max(1, workers)
+        # Split the CPU budget so workers don't oversubscribe cores
+        self.threads_per_worker = max(1, cpu_threads // self.workers)
+        logger.info(f"Starting local whisper pool: {self.workers} workers x {self.threads_per_worker} threads")
+        # CTranslate2 is not fork-safe once its thread pool exists, so always spawn
+        context = multiprocessing.get_context("spawn")
+        # Held by fan-out calls until every worker has one, so N calls land on N distinct processes
+        self._barrier = context.Barrier(self.workers)
+        self._fan_out_lock = asyncio.Lock()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker, WHISPER_PRELOAD_MODELS, self._barrier),
+        )
 
     @classmethod
-    def get_instance(cls, model_path: str, compute_type: str = "int8", cpu_threads: int = 16):
-        if cls._instance is None or cls._model_path != model_path:
-            cls._model_path = model_path
-            cls._instance = WhisperModel(
-                model_path,
-                device="cpu",
-                compute_type=compute_type,
-                cpu_threads=cpu_threads
-            )
+    def get_instance(cls) -> "LocalWhisperEngine":
+        if cls._instance is None:
+            cls._instance = cls()
         return cls._instance
 
+    async def transcribe(
+        self,
+        audio: Union[bytes, np.ndarray],
+        model_path: str,
+        compute_type: str = WHISPER_COMPUTE_TYPE,
+        languages: Optional[List[str]] = None,
+    ) -> Transcription:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, _transcribe_in_worker, audio, model_path, compute_type, languages
+        )
+
+    async def transcribe_batch(
+        self,
+        batch: List[Tuple[Union[bytes, np.ndarray], Optional[List[str]]]],
+        model_path: str,
+        compute_type: str = WHISPER_COMPUTE_TYPE,
+    ) -> List[Transcription]:
+        """Transcribe (audio, languages) pairs in a single worker call."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, _transcribe_batch_in_worker, batch, model_path, compute_type
+        )
+
+    async def preload(self) -> List[Dict]:
+        """Start every worker (each preloads WHISPER_PRELOAD_MODELS in _init_worker) and return their model stats."""
+        return await self.model_stats()
+
+    async def model_stats(self) -> List[Dict]:
+        """Load time and resident size of the models cached in each worker."""
+        results = await self.on_every_worker(_worker_model_stats)
+        return list({stats["pid"]: stats for stats in results}.values())
+
+    async def warm(self, audio: np.ndarray, model_path: str, compute_type: str = WHISPER_COMPUTE_TYPE):
+        """Transcribe audio once in every worker so each process has allocated its inference buffers."""
+        await self.on_every_worker(_transcribe_in_worker, audio, model_path, compute_type, None)
+
+    async def on_every_worker(self, fn, *args) -> List:
+        """fn(*args) once per worker process; the executor spawns workers that aren't running yet."""
+        loop = asyncio.get_running_loop()
+        async with self._fan_out_lock:
+            try:
+                return await asyncio.gather(*(
+                    loop.run_in_executor(self._executor, _on_worker, fn, *args) for _ in range(self.workers)
+                ))
+            finally:
+                if self._barrier.broken:
+                    self._barrier.reset()
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        LocalWhisperEngine._instance = None
+
+# How long a fan-out call waits for its siblings; a worker may be busy with a long transcription
+WORKER_BARRIER_TIMEOUT_SECONDS = 30
+
+# Set in each pool worker by _init_worker
+_worker_cpu_threads = 1
+_worker_barrier = None
+
+def _init_worker(cpu_threads: int, preload_models: List[str], barrier=None):
+    global _worker_cpu_threads, _worker_barrier
+    _worker_cpu_threads = cpu_threads
+    _worker_barrier = barrier
+    configure_logging()
+    for spec in preload_models:
+        model_path, compute_type = parse_model_spec(spec)
+        try:
+            WhisperModelCache.get(model_path, compute_type, cpu_threads)
+        except Exception as e:
+            logger.error(f"Failed to preload whisper model {spec}: {str(e)}")
+
+def _on_worker(fn, *args):
+    """Runs inside a pool worker process: holds it until every worker has taken one of these calls."""
+    if _worker_barrier is not None:
+        try:
+            _worker_barrier.wait(WORKER_BARRIER_TIMEOUT_SECONDS)
+        except threading.BrokenBarrierError:
+            logger.warning(f"Not every whisper worker was free within {WORKER_BARRIER_TIMEOUT_SECONDS}s")
+    return fn(*args)
+
+def _worker_model_stats() -> Dict:
+    """Runs inside a pool worker process."""
+    return {"pid": os.getpid(), "models": WhisperModelCache.stats()}
+
+def _transcribe_in_worker(
+    audio: Union[bytes, np.ndarray], model_path: str, compute_type: str, languages: Optional[List[str]]
+) -> Transcription:
+    """Runs inside a pool worker process. Arrays are expected as mono float32 at 16kHz."""
+    from faster_whisper import decode_audio
+
+    model = WhisperModelCache.get(model_path, compute_type, _worker_cpu_threads)
+    if isinstance(audio, np.ndarray):
+        samples = audio
+    else:
+        samples = decode_audio(BytesIO(audio), sampling_rate=TARGET_SAMPLE_RATE)
+
+    language = None
+    if languages and len(languages) == 1:
+        language = languages[0]
+    elif languages:
+        # Restrict detection to the allowed languages instead of all of Whisper's
+        _, _, all_probs = model.detect_language(samples)
+        probs = dict(all_probs)
+        language = max(languages, key=lambda lang: probs.get(lang, 0.0))
+
+    segments, info = model.transcribe(samples, language=language, beam_size=5)
+    text = " ".join(segment.text.strip() for segment in segments).strip()
+    return Transcription(text=text, language=info.language, model=model_path)
+
+def _transcribe_batch_in_worker(
+    batch: List[Tuple[Union[bytes, np.ndarray], Optional[List[str]]]], model_path: str, compute_type: str
+) -> List[Transcription]:
+    """Runs inside a pool worker process.
+
+    Clips that fit in one 30s window share a single encoder pass and a single batched
+    decode, each with its own language token. Longer clips need Whisper's sequential
+    windowing and go through the regular path.
+    """
+    from faster_whisper import decode_audio
+    from faster_whisper.audio import pad_or_trim
+    from faster_whisper.tokenizer import Tokenizer
+    from faster_whisper.transcribe import get_suppressed_tokens
+
+    model = WhisperModelCache.get(model_path, compute_type, _worker_cpu_threads)
+    results: List[Optional[Transcription]] = [None] * len(batch)
+    short = []
+    for i, (audio, languages) in enumerate(batch):
+        samples = audio if isinstance(audio, np.ndarray) else decode_audio(BytesIO(audio), sampling_rate=TARGET_SAMPLE_RATE)
+        if len(samples) > model.feature_extractor.n_samples:
+            results[i] = _transcribe_in_worker(samples, model_path, compute_type, languages)
+        else:
+            short.append((i, samples, languages))
+
+    if short:
+        features = np.stack([pad_or_trim(model.feature_extractor(samples)) for _, samples, _ in short])
+        encoder_output = model.encode(features)
+        if model.model.is_multilingual:
+            detected = model.model.detect_language(encoder_output)
+        else:
+            detected = [[("<|en|>", 1.0)]] * len(short)
+
+        tokenizers = []
+        for (_, _, languages), language_probs in zip(short, detected):
+            probs = {token[2:-2]: prob for token, prob in language_probs}
+            if languages and len(languages) == 1:
+                language = languages[0]
+            elif languages:
+                language = max(languages, key=lambda lang: probs.get(lang, 0.0))
+            else:
+                language = max(probs, key=probs.get)
+            tokenizers.append(
+                Tokenizer(model.hf_tokenizer, model.model.is_multilingual, task="transcribe", language=language)
+            )
+
+        outputs = model.model.generate(
+            encoder_output,
+            [model.get_prompt(tokenizer, [], without_timestamps=True) for tokenizer in tokenizers],
+            beam_size=5,
+            max_length=model.max_length,
+            suppress_blank=True,
+            suppress_tokens=get_suppressed_tokens(tokenizers[0], [-1]),
+            return_no_speech_prob=True,
+        )
+        for (i, _, _), tokenizer, output in zip(short, tokenizers, outputs):
+            # Same silence cut-off faster-whisper applies by default (no_speech_threshold)
+            text = "" if output.no_speech_prob > 0.6 else tokenizer.decode(output.sequences_ids[0]).strip()
+            results[i] = Transcription(text=text, language=tokenizer.language_code, model=model_path)
+
+    return results
+
+@dataclass
+class CachedWhisperModel:
+    model: "WhisperModel"
+    load_seconds: float
+    resident_bytes: int
+    last_used: float
+
+class WhisperModelCache:
+    """Per-process LRU cache of loaded Whisper models, bounded by WHISPER_MODEL_MEMORY_MB."""
+    _models: "OrderedDict[Tuple[str, str], CachedWhisperModel]" = OrderedDict()
+    budget_bytes: int = WHISPER_MODEL_MEMORY_MB * 1024 * 1024
+
+    @classmethod
+    def get(cls, model_path: str, compute_type: str = "int8", cpu_threads: int = 16) -> "WhisperModel":
+        key = (model_path, compute_type)
+        cached = cls._models.get(key)
+        if cached is not None:
+            cls._models.move_to_end(key)
+            cached.last_used = time.monotonic()
+            return cached.model
+
+        # Make room up front using the on-disk size so loading never overshoots the budget
+        cls._evict(reserve=_model_disk_bytes(model_path))
+
+        rss_before = _resident_bytes()
+        start = time.perf_counter()
+        model = WhisperModel(
+            model_path,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=cpu_threads
+        )
+        load_seconds = time.perf_counter() - start
+        resident = _resident_bytes() - rss_before
+        if resident <= 0:
+            resident = _model_disk_bytes(model_path)
+
+        cls._models[key] = CachedWhisperModel(model, load_seconds, resident, time.monotonic())
+        logger.info(
+            f"Loaded whisper model {model_path} ({compute_type}) in {load_seconds:.2f}s, "
+            f"resident {resident / 1024 / 1024:.0f} MB"
+        )
+        cls._evict(reserve=0, keep=key)
+        return model
+
+    @classmethod
+    def _evict(cls, reserve: int, keep: Optional[Tuple[str, str]] = None):
+        while cls._models and cls._total_bytes() + reserve > cls.budget_bytes:
+            key = next(iter(cls._models))
+            if key == keep:
+                break
+            evicted = cls._models.pop(key)
+            logger.info(f"Evicting whisper model {key[0]} ({key[1]}), freeing {evicted.resident_bytes / 1024 / 1024:.0f} MB")
+
+    @classmethod
+    def _total_bytes(cls) -> int:
+        return sum(cached.resident_bytes for cached in cls._models.values())
+
+    @classmethod
+    def stats(cls) -> List[Dict]:
+        now = time.monotonic()
+        return [
+            {
+                "model": model_path,
+                "compute_type": compute_type,
+                "load_seconds": round(cached.load_seconds, 3),
+                "resident_mb": round(cached.resident_bytes / 1024 / 1024, 1),
+                "idle_seconds": round(now - cached.last_used, 1),
+            }
+            for (model_path, compute_type), cached in cls._models.items()
+        ]
+
+    @classmethod
+    def clear(cls):
+        cls._models.clear()
+
+def _resident_bytes() -> int:
+    """Current resident set size of this process (Linux), or 0 when unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _model_disk_bytes(model_path: str) -> int:
+    path = Path(model_path)
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+    return 0
+
+class OggOpusStreamDecoder:
+    """Incrementally decodes an OGG/Opus stream, such as a Telegram voice note, into mono float32 PCM.
+
+    Feed bytes as they arrive; each call returns the samples that became available.
+    """
+    OPUS_RATE = 48000
+
+    def __init__(self, sample_rate: int = TARGET_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._buffer = bytearray()
+        self._packet = bytearray()  # packet continuing onto the next page
+        self._decoder: Optional[av.AudioCodecContext] = None
+        self._resampler = av.AudioResampler(format="flt", layout="mono", rate=sample_rate)
+        self._pre_skip = 0
+        self._tags_seen = False
+        self._emitted = 0
+        self._limit: Optional[int] = None  # total output samples, known once the last page arrives
+
+    def feed(self, chunk: bytes) -> np.ndarray:
+        self._buffer.extend(chunk)
+        output = []
+        for packet, last_page_granule in self._read_packets():
+            output.extend(self._decode_packet(packet))
+            if last_page_granule is not None:
+                # The final granule position marks where real audio ends, trimming encoder padding
+                end = max(0, last_page_granule - self._pre_skip)
+                self._limit = end * self.sample_rate // self.OPUS_RATE
+        return self._emit(output)
+
+    def flush(self) -> np.ndarray:
+        """Drain the resampler once the stream is complete."""
+        return self._emit(self._resampler.resample(None))
+
+    def _read_packets(self):
+        while len(self._buffer) >= 27:
+            if self._buffer[:4] != b"OggS":
+                raise ValueError("not an OGG stream")
+            segment_count = self._buffer[26]
+            header_size = 27 + segment_count
+            if len(self._buffer) < header_size:
+                return
+            lacing = self._buffer[27:header_size]
+            page_size = header_size + sum(lacing)
+            if len(self._buffer) < page_size:
+                return
+
+            header_type = self._buffer[5]
+            granule = struct.unpack_from("<q", self._buffer, 6)[0]
+            position = header_size
+            completed = []
+            for size in lacing:
+                self._packet.extend(self._buffer[position:position + size])
+                position += size
+                # A lacing value below 255 terminates the packet
+                if size < 255:
+                    completed.append(bytes(self._packet))
+                    self._packet.clear()
+            del self._buffer[:page_size]
+
+            last_page = header_type & 0x04 and granule >= 0
+            for i, packet in enumerate(completed):
+                yield packet, granule if last_page and i == len(completed) - 1 else None
+
+    def _decode_packet(self, packet: bytes) -> List[av.AudioFrame]:
+        if self._decoder is None:
+            if not packet.startswith(b"OpusHead"):
+                raise ValueError("OGG stream does not contain Opus audio")
+            self._pre_skip = struct.unpack_from("<H", packet, 10)[0]
+            self._decoder = av.CodecContext.create("opus", "r")
+            # With the OpusHead as extradata the decoder applies the pre-skip itself
+            self._decoder.extradata = packet
+            return []
+        if not self._tags_seen:
+            self._tags_seen = True  # OpusTags carries no audio
+            return []
+        frames = []
+        for frame in self._decoder.decode(av.Packet(packet)):
+            frames.extend(self._resampler.resample(frame))
+        return frames
+
+    def _emit(self, frames: List[av.AudioFrame]) -> np.ndarray:
+        if not frames:
+            return np.empty(0, dtype=np.float32)
+        samples = np.concatenate([frame.to_ndarray().reshape(-1) for frame in frames])
+        if self._limit is not None:
+            samples = samples[:max(0, self._limit - self._emitted)]
+        self._emitted += len(samples)
+        return samples
+
+class OpusPacketDecoder:
+    """Decodes raw Opus packets (no OGG container, e.g. from WebCodecs' AudioEncoder) into 16-bit mono PCM."""
+    OPUS_RATE = 48000
+
+    def __init__(self, sample_rate: int = TARGET_SAMPLE_RATE, channels: int = 1):
+        self._decoder = av.CodecContext.create("opus", "r")
+        self._decoder.sample_rate = self.OPUS_RATE
+        self._decoder.layout = "mono" if channels == 1 else "stereo"
+        self._resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+
+    def decode(self, packet: bytes) -> bytes:
+        frames = []
+        for frame in self._decoder.decode(av.Packet(packet)):
+            frames.extend(self._resampler.resample(frame))
+        return b"".join(frame.to_ndarray().tobytes() for frame in frames)
+
+_download_client: Optional[httpx.AsyncClient] = None
+
+async def _stream_file(file: File, chunk_size: int = 16384) -> AsyncIterator[bytes]:
+    global _download_client
+    if not file.file_path or not file.file_path.startswith("http"):
+        # Local bot API servers hand out file paths; nothing to stream
+        yield bytes(await file.download_as_bytearray())
+        return
+    if _download_client is None:
+        _download_client = httpx.AsyncClient(timeout=30)
+    async with _download_client.stream("GET", file.file_path) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes(chunk_size):
+            yield chunk
+
+async def close_download_client():
+    global _download_client
+    if _download_client is not None:
+        await _download_client.aclose()
+    _download_client = None
+
+async def download_voice(file: File, decode: bool = True) -> Tuple[bytearray, Optional[np.ndarray]]:
+    """Download a Telegram voice note, decoding its OGG/Opus audio to 16kHz PCM while it streams in.
+
+    Returns the raw bytes and the decoded samples (None when decoding is off or the audio isn't OGG/Opus).
+    """
+    data = bytearray()
+    decoder = OggOpusStreamDecoder() if decode else None
+    pieces = []
+    async for chunk in _stream_file(file):
+        data.extend(chunk)
+        if decoder is not None:
+            try:
+                pieces.append(decoder.feed(chunk))
+            except (ValueError, av.FFmpegError) as e:
+                logger.warning(f"Streaming decode failed, falling back to raw audio: {str(e)}")
+                decoder = None
+    if decoder is None:
+        return data, None
+    pieces.append(decoder.flush())
+    return data, np.concatenate(pieces)
+
 async def preprocess_audio(audio_bytes: bytearray) -> bytearray:
+    """Normalize, band-limit and resample audio to 16kHz mono WAV without leaving the process for WAV/PCM input."""
     logger.info("Preprocessing audio")
-    audio = AudioSegment.from_file(BytesIO(audio_bytes)) 
-    audio = audio.normalize()
-    audio = audio.high_pass_filter(100)
-    audio = audio.low_pass_filter(8000)
-    audio = audio.set_channels(1) 
-    audio = audio.set_frame_rate(16000)
-    output = BytesIO()
-    audio.export(output, format="wav")
-    return bytearray(output.getvalue())
\ No newline at end of file
+    samples = await load_audio(bytes(audio_bytes))
+    return bytearray(encode_wav(samples, TARGET_SAMPLE_RATE))
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Optional
+
+from app.config import (
+    HF_INFERENCE_URL,
+    HF_MAX_RETRIES,
+    HF_POOL_SIZE,
+    HF_RETRY_BACKOFF_SECONDS,
+    HF_TIMEOUT_SECONDS,
+    HF_TOKEN,
+)
+from app.service.lazy_import import LazyImport
+
+aiohttp = LazyImport("aiohttp")
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting, model still loading, transient gateway errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session: Optional[aiohttp.ClientSession] = None
+# The loop _session was created on; a session can't be used from another one
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Shared pooled session, so TLS connections to HF are reused across requests."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session_loop = loop
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HF_POOL_SIZE, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=HF_TIMEOUT_SECONDS),
+        )
+    return _session
+
+
+def session_open() -> bool:
+    return _session is not None and not _session.closed
+
+
+async def close_session():
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+def sniff_audio_content_type(data: bytes) -> str:
+    """Guess the audio MIME type from the container's magic bytes."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "audio/wav"
+    if data[:4] == b"OggS":
+        return "audio/ogg"
+    if data[:4] == b"fLaC":
+        return "audio/flac"
+    if data[:3] == b"ID3" or (len(data) > 1 and data[0] == 0xFF and data[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "audio/webm"
+    if data[4:8] == b"ftyp":
+        return "audio/mp4"
+    return "application/octet-stream"
+
+
+class HFInferenceError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HF inference failed with status {status}: {message}")
+        self.status = status
+
+
+class HFInferenceClient:
+    """Async client for the HF inference API using the shared connection pool."""
+
+    def __init__(
+        self,
+        model: str,
+        token: Optional[str] = HF_TOKEN,
+        base_url: str = HF_INFERENCE_URL,
+        max_retries: int = HF_MAX_RETRIES,
+        backoff: float = HF_RETRY_BACKOFF_SECONDS,
+    ):
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/{model}"
+        self.token = token
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    async def automatic_speech_recognition(self, audio: bytes) -> str:
+        result = await self.post(audio, sniff_audio_content_type(audio))
+        return result.get("text", "")
+
+    async def post(self, data: bytes, content_type: str) -> Any:
+        """POST raw bytes to the model endpoint, retrying transient failures with exponential backoff."""
+        headers = {"Content-Type": content_type}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        attempt = 0
+        while True:
+            try:
+                async with get_session().post(self.url, data=data, headers=headers) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    body = await response.text()
+                    if response.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                        raise HFInferenceError(response.status, body[:200])
+                    delay = _retry_after(response) or self.backoff * 2 ** attempt
+                    logger.warning(f"HF {self.model} returned {response.status}, retrying in {delay:.1f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"HF {self.model} request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def _retry_after(response: aiohttp.ClientResponse) -> Optional[float]:
+    # Capped, so a server asking for minutes can't park the request past its own timeout
+    try:
+        return min(max(0.0, float(response.headers["Retry-After"])), HF_TIMEOUT_SECONDS)
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,67 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_registry: List["LazyImport"] = []
+
+
+class LazyImport:
+    """A module, or an attribute of one, that is only imported on first use.
+
+    Stands in for `import module` / `from module import attribute` at the top
+    of a service module: attribute access and calls go through to the real
+    object, importing it the first time. Module-level names stay in place, so
+    tests can still patch them. Its own members are underscored so they can't
+    shadow the target's (librosa.load, for one).
+    """
+
+    def __init__(self, module: str, attribute: Optional[str] = None):
+        self._module = module
+        self._attribute = attribute
+        self._target = None
+        self._lock = threading.Lock()
+        self._import_seconds: Optional[float] = None
+        _registry.append(self)
+
+    @property
+    def _name(self) -> str:
+        return f"{self._module}.{self._attribute}" if self._attribute else self._module
+
+    def _load(self):
+        if self._target is None:
+            with self._lock:
+                if self._target is None:
+                    started = time.perf_counter()
+                    target = importlib.import_module(self._module)
+                    if self._attribute:
+                        target = getattr(target, self._attribute)
+                    self._import_seconds = time.perf_counter() - started
+                    logger.info(f"Imported {self._name} on first use in {self._import_seconds * 1000:.0f}ms")
+                    self._target = target
+        return self._target
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<LazyImport {self._name} ({'loaded' if self._target is not None else 'not loaded'})>"
+
+
+def is_loaded(obj) -> bool:
+    """Whether a LazyImport has been imported yet (anything else, e.g. a test double, counts as loaded)."""
+    return not isinstance(obj, LazyImport) or obj._target is not None
+
+
+def lazy_import_stats() -> Dict[str, Optional[float]]:
+    """Milliseconds each lazy import took, or None if it hasn't been used yet."""
+    stats = {}
+    for lazy in _registry:
+        stats[lazy._name] = None if lazy._import_seconds is None else round(lazy._import_seconds * 1000, 1)
+    return stats
@@ -0,0 +1,183 @@
+import atexit
+import contextvars
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from app.config import LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_EVERY
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Correlation fields (request_id, update_id, session_id, segment_id, job_id) for the current task
+_context: contextvars.ContextVar[Dict[str, object]] = contextvars.ContextVar("log_context", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach correlation fields to every record logged inside the block (and tasks started from it)."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current_context() -> Dict[str, object]:
+    return _context.get()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread; never blocks the caller.
+
+    The message is rendered here, where the record's args are still safe to
+    read, along with the correlation fields of the calling task. Formatting to
+    JSON and all I/O happen on the listener thread. When the queue is full
+    the record is dropped and counted rather than waiting for the disk.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.context = _context.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps the first and then every `every`-th DEBUG record from each call site.
+
+    Per-chunk logs (audio frames, segment boundaries) would otherwise flood
+    the queue once DEBUG is on; each kept record says how many it stands for.
+    """
+
+    def __init__(self, every: int = LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[tuple, itertools.count] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        counter = self._counters.get(site)
+        if counter is None:
+            counter = self._counters[site] = itertools.count()
+        if next(counter) % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class StderrHandler(logging.StreamHandler):
+    """Writes to whatever sys.stderr is at emit time (uvicorn and test runners swap it)."""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the correlation fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", None) or _context.get())
+        if getattr(record, "sampled", None):
+            entry["sampled"] = record.sampled
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The old `asctime - name - level - message` lines, with correlation fields appended."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        context = getattr(record, "context", None) or _context.get()
+        if context:
+            line += " [" + " ".join(f"{key}={value}" for key, value in context.items()) + "]"
+        return line
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, file: Optional[str] = LOG_FILE,
+                      sample_every: int = LOG_SAMPLE_EVERY, queue_size: int = LOG_QUEUE_SIZE):
+    """Route the root logger through a bounded queue to a listener thread that writes stderr (and file).
+
+    Safe to call more than once (e.g. from pool workers); only the first call
+    in a process installs handlers.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+        outputs = [StderrHandler()]
+        if file:
+            outputs.append(logging.handlers.WatchedFileHandler(file))
+        for handler in outputs:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _queue_handler.addFilter(SamplingFilter(sample_every))
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_queue_handler)
+        root.setLevel(level.upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, *outputs, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush whatever is queued and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.config import LONG_AUDIO_CHUNK_SECONDS, LONG_AUDIO_PARALLELISM
+from app.service.audio_dsp import TARGET_SAMPLE_RATE
+from app.service.segmenter import SpeechSegmenter
+from app.service.vad import FrameVAD
+
+logger = logging.getLogger(__name__)
+
+# Samples handed to the segmenter per feed() call
+FEED_SAMPLES = TARGET_SAMPLE_RATE * 10
+
+
+class NoUsableSpeech(ValueError):
+    """The recording has nothing to translate; reason is "no_speech" or a TranscriptFilter reason."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass
+class AudioChunk:
+    index: int
+    start: float  # seconds into the recording
+    end: float
+    samples: np.ndarray  # mono float32 at TARGET_SAMPLE_RATE
+
+
+def split_at_silence(samples: np.ndarray, max_seconds: float = LONG_AUDIO_CHUNK_SECONDS) -> List[AudioChunk]:
+    """Split a decoded recording into chunks of at most max_seconds that start and end in pauses.
+
+    Speech segments come from the same VAD segmenter as the WebSocket stream
+    (speech longer than max_seconds is cut at its quietest frame), and
+    neighbouring segments are merged back together up to max_seconds so each
+    chunk carries as much context as Whisper's window allows.
+    """
+    segmenter = SpeechSegmenter(FrameVAD(sample_rate=TARGET_SAMPLE_RATE), max_seconds=max_seconds, overlap_ms=0)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    segments = []
+    for offset in range(0, len(pcm), FEED_SAMPLES):
+        segments.extend(segmenter.feed(pcm[offset:offset + FEED_SAMPLES].tobytes()))
+    tail = segmenter.flush()
+    if tail is not None:
+        segments.append(tail)
+
+    spans = []
+    for segment in segments:
+        if spans and segment.end - spans[-1][0] <= max_seconds:
+            spans[-1][1] = segment.end
+        else:
+            spans.append([segment.start, segment.end])
+
+    return [
+        AudioChunk(i, start, end, samples[int(start * TARGET_SAMPLE_RATE):int(end * TARGET_SAMPLE_RATE)])
+        for i, (start, end) in enumerate(spans)
+    ]
+
+
+async def translate_chunks(
+    chunks: List[AudioChunk],
+    transcribe: Callable[[AudioChunk], Awaitable[str]],
+    translate: Callable[[str], Awaitable[str]],
+    synthesize: Optional[Callable[[str], Awaitable[bytes]]] = None,
+    accept: Optional[Callable[[str], Optional[str]]] = None,
+    parallelism: int = LONG_AUDIO_PARALLELISM,
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict]:
+    """Transcribe, translate and (optionally) synthesize every chunk, at most `parallelism` at a time.
+
+    accept(text) returns a reason to skip a chunk's transcription (see
+    TranscriptFilter.check). Returns one entry per chunk in recording order;
+    a failing chunk records its error instead of failing the whole recording.
+    on_chunk(done, total) is called as chunks finish.
+    """
+    slots = asyncio.Semaphore(max(1, parallelism))
+    done = 0
+
+    async def run(chunk: AudioChunk) -> Dict:
+        nonlocal done
+        entry = {"index": chunk.index, "start": round(chunk.start, 2), "end": round(chunk.end, 2)}
+        async with slots:
+            try:
+                text = await transcribe(chunk)
+                reason = accept(text) if accept is not None else (None if text else "empty")
+                if reason:
+                    entry["skipped"] = reason
+                else:
+                    entry["transcribed_text"] = text
+                    entry["translated_text"] = await translate(text)
+                    if synthesize is not None:
+                        try:
+                            entry["audio"] = await synthesize(entry["translated_text"])
+                        except Exception as e:
+                            logger.error(f"TTS failed for chunk {chunk.index}: {str(e)}")
+                            entry["tts_error"] = str(e)
+            except Exception as e:
+                logger.error(f"Chunk {chunk.index} ({chunk.start:.1f}-{chunk.end:.1f}s) failed: {str(e)}")
+                entry["error"] = str(e)
+        done += 1
+        if on_chunk is not None:
+            on_chunk(done, len(chunks))
+        return entry
+
+    started = time.monotonic()
+    entries = await asyncio.gather(*(run(chunk) for chunk in chunks))
+    logger.info(f"Processed {len(chunks)} chunks with parallelism {parallelism} in {time.monotonic() - started:.1f}s")
+    return list(entries)
+
+
+def join_entries(entries: List[Dict]) -> Dict:
+    """Ordered transcript/translation for a list of translate_chunks entries, plus the stitched TTS audio."""
+    translated = [entry for entry in entries if "translated_text" in entry]
+    audio = [entry.pop("audio") for entry in entries if entry.get("audio")]
+    return {
+        "transcribed_text": " ".join(entry["transcribed_text"] for entry in translated),
+        "translated_text": " ".join(entry["translated_text"] for entry in translated),
+        "segments": entries,
+        # MP3 frames are self-contained, so per-chunk files concatenate into one playable stream
+        "audio": b"".join(audio) if audio else None,
+    }
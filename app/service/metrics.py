@@ -0,0 +1,165 @@
+import abc
+import bisect
+import time
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers a cached lookup through a cold Play.ht synthesis
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple([labels.get(name, "") for name in self.labelnames])
+
+    def _labels(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for every recorded series."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}_total{self._labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (last is +Inf), sum]; cumulated only when rendered
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key: Tuple[str, ...], value: float):
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS: Histogram = registry.register(Histogram(
+    "translator_stage_seconds", "Time spent in each stage of a translation pipeline",
+    ("pipeline", "stage", "mode", "model", "outcome"),
+))
+REQUESTS: Counter = registry.register(Counter(
+    "translator_requests", "Translation requests handled, by pipeline and outcome", ("pipeline", "outcome"),
+))
+MODEL_SECONDS: Histogram = registry.register(Histogram(
+    "translator_model_seconds", "Anthropic API calls by model; outcome 'error' on the primary means a fallback",
+    ("model", "outcome"),
+))
+
+
+class Stage:
+    """Times a block into translator_stage_seconds.
+
+        with Stage("telegram_voice", "transcribe", mode=mode, model=model_name) as timer:
+            text = await scheduler.transcribe(...)
+            if not text:
+                timer.outcome = "empty"
+
+    The outcome is "ok" unless the block sets another or raises ("error").
+    Runs on the event loop with no locking: one perf_counter pair, a dict
+    lookup and a bisect per observation.
+    """
+
+    __slots__ = ("key", "outcome", "started")
+
+    def __init__(self, pipeline: str, name: str, mode: str = "", model: str = ""):
+        # In STAGE_SECONDS label order, minus the outcome
+        self.key = (pipeline, name, mode, model)
+        self.outcome = "ok"
+        self.started = 0.0
+
+    def __enter__(self) -> "Stage":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        outcome = self.outcome
+        if exc_type is not None:
+            outcome = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+        STAGE_SECONDS._observe(self.key + (outcome,), time.perf_counter() - self.started)
+        return False
+
+
+async def timed(coro, pipeline: str, name: str, mode: str = "", model: str = ""):
+    """coro inside a Stage, for work that runs as its own task (gender detection alongside ASR)."""
+    with Stage(pipeline, name, mode, model):
+        return await coro
+
+
+def count_request(pipeline: str, outcome: str):
+    REQUESTS.inc(pipeline=pipeline, outcome=outcome)
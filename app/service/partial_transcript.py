@@ -0,0 +1,44 @@
+import re
+from collections import deque
+from typing import List, Tuple
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class LocalAgreement:
+    """Stabilizes successive hypotheses for a growing audio prefix (LocalAgreement-n).
+
+    A word is committed once the last n hypotheses agree on it and on every word
+    before it (ignoring case and punctuation). Committed words are never retracted;
+    the rest of the latest hypothesis is reported as unstable.
+    """
+
+    def __init__(self, n: int = 2):
+        self.n = max(1, n)
+        self.committed: List[str] = []
+        self._history = deque(maxlen=self.n)
+
+    def update(self, text: str) -> Tuple[str, str]:
+        """Add a hypothesis and return (committed text, unstable text)."""
+        words = text.split()
+        self._history.append(words)
+        if len(self._history) == self.n:
+            agreed = self._common_prefix()
+            if agreed > len(self.committed):
+                self.committed += words[len(self.committed):agreed]
+        return " ".join(self.committed), " ".join(words[len(self.committed):])
+
+    def _common_prefix(self) -> int:
+        normalized = [[_normalize(word) for word in words] for words in self._history]
+        length = 0
+        for column in zip(*normalized):
+            if any(word != column[0] for word in column):
+                break
+            length += 1
+        # Agreement has to extend what is already committed, never contradict it
+        committed = [_normalize(word) for word in self.committed]
+        if normalized[-1][:len(committed)] != committed:
+            return 0
+        return length
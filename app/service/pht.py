@@ -1,26 +1,81 @@
 import asyncio
 import logging
-from pyht import Client, Language
-from pyht.client import TTSOptions, Format
-from langdetect import detect
-from huggingface_hub import InferenceClient
-import librosa
+import numpy as np
 import io
+from typing import Optional, Tuple
 
-from app.config import HF_TOKEN, PLAY_HT_API_KEY, PLAY_HT_USER_ID
+from app.config import GENDER_PITCH_CONFIDENCE, HF_TOKEN, PLAY_HT_API_KEY, PLAY_HT_USER_ID
+from app.service.lazy_import import LazyImport
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('tts_generation.log'),
-        logging.StreamHandler()
-    ]
-)
+# Imported on first use; pyht alone adds ~0.4s to cold starts
+Client = LazyImport("pyht", "Client")
+Language = LazyImport("pyht", "Language")
+TTSOptions = LazyImport("pyht.client", "TTSOptions")
+Format = LazyImport("pyht.client", "Format")
+detect = LazyImport("langdetect", "detect")
+InferenceClient = LazyImport("huggingface_hub", "InferenceClient")
+librosa = LazyImport("librosa")
 
 logger = logging.getLogger(__name__)
 
+# Pitch analysis settings for the local gender classifier
+PITCH_SAMPLE_RATE = 16000
+PITCH_FRAME_LENGTH = 1024  # 64ms at 16kHz, long enough for two periods at PITCH_FMIN
+PITCH_FMIN = 60.0
+PITCH_FMAX = 400.0
+# Typical adult F0 is ~85-155Hz for male and ~165-255Hz for female voices
+GENDER_PITCH_BOUNDARY_HZ = 160.0
+# Median F0 this far (as a ratio) from the boundary counts as an unambiguous margin
+GENDER_PITCH_MARGIN_RATIO = 1.25
+# Voiced frames needed for full confidence (~0.5s of voicing)
+GENDER_MIN_VOICED_FRAMES = 30
+
+
+def estimate_pitch(samples: np.ndarray, sr: int = PITCH_SAMPLE_RATE) -> np.ndarray:
+    """Return the F0 (Hz) of every voiced frame in a mono signal."""
+    if len(samples) < PITCH_FRAME_LENGTH:
+        return np.empty(0, dtype=np.float32)
+
+    hop_length = PITCH_FRAME_LENGTH // 4
+    f0 = librosa.yin(
+        samples,
+        fmin=PITCH_FMIN,
+        fmax=PITCH_FMAX,
+        sr=sr,
+        frame_length=PITCH_FRAME_LENGTH,
+        hop_length=hop_length,
+    )
+    rms = librosa.feature.rms(y=samples, frame_length=PITCH_FRAME_LENGTH, hop_length=hop_length)[0]
+    frames = min(len(f0), len(rms))
+    f0, rms = f0[:frames], rms[:frames]
+
+    # Frames well below the loudest part of the clip are silence or breath, and YIN
+    # pins unvoiced frames to the search bounds, so drop both
+    voiced = (rms > 0.1 * rms.max()) & (f0 > PITCH_FMIN * 1.05) & (f0 < PITCH_FMAX * 0.95)
+    return f0[voiced]
+
+
+def classify_gender_by_pitch(audio: bytes) -> Tuple[Optional[str], float]:
+    """Classify the speaker's gender from median F0, returning (label, confidence in [0, 1])."""
+    samples, sr = librosa.load(io.BytesIO(audio), sr=PITCH_SAMPLE_RATE, mono=True)
+    f0 = estimate_pitch(samples, sr)
+    if len(f0) == 0:
+        return None, 0.0
+
+    median_f0 = float(np.median(f0))
+    gender = "male" if median_f0 < GENDER_PITCH_BOUNDARY_HZ else "female"
+
+    # Share of voiced frames that agree with the median's side of the boundary
+    if gender == "male":
+        agreement = float(np.mean(f0 < GENDER_PITCH_BOUNDARY_HZ))
+    else:
+        agreement = float(np.mean(f0 >= GENDER_PITCH_BOUNDARY_HZ))
+    margin = min(1.0, abs(np.log(median_f0 / GENDER_PITCH_BOUNDARY_HZ)) / np.log(GENDER_PITCH_MARGIN_RATIO))
+    coverage = min(1.0, len(f0) / GENDER_MIN_VOICED_FRAMES)
+
+    return gender, agreement * margin * coverage
+
+
 class PHT:
     def __init__(self):
         self.hf_client = InferenceClient(token=HF_TOKEN)
@@ -31,10 +86,22 @@ class PHT:
         self.gender_task = None
 
     async def detect_gender(self, audio: bytearray):
-        """Detect gender from audio data"""
+        """Detect gender from audio data, using the HF model only when the local pitch estimate is ambiguous"""
         try:
             logger.info("Starting gender detection from audio...")
             audio_bytes = bytes(audio)
+
+            try:
+                gender, confidence = await asyncio.to_thread(classify_gender_by_pitch, audio_bytes)
+            except Exception as e:
+                logger.warning(f"Local pitch classification failed: {str(e)}")
+                gender, confidence = None, 0.0
+
+            if gender is not None and confidence >= GENDER_PITCH_CONFIDENCE:
+                logger.info(f"Detected gender from pitch: {gender} (confidence {confidence:.2f})")
+                return gender
+            logger.info(f"Pitch classification ambiguous ({gender}, confidence {confidence:.2f}), using HF model")
+
             result = await asyncio.to_thread(
                 self.hf_client.audio_classification,
                 audio=audio_bytes,
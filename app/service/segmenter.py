@@ -0,0 +1,145 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import (
+    SEGMENT_MAX_SECONDS,
+    SEGMENT_OVERLAP_MS,
+    SEGMENT_PRE_ROLL_MS,
+    SEGMENT_SPLIT_SEARCH_MS,
+)
+from app.service.vad import FrameVAD
+
+logger = logging.getLogger(__name__)
+
+# Chunks are consumed at most this many milliseconds at a time, bounding the ring's headroom
+MAX_FEED_MS = 1000
+
+
+@dataclass
+class SpeechSegment:
+    pcm: bytes  # 16-bit mono PCM
+    start: float  # seconds since the start of the stream
+    end: float
+    forced: bool = False  # cut at the maximum length rather than at the end of speech
+
+
+class SpeechSegmenter:
+    """Assembles VAD speech segments from a PCM stream in a preallocated ring buffer.
+
+    Frames live in a fixed (capacity, frame_size) ring together with their
+    energy, so memory per connection is bounded by max_seconds no matter how
+    long anyone talks. A segment that reaches max_seconds is split at the
+    quietest frame in its last split_search_ms, and the next piece starts
+    overlap_ms before the cut so a word straddling it is not lost.
+    """
+
+    def __init__(
+        self,
+        vad: Optional[FrameVAD] = None,
+        max_seconds: float = SEGMENT_MAX_SECONDS,
+        split_search_ms: int = SEGMENT_SPLIT_SEARCH_MS,
+        overlap_ms: int = SEGMENT_OVERLAP_MS,
+        pre_roll_ms: int = SEGMENT_PRE_ROLL_MS,
+    ):
+        self.vad = vad or FrameVAD()
+        self.sample_rate = self.vad.sample_rate
+        self.frame_ms = self.vad.frame_ms
+        self.frame_size = self.vad.frame_size
+        self.max_frames = max(2, int(max_seconds * 1000) // self.frame_ms)
+        self.search_frames = max(1, min(split_search_ms // self.frame_ms, self.max_frames - 1))
+        self.overlap_frames = min(overlap_ms // self.frame_ms, self.max_frames // 2)
+        self.pre_roll_frames = pre_roll_ms // self.frame_ms
+        self.feed_frames = max(1, MAX_FEED_MS // self.frame_ms)
+
+        self.capacity = self.max_frames + self.pre_roll_frames + self.feed_frames
+        self._frames = np.zeros((self.capacity, self.frame_size), dtype=np.int16)
+        self._energy = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0  # total frames written; the ring holds the last `capacity`
+        self._start: Optional[int] = None  # first frame of the open segment
+        self._remainder = np.empty(0, dtype=np.int16)
+        self._odd_byte = b""
+
+    @property
+    def active(self) -> bool:
+        return self._start is not None
+
+    def feed(self, pcm: bytes) -> List[SpeechSegment]:
+        """Feed a chunk of PCM and return the segments it completed, oldest first."""
+        data = self._odd_byte + pcm
+        usable = len(data) - len(data) % 2
+        self._odd_byte = data[usable:]
+        samples = np.concatenate([self._remainder, np.frombuffer(data[:usable], dtype=np.int16)])
+        count = len(samples) // self.frame_size
+        self._remainder = samples[count * self.frame_size:]
+
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size)
+        segments = []
+        for offset in range(0, count, self.feed_frames):
+            segments.extend(self._consume(frames[offset:offset + self.feed_frames]))
+        return segments
+
+    @property
+    def open_seconds(self) -> float:
+        """Length of the open segment so far (0 when no speech is in progress)."""
+        return 0.0 if self._start is None else (self._written - self._start) * self.frame_ms / 1000
+
+    def snapshot(self) -> Optional[SpeechSegment]:
+        """Copy of the open segment so far, without closing it."""
+        if self._start is None:
+            return None
+        return self._segment(self._start, self._written)
+
+    def flush(self) -> Optional[SpeechSegment]:
+        """Close and return the open segment, e.g. when the client disconnects."""
+        if self._start is None:
+            return None
+        segment = self._segment(self._start, self._written)
+        self._start = None
+        self.vad.reset()
+        return segment
+
+    def _consume(self, frames: np.ndarray) -> List[SpeechSegment]:
+        flags = self.vad.process_frames(frames)
+        first = self._written
+        self._write(frames)
+
+        segments = []
+        for i, speech in enumerate(flags):
+            index = first + i
+            if self._start is None:
+                if speech:
+                    self._start = max(index - self.pre_roll_frames, self._written - self.capacity, 0)
+            elif not speech:
+                segments.append(self._segment(self._start, index))
+                self._start = None
+            elif index + 1 - self._start >= self.max_frames:
+                segments.append(self._force_split(index + 1))
+        return segments
+
+    def _write(self, frames: np.ndarray):
+        positions = np.arange(self._written, self._written + len(frames)) % self.capacity
+        self._frames[positions] = frames
+        self._energy[positions] = np.mean(frames.astype(np.float32) ** 2, axis=1)
+        self._written += len(frames)
+
+    def _force_split(self, end: int) -> SpeechSegment:
+        """Cut the open segment [start, end) at its quietest recent frame and keep the rest open."""
+        search_start = end - self.search_frames
+        positions = np.arange(search_start, end) % self.capacity
+        cut = search_start + int(np.argmin(self._energy[positions])) + 1
+        segment = self._segment(self._start, cut, forced=True)
+        self._start = max(cut - self.overlap_frames, self._start + 1)
+        logger.debug("Forced segment split at %.2fs after %.2fs of speech", cut * self.frame_ms / 1000, segment.end - segment.start)
+        return segment
+
+    def _segment(self, start: int, end: int, forced: bool = False) -> SpeechSegment:
+        positions = np.arange(start, end) % self.capacity
+        return SpeechSegment(
+            pcm=self._frames[positions].tobytes(),
+            start=start * self.frame_ms / 1000,
+            end=end * self.frame_ms / 1000,
+            forced=forced,
+        )
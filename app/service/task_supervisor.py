@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from typing import Coroutine, Dict, Optional
+
+from app.config import TASK_DRAIN_TIMEOUT_SECONDS, TASK_MAX_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSupervisor:
+    """Owns the fire-and-forget tasks (webhook updates, typing actions, admin notifications).
+
+    The event loop only keeps weak references to tasks, so an unreferenced
+    one can be garbage-collected mid-flight; here every task is held until it
+    finishes, and its exception is logged instead of lost. `full` tells entry
+    points (the webhook) to refuse new work so Telegram redelivers it
+    elsewhere. drain() waits for everything in flight, including tasks those
+    spawn while finishing, then cancels whatever is left at the deadline.
+    """
+
+    def __init__(self, max_tasks: int = TASK_MAX_BACKGROUND):
+        self.max_tasks = max_tasks
+        self.draining = False
+        self._tasks: Dict[asyncio.Task, tuple] = {}  # task -> (name, started, drain)
+        self._totals = Counter()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def full(self) -> bool:
+        return self.draining or len(self._tasks) >= self.max_tasks
+
+    def spawn(self, coro: Coroutine, name: str, optional: bool = False, drain: bool = True) -> Optional[asyncio.Task]:
+        """Run coro as a tracked task.
+
+        optional tasks (typing indicators) are dropped rather than started when
+        at max_tasks. Tasks with drain=False are cancelled at shutdown instead
+        of waited for.
+        """
+        if optional and len(self._tasks) >= self.max_tasks:
+            coro.close()
+            self._totals["dropped"] += 1
+            logger.warning(f"Dropping background task {name}: {len(self._tasks)} running")
+            return None
+        task = asyncio.create_task(coro, name=name)
+        self._tasks[task] = (name, time.monotonic(), drain)
+        self._totals["spawned"] += 1
+        task.add_done_callback(self._done)
+        return task
+
+    def _done(self, task: asyncio.Task):
+        name, started, _ = self._tasks.pop(task, (task.get_name(), None, True))
+        if task.cancelled():
+            self._totals["cancelled"] += 1
+            return
+        error = task.exception()
+        if error is not None:
+            self._totals["failed"] += 1
+            logger.error(f"Background task {name} failed: {error}", exc_info=error)
+        else:
+            self._totals["completed"] += 1
+
+    async def drain(self, timeout: float = TASK_DRAIN_TIMEOUT_SECONDS):
+        """Refuse new work, wait up to timeout for tasks in flight, then cancel the rest."""
+        self.draining = True
+        for task, (_, _, drain) in list(self._tasks.items()):
+            if not drain:
+                task.cancel()
+        deadline = time.monotonic() + timeout
+        if self._tasks:
+            logger.info(f"Draining {len(self._tasks)} background tasks")
+        # Loop, since finishing tasks may spawn more (the reply to an update being processed)
+        while self._tasks and time.monotonic() < deadline:
+            await asyncio.wait(list(self._tasks), timeout=deadline - time.monotonic())
+        if self._tasks:
+            remaining = list(self._tasks)
+            logger.warning(f"Cancelling {len(remaining)} background tasks still running after {timeout}s: "
+                           f"{dict(Counter(self._tasks[task][0] for task in remaining))}")
+            for task in remaining:
+                task.cancel()
+            await asyncio.gather(*remaining, return_exceptions=True)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        running = {}
+        for name, started, _ in self._tasks.values():
+            entry = running.setdefault(name, {"count": 0, "oldest_seconds": 0.0})
+            entry["count"] += 1
+            entry["oldest_seconds"] = max(entry["oldest_seconds"], round(now - started, 1))
+        return {
+            "active": len(self._tasks),
+            "max_tasks": self.max_tasks,
+            "draining": self.draining,
+            "running": running,
+            "totals": {key: self._totals[key] for key in ("spawned", "completed", "failed", "cancelled", "dropped")},
+        }
+
+
+task_supervisor = TaskSupervisor()
@@ -0,0 +1,117 @@
+import json
+import logging
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from app.config import TRANSCRIPT_FILTER_PHRASES_FILE
+
+logger = logging.getLogger(__name__)
+
+# What Whisper tends to produce for silence, noise and music, per language
+DEFAULT_PHRASES: Dict[str, List[str]] = {
+    "en": [
+        "thank you", "thanks", "thank you very much", "thanks for watching", "thank you for watching",
+        "please subscribe", "subscribe to my channel", "like and subscribe", "you", "bye", "bye bye",
+    ],
+    "es": [
+        "gracias", "muchas gracias", "gracias por ver", "gracias por ver el video", "suscríbete",
+        "suscríbete al canal", "subtítulos realizados por la comunidad de amara org", "adiós",
+    ],
+}
+
+# n-gram sizes checked for repetition loops ("I'm going to I'm going to I'm going to ...")
+MAX_NGRAM = 4
+# A loop is an n-gram repeated at least this often that also covers this share of the words
+MIN_LOOP_REPEATS = 3
+MIN_LOOP_COVERAGE = 0.6
+LOOP_MIN_WORDS = 8  # shorter repetition ("no no no") is usually meant
+# Long transcriptions with fewer distinct words than this are degenerate
+MIN_UNIQUENESS_RATIO = 0.2
+UNIQUENESS_MIN_WORDS = 10
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, drop punctuation (keeping accented letters) and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def load_phrases(path: Optional[str]) -> Dict[str, List[str]]:
+    """DEFAULT_PHRASES extended with a {"lang": ["phrase", ...]} JSON file, if one is configured."""
+    phrases = {lang: list(entries) for lang, entries in DEFAULT_PHRASES.items()}
+    if not path:
+        return phrases
+    try:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+        for lang, entries in extra.items():
+            phrases.setdefault(lang, []).extend(entries)
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f"Could not load transcript filter phrases from {path}: {str(e)}")
+    return phrases
+
+
+class TranscriptFilter:
+    """Rejects ASR output that is noise or a hallucination rather than speech.
+
+    The filler phrases of each language are compiled once into a single
+    alternation that must match the whole (normalized) utterance, optionally
+    repeated, so "Thank you. Thank you." is rejected while "thank you for
+    coming" is not. Repetition loops are caught by n-gram counting.
+
+    Filler phrases are only rejected where there's acoustic reason to
+    suspect them: VAD-cut WebSocket segments, where noise and trailing
+    silence are what make Whisper say "thank you". A voice note or upload
+    that is just "Gracias" or "Bye" is a real message, so those callers pass
+    filler_phrases=False and keep only the empty/loop checks.
+    """
+
+    def __init__(self, phrases: Optional[Dict[str, Iterable[str]]] = None):
+        phrases = phrases if phrases is not None else load_phrases(TRANSCRIPT_FILTER_PHRASES_FILE)
+        self._patterns = {lang: self._compile(entries) for lang, entries in phrases.items()}
+        self._any_language = self._compile([phrase for entries in phrases.values() for phrase in entries])
+
+    @staticmethod
+    def _compile(phrases: Iterable[str]) -> Optional[re.Pattern]:
+        normalized = sorted({normalize(phrase) for phrase in phrases} - {""}, key=len, reverse=True)
+        if not normalized:
+            return None
+        alternation = "|".join(re.escape(phrase) for phrase in normalized)
+        return re.compile(rf"(?:(?:{alternation})(?: |$))+")
+
+    def check(self, text: str, language: Optional[str] = None, min_words: int = 1,
+              filler_phrases: bool = True) -> Optional[str]:
+        """Why text should be ignored ("empty", "too_short", "filler_phrase", "repetitive"), or None to keep it."""
+        normalized = normalize(text)
+        words = normalized.split()
+        if not words:
+            return "empty"
+        if len(words) < min_words:
+            return "too_short"
+
+        pattern = self._patterns.get(language, self._any_language) if language else self._any_language
+        if filler_phrases and pattern is not None and pattern.fullmatch(normalized):
+            return "filler_phrase"
+        if self._is_repetitive(words):
+            return "repetitive"
+        return None
+
+    @staticmethod
+    def _is_repetitive(words: List[str]) -> bool:
+        if len(words) >= UNIQUENESS_MIN_WORDS and len(set(words)) / len(words) < MIN_UNIQUENESS_RATIO:
+            return True
+        if len(words) < LOOP_MIN_WORDS:
+            return False
+        for n in range(1, MAX_NGRAM + 1):
+            if len(words) < n * MIN_LOOP_REPEATS:
+                break
+            ngrams = Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+            repeats = ngrams.most_common(1)[0][1]
+            if repeats >= MIN_LOOP_REPEATS and repeats * n / len(words) >= MIN_LOOP_COVERAGE:
+                return True
+        return False
+
+
+transcript_filter = TranscriptFilter()
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import logging
+import time
+from typing import Dict, Iterable, Optional
+
+from app.config import TRANSCRIPTION_CACHE_SIZE, TRANSCRIPTION_CACHE_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    # app.service.audio_transcription.Transcription (text, language, model)
+    transcription: object
+    gender: Optional[str] = None
+    created: float = field(default_factory=time.monotonic)
+    keys: int = 0  # keys pointing at this entry; it is gone once the last one is
+
+
+class TranscriptionCache:
+    """LRU cache of transcriptions, keyed by Telegram file_unique_id and by audio content hash.
+
+    Several keys can point at one entry, so a voice note cached by its file id is
+    also found when the same audio arrives through REST or the WebSocket. Keys
+    include the transcription variant (backend, model, language detection), so
+    switching models or modes never returns another configuration's result.
+    max_entries bounds the stored entries; least recently used keys are dropped
+    until an entry loses its last key.
+    """
+
+    def __init__(self, max_entries: int = TRANSCRIPTION_CACHE_SIZE, ttl: float = TRANSCRIPTION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._count = 0  # distinct entries among _entries' values
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def variant(backend: str, model: str, detect_language: bool) -> str:
+        return f"{backend}/{model}/{'detect' if detect_language else 'fixed'}"
+
+    @staticmethod
+    def file_key(file_unique_id: str, variant: str) -> str:
+        return f"tg:{variant}:{file_unique_id}"
+
+    @staticmethod
+    def content_key(audio: bytes, variant: str) -> str:
+        return f"b2:{variant}:{hashlib.blake2b(audio, digest_size=16).hexdigest()}"
+
+    def get_entry(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.created > self.ttl:
+            self._release(self._entries.pop(key))
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def get(self, key: str):
+        entry = self.get_entry(key)
+        return entry.transcription if entry else None
+
+    def put(self, keys: Iterable[str], transcription) -> CacheEntry:
+        """Store a transcription under every given key, sharing any entry one of them already has."""
+        keys = list(keys)
+        entry = next((self._entries[key] for key in keys if key in self._entries), None)
+        if entry is None:
+            entry = CacheEntry(transcription)
+            self._count += 1
+        else:
+            entry.transcription = transcription
+        for key in keys:
+            previous = self._entries.get(key)
+            if previous is not entry:
+                entry.keys += 1
+                if previous is not None:
+                    self._release(previous)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+        while self._count > self.max_entries:
+            self._release(self._entries.popitem(last=False)[1])
+        return entry
+
+    def _release(self, entry: CacheEntry):
+        entry.keys -= 1
+        if entry.keys == 0:
+            self._count -= 1
+
+    def set_gender(self, key: str, gender: Optional[str]):
+        entry = self._entries.get(key)
+        if entry is not None and gender:
+            entry.gender = gender
+
+    def stats(self) -> Dict:
+        return {"entries": self._count, "keys": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        self._entries.clear()
+        self._count = 0
+        self.hits = self.misses = 0
+
+
+transcription_cache = TranscriptionCache()
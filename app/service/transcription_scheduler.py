@@ -0,0 +1,184 @@
+import asyncio
+from collections import Counter, deque
+from dataclasses import dataclass
+import logging
+import time
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from app.config import (
+    TRANSCRIPTION_BATCH_SIZE,
+    TRANSCRIPTION_BATCH_WAIT_MS,
+    TRANSCRIPTION_CONCURRENT_BATCHES,
+)
+from app.service.audio_transcription import Transcription, WhisperHandler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    voice_data: bytearray
+    detect_language: bool
+    samples: Optional[np.ndarray]
+    future: asyncio.Future
+    enqueued: float
+    cache: bool = True
+
+
+class TranscriptionScheduler:
+    """Micro-batching queue in front of a WhisperHandler.
+
+    Requests arriving within max_wait_ms of the first queued one (up to max_batch_size)
+    are handed to WhisperHandler.transcribe_batch together. While every batch slot is
+    busy, new requests keep queueing, so batches grow with load. When nothing is in
+    flight the first request is dispatched at once rather than waiting out the window.
+
+    With batching off (the HF endpoint, where a batch is just concurrent requests)
+    every request goes straight to WhisperHandler.transcribe, so a caller never waits
+    for a slower neighbour and concurrency is bounded by the HTTP pool alone.
+    """
+
+    def __init__(
+        self,
+        handler: WhisperHandler,
+        max_batch_size: int = TRANSCRIPTION_BATCH_SIZE,
+        max_wait_ms: float = TRANSCRIPTION_BATCH_WAIT_MS,
+        max_concurrent_batches: int = TRANSCRIPTION_CONCURRENT_BATCHES,
+        batching: bool = True,
+    ):
+        self.handler = handler
+        self.batching = batching
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+        self.batch_sizes: Counter = Counter()
+        self.queue_delays = deque(maxlen=2000)
+
+    async def transcribe(
+        self,
+        voice_data: bytearray,
+        detect_language: bool = False,
+        samples: Optional[np.ndarray] = None,
+        cache: bool = True,
+    ) -> Transcription:
+        if not self.batching:
+            return await self.handler.transcribe(voice_data, detect_language, samples=samples, cache=cache)
+        if self._collector is None or self._collector.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._collector = asyncio.create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Pending(voice_data, detect_language, samples, future, time.perf_counter(), cache))
+        return await future
+
+    async def transcribe_voice(self, voice_data: bytearray, detect_language: bool = False) -> str:
+        transcription = await self.transcribe(voice_data, detect_language)
+        return transcription.text
+
+    async def _collect(self):
+        batch = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = batch[0].enqueued + (self.max_wait if self._batches else 0)
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                # Top up with whatever queued while we waited for a free slot
+                await self._slots.acquire()
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                task = asyncio.create_task(self._run_batch(batch))
+                batch = []
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+        except asyncio.CancelledError:
+            # close(): nobody will run the batch in hand, so its callers must not wait forever
+            self._fail(batch)
+            raise
+
+    async def _run_batch(self, batch):
+        try:
+            started = time.perf_counter()
+            self.queue_delays.extend(started - pending.enqueued for pending in batch)
+            self.batch_sizes[len(batch)] += 1
+            results = await self.handler.transcribe_batch(
+                [(pending.voice_data, pending.detect_language, pending.samples) for pending in batch],
+                cache=[pending.cache for pending in batch],
+            )
+            for pending, result in zip(batch, results):
+                if not pending.future.done():
+                    pending.future.set_result(result)
+        except Exception as e:
+            logger.error(f"Transcription batch of {len(batch)} failed: {str(e)}", exc_info=True)
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _fail(self, batch):
+        for pending in batch:
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Transcription scheduler closed"))
+
+    async def close(self):
+        """Stop collecting; queued requests fail, batches already running finish."""
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        queued = []
+        while self._queue is not None and not self._queue.empty():
+            queued.append(self._queue.get_nowait())
+        self._fail(queued)
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    def stats(self) -> Dict:
+        delays = np.array(self.queue_delays) * 1000 if self.queue_delays else np.zeros(1)
+        return {
+            "batching": self.batching,
+            "batches": sum(self.batch_sizes.values()),
+            "segments": sum(size * count for size, count in self.batch_sizes.items()),
+            "batch_size_distribution": dict(sorted(self.batch_sizes.items())),
+            "queue_delay_ms": {
+                "p50": round(float(np.percentile(delays, 50)), 1),
+                "p95": round(float(np.percentile(delays, 95)), 1),
+                "max": round(float(delays.max()), 1),
+            },
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+_schedulers: Dict[Tuple[str, str], TranscriptionScheduler] = {}
+
+
+def get_scheduler(mode: str, model_name: str = "base") -> TranscriptionScheduler:
+    """Shared scheduler per (transcription mode, model), so concurrent callers batch together.
+
+    Only the local engine batches; it is the one that gains from a single worker call per batch.
+    """
+    key = (mode, model_name)
+    if key not in _schedulers:
+        handler = WhisperHandler(mode, model_name)
+        _schedulers[key] = TranscriptionScheduler(handler, batching=handler.local)
+    return _schedulers[key]
+
+
+async def close_schedulers():
+    await asyncio.gather(*(scheduler.close() for scheduler in _schedulers.values()))
+
+
+def scheduler_stats() -> Dict[str, Dict]:
+    return {f"{mode}/{model_name}": scheduler.stats() for (mode, model_name), scheduler in _schedulers.items()}
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.config import (
+    JOBS_DIR,
+    JOB_MAX_ATTEMPTS,
+    JOB_MAX_QUEUED,
+    JOB_MAX_UPLOAD_MB,
+    JOB_RESULT_TTL_SECONDS,
+    JOB_WORKERS,
+)
+from app.service.logging_setup import log_context
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+TERMINAL = (DONE, FAILED)
+
+INPUT_FILE = "input"
+OUTPUT_FILE = "output.mp3"
+STATE_FILE = "job.json"
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobTooLarge(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    params: Dict = field(default_factory=dict)
+    status: str = QUEUED
+    stage: str = QUEUED
+    progress: float = 0.0
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+    expires: Optional[float] = None
+    input_bytes: int = 0
+    attempts: int = 0
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+    has_audio: bool = False
+
+    def snapshot(self) -> Dict:
+        return {key: value for key, value in asdict(self).items() if key not in ("params", "attempts")}
+
+
+# processor(job, audio, report) -> (result, optional output audio); report(stage, progress) publishes progress
+Report = Callable[[str, float], None]
+Processor = Callable[[Job, bytes, Report], Awaitable[Tuple[Dict, Optional[bytes]]]]
+
+
+class JobManager:
+    """Bounded worker pool for long-running translation jobs.
+
+    Every job lives in its own directory under `directory` (job.json, the
+    uploaded audio and the TTS output), so queued and interrupted jobs are
+    picked up again after a restart. Finished jobs expire `ttl` seconds after
+    they complete and are swept from disk.
+    """
+
+    def __init__(self, processor: Processor, directory: str = JOBS_DIR, workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_MAX_QUEUED, max_upload_bytes: int = int(JOB_MAX_UPLOAD_MB * 1024 * 1024),
+                 ttl: float = JOB_RESULT_TTL_SECONDS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.processor = processor
+        self.directory = directory
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_upload_bytes = max_upload_bytes
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.completed = 0
+        self.failed = 0
+        self._jobs: Dict[str, Job] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def _path(self, job_id: str, name: str = "") -> str:
+        return os.path.join(self.directory, job_id, name)
+
+    def _save(self, job: Job):
+        job.updated = time.time()
+        tmp_path = self._path(job.id, STATE_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(asdict(job), f)
+        os.replace(tmp_path, self._path(job.id, STATE_FILE))
+
+    def _publish(self, job: Job):
+        self._save(job)
+        event = self._changed.pop(job.id, None)
+        if event is not None:
+            event.set()
+
+    async def start(self):
+        """Reload jobs from disk, re-queue unfinished ones and start the workers and the expiry sweeper."""
+        if self.started:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._queue = asyncio.Queue()
+        for job in sorted(self._load(), key=lambda job: job.created):
+            self._jobs[job.id] = job
+            if job.status not in TERMINAL and job.attempts >= self.max_attempts:
+                # Every run so far took the process down with it (e.g. out of memory decoding the upload)
+                job.status, job.error = FAILED, f"Gave up after {job.attempts} interrupted attempts"
+                job.expires = time.time() + self.ttl
+                self.failed += 1
+                self._save(job)
+                logger.error(f"Translation job {job.id} failed: {job.error}")
+            elif job.status not in TERMINAL:
+                job.status = job.stage = QUEUED
+                job.progress = 0.0
+                self._save(job)
+                self._queue.put_nowait(job.id)
+        recovered = self._queue.qsize()
+        if recovered:
+            logger.info(f"Re-queued {recovered} unfinished translation jobs from {self.directory}")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+
+    async def stop(self):
+        """Stop the workers. Jobs they were running stay on disk and run again on the next start()."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _load(self):
+        for job_id in os.listdir(self.directory):
+            try:
+                with open(self._path(job_id, STATE_FILE), encoding="utf-8") as f:
+                    job = Job(**json.load(f))
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Discarding unreadable job directory {job_id}: {str(e)}")
+                shutil.rmtree(self._path(job_id), ignore_errors=True)
+                continue
+            if job.status not in TERMINAL and not os.path.exists(self._path(job.id, INPUT_FILE)):
+                job.status, job.error = FAILED, "Uploaded audio was lost"
+                job.expires = time.time() + self.ttl
+                self._save(job)
+            yield job
+
+    def queued(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == QUEUED)
+
+    async def submit(self, chunks: AsyncIterator[bytes], params: Optional[Dict] = None) -> Job:
+        """Spool an upload to disk chunk by chunk and queue it. Raises JobQueueFull or JobTooLarge."""
+        if not self.started:
+            await self.start()
+        if self.queued() >= self.max_queued:
+            raise JobQueueFull(f"{self.max_queued} jobs already queued")
+
+        job = Job(id=uuid.uuid4().hex, params=params or {})
+        os.makedirs(self._path(job.id))
+        try:
+            with open(self._path(job.id, INPUT_FILE), "wb") as f:
+                async for chunk in chunks:
+                    job.input_bytes += len(chunk)
+                    if job.input_bytes > self.max_upload_bytes:
+                        raise JobTooLarge(f"Upload exceeds {self.max_upload_bytes} bytes")
+                    # Off the event loop: a slow disk would otherwise stall every other request
+                    await asyncio.to_thread(f.write, chunk)
+            self._save(job)
+        except BaseException:
+            shutil.rmtree(self._path(job.id), ignore_errors=True)
+            raise
+
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job.id)
+        logger.info(f"Queued translation job {job.id} ({job.input_bytes} bytes). Queued jobs: {self.queued()}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and job.expires is not None and job.expires <= time.time():
+            self._expire(job)
+            return None
+        return job
+
+    def audio_path(self, job: Job) -> Optional[str]:
+        return self._path(job.id, OUTPUT_FILE) if job.has_audio else None
+
+    async def watch(self, job_id: str, heartbeat: float = 15.0) -> AsyncIterator[Optional[Dict]]:
+        """Yield the job's snapshot now and on every change until it finishes; None every heartbeat seconds."""
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            event = self._changed.setdefault(job_id, asyncio.Event())
+            yield job.snapshot()
+            if job.status in TERMINAL:
+                return
+            while True:
+                try:
+                    await asyncio.wait_for(event.wait(), heartbeat)
+                    break
+                except asyncio.TimeoutError:
+                    yield None
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None or job.status != QUEUED:
+                continue
+            with log_context(job_id=job.id):
+                await self._run(job)
+
+    async def _run(self, job: Job):
+        job.status = RUNNING
+        job.attempts += 1
+        self._publish(job)
+        started = time.monotonic()
+
+        def report(stage: str, progress: float):
+            job.stage, job.progress = stage, round(progress, 3)
+            self._publish(job)
+
+        try:
+            with open(self._path(job.id, INPUT_FILE), "rb") as f:
+                audio = f.read()
+            result, output = await self.processor(job, audio, report)
+            if output is not None:
+                with open(self._path(job.id, OUTPUT_FILE), "wb") as f:
+                    f.write(output)
+            job.result, job.has_audio = result, output is not None
+            job.status = job.stage = DONE
+            job.progress = 1.0
+            self.completed += 1
+            logger.info(f"Translation job {job.id} finished in {time.monotonic() - started:.1f}s")
+        except asyncio.CancelledError:
+            # Shutting down: leave it on disk as running so the next start() re-queues it.
+            # Only runs cut short by a crash count towards max_attempts.
+            job.attempts -= 1
+            self._save(job)
+            raise
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            self.failed += 1
+            logger.error(f"Translation job {job.id} failed: {str(e)}", exc_info=True)
+
+        job.expires = time.time() + self.ttl
+        try:
+            os.remove(self._path(job.id, INPUT_FILE))
+        except OSError:
+            pass
+        self._publish(job)
+
+    def _expire(self, job: Job):
+        self._jobs.pop(job.id, None)
+        event = self._changed.pop(job.id, None)
+        if event is not None:
+            event.set()
+        shutil.rmtree(self._path(job.id), ignore_errors=True)
+        logger.info(f"Translation job {job.id} expired")
+
+    def sweep(self) -> int:
+        now = time.time()
+        expired = [job for job in self._jobs.values() if job.expires is not None and job.expires <= now]
+        for job in expired:
+            self._expire(job)
+        return len(expired)
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(min(self.ttl, 60))
+            self.sweep()
+
+    def stats(self) -> Dict:
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "jobs": counts,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
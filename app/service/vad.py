@@ -0,0 +1,137 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+from app.config import VAD_FRAME_MS, VAD_HANGOVER_MS, VAD_ONSET_MS, VAD_SNR_DB
+
+logger = logging.getLogger(__name__)
+
+# Frames quieter than this are never speech, however low the noise floor gets
+ABSOLUTE_MIN_DB = -55.0
+# Noise floor estimate (dBFS) until the first chunk has been seen
+INITIAL_NOISE_FLOOR_DB = -60.0
+# The floor drops to quieter frames immediately but rises only this fraction per second
+NOISE_FLOOR_RISE_PER_SECOND = 0.15
+# Voiced speech is harmonic (low spectral flatness, few zero crossings); stationary noise is not
+MAX_SPECTRAL_FLATNESS = 0.35
+MAX_ZERO_CROSSING_RATE = 0.3
+# Band holding most speech energy (fundamental through the upper formants)
+SPEECH_BAND_HZ = (80, 4000)
+# Share of frame energy that must fall in that band (rejects rumble and hiss)
+MIN_SPEECH_BAND_RATIO = 0.6
+
+
+class FrameVAD:
+    """Frame-level voice activity detector for a stream of 16-bit mono PCM.
+
+    Every chunk is split into frame_ms frames, and energy, zero-crossing rate,
+    spectral flatness and speech-band energy are computed for all of them in one
+    vectorized pass. A frame counts as speech when it stands VAD_SNR_DB above an
+    adaptive noise floor and looks voiced. Onset and hangover smoothing turn
+    those raw decisions into segments: onset_ms of consecutive speech opens one,
+    and hangover_ms of non-speech closes it.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        frame_ms: int = VAD_FRAME_MS,
+        snr_db: float = VAD_SNR_DB,
+        onset_ms: int = VAD_ONSET_MS,
+        hangover_ms: int = VAD_HANGOVER_MS,
+    ):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.snr_db = snr_db
+        self.onset_frames = max(1, onset_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.noise_floor_db = INITIAL_NOISE_FLOOR_DB
+        self._floor_seeded = False
+
+        freqs = np.fft.rfftfreq(self.frame_size, 1 / sample_rate)
+        self._speech_band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+        self._window = np.hanning(self.frame_size).astype(np.float32)
+
+        self._remainder = np.empty(0, dtype=np.int16)
+        self._odd_byte = b""
+        self.active = False
+        self._run = 0  # consecutive raw speech frames while inactive
+        self._silence = 0  # consecutive raw non-speech frames while active
+
+    def reset(self):
+        self.active = False
+        self._run = 0
+        self._silence = 0
+
+    def features(self, frames: np.ndarray):
+        """Per-frame energy (dBFS), zero-crossing rate, spectral flatness and speech-band energy ratio."""
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        zcr = np.mean(np.abs(np.diff(np.signbit(frames), axis=1)), axis=1)
+        power = np.abs(np.fft.rfft(frames * self._window, axis=1)) ** 2 + 1e-12
+        flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+        band_ratio = power[:, self._speech_band].sum(axis=1) / power.sum(axis=1)
+        return energy_db, zcr, flatness, band_ratio
+
+    def classify(self, frames: np.ndarray) -> np.ndarray:
+        """Raw (unsmoothed) speech decision per frame; also advances the noise floor."""
+        energy_db, zcr, flatness, band_ratio = self.features(frames)
+        loud = (energy_db > self.noise_floor_db + self.snr_db) & (energy_db > ABSOLUTE_MIN_DB)
+        voiced = ((flatness < MAX_SPECTRAL_FLATNESS) | (zcr < MAX_ZERO_CROSSING_RATE)) & (band_ratio > MIN_SPEECH_BAND_RATIO)
+        raw = loud & voiced
+
+        # Minimum statistics: track the quietest frames, falling fast and rising slowly
+        quietest = float(np.percentile(energy_db, 10))
+        if not self._floor_seeded or quietest < self.noise_floor_db:
+            self._floor_seeded = True
+            self.noise_floor_db = quietest
+        else:
+            seconds = len(frames) * self.frame_ms / 1000
+            rise = 1 - (1 - NOISE_FLOOR_RISE_PER_SECOND) ** seconds
+            self.noise_floor_db += rise * (quietest - self.noise_floor_db)
+        return raw
+
+    def process(self, pcm: bytes) -> np.ndarray:
+        """Feed a chunk of PCM and return the smoothed speech flag of every complete frame it finished."""
+        data = self._odd_byte + pcm
+        usable = len(data) - len(data) % 2
+        self._odd_byte = data[usable:]
+        samples = np.concatenate([self._remainder, np.frombuffer(data[:usable], dtype=np.int16)])
+        count = len(samples) // self.frame_size
+        self._remainder = samples[count * self.frame_size:]
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+
+        frames = samples[:count * self.frame_size].reshape(count, self.frame_size)
+        return self.process_frames(frames)
+
+    def process_frames(self, frames: np.ndarray) -> np.ndarray:
+        """Smoothed speech flags for an (n, frame_size) int16 array of whole frames."""
+        if len(frames) == 0:
+            return np.zeros(0, dtype=bool)
+        raw = self.classify(frames.astype(np.float32) / 32768.0)
+        return self._smooth(raw)
+
+    def _smooth(self, raw: np.ndarray) -> np.ndarray:
+        flags = np.empty(len(raw), dtype=bool)
+        for i, speech in enumerate(raw):
+            if self.active:
+                self._silence = 0 if speech else self._silence + 1
+                if self._silence >= self.hangover_frames:
+                    self.active = False
+                    self._run = 0
+            else:
+                self._run = self._run + 1 if speech else 0
+                if self._run >= self.onset_frames:
+                    self.active = True
+                    self._silence = 0
+            flags[i] = self.active
+        return flags
+
+    def is_speech(self, pcm: bytes) -> Optional[bool]:
+        """Whether any frame of the chunk is inside a speech segment (None if the chunk held no full frame)."""
+        flags = self.process(pcm)
+        if len(flags) == 0:
+            return None
+        return bool(flags.any())
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+from app.config import WARMUP_STEPS, WARMUP_TIMEOUT_SECONDS, WHISPER_PRELOAD_MODELS
+from app.service.audio_dsp import TARGET_SAMPLE_RATE, encode_wav, process
+
+logger = logging.getLogger(__name__)
+
+# Bundled silence for the dummy inferences (1s, with a little dither so no stage divides by zero)
+SILENCE = np.random.default_rng(0).normal(0, 1e-4, TARGET_SAMPLE_RATE).astype(np.float32)
+
+# A step returns a note (e.g. why it was skipped) or None
+Step = Callable[[], Awaitable[Optional[str]]]
+
+
+class WarmUp:
+    """Runs the configured warm-up steps concurrently, timing each one.
+
+    A failing step is logged and reported but doesn't hold up readiness: the
+    worst case is that the first request pays for it, as it did before.
+    """
+
+    def __init__(self, steps: Dict[str, Step], enabled: Iterable[str] = WARMUP_STEPS,
+                 timeout: float = WARMUP_TIMEOUT_SECONDS):
+        enabled = set(enabled)
+        self.steps = {name: step for name, step in steps.items() if name in enabled}
+        self.timeout = timeout
+        self.results: Dict[str, Dict] = {name: {"status": "pending"} for name in self.steps}
+        self.done = False
+
+    async def _run_step(self, name: str, step: Step):
+        started = time.perf_counter()
+        try:
+            note = await step()
+            self.results[name] = {"status": "skipped" if note else "ok"}
+            if note:
+                self.results[name]["note"] = note
+        except Exception as e:
+            self.results[name] = {"status": "failed", "error": str(e)}
+            logger.warning(f"Warm-up step {name} failed: {str(e)}")
+        self.results[name]["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Warm-up step {name}: {self.results[name]['status']} in {self.results[name]['ms']:.0f}ms")
+
+    async def run(self) -> Dict[str, Dict]:
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(self._run_step(name, step)) for name, step in self.steps.items()]
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=self.timeout)
+            for task in pending:
+                task.cancel()
+            for name, result in self.results.items():
+                if result["status"] == "pending":
+                    result["status"] = "timed_out"
+            if pending:
+                logger.warning(f"Warm-up timed out after {self.timeout}s; {len(pending)} steps unfinished")
+        self.done = True
+        logger.info(f"Warm-up finished in {time.perf_counter() - started:.1f}s")
+        return self.results
+
+
+def default_steps(*anthropic_services) -> Dict[str, Step]:
+    """Warm-up for every engine a first request can touch, keyed by the names WARMUP_STEPS selects from."""
+    from app.service import hf_inference, pht
+    from app.service.audio_transcription import LocalWhisperEngine, TranscriptionMode, parse_model_spec
+    from app.service.lazy_import import _registry
+    from app.service.transcription_scheduler import get_scheduler
+
+    async def imports():
+        def load_all():
+            missing = []
+            for lazy in _registry:
+                try:
+                    lazy._load()
+                except ImportError:
+                    missing.append(lazy._name)
+            return missing
+
+        missing = await asyncio.to_thread(load_all)
+        if missing:
+            return f"not installed: {', '.join(missing)}"
+
+    async def langdetect():
+        # Loads the language profiles, which otherwise happens inside the first TTS request
+        await asyncio.to_thread(pht.detect, "Hola, cómo estás? Hello, how are you?")
+
+    async def dsp():
+        await asyncio.to_thread(process, SILENCE, TARGET_SAMPLE_RATE)
+
+    async def gender():
+        await asyncio.to_thread(pht.classify_gender_by_pitch, encode_wav(SILENCE))
+
+    async def whisper_local():
+        if os.getenv('ENV') != 'prod' or not WHISPER_PRELOAD_MODELS:
+            return "local whisper only runs in prod with WHISPER_PRELOAD_MODELS"
+        # Spawns every worker, which loads WHISPER_PRELOAD_MODELS in the pool initializer
+        engine = LocalWhisperEngine.get_instance()
+        for worker in await engine.preload():
+            logger.info(f"Whisper worker {worker['pid']} models: {worker['models']}")
+        for spec in WHISPER_PRELOAD_MODELS:
+            model_path, compute_type = parse_model_spec(spec)
+            await engine.warm(SILENCE, model_path, compute_type)
+
+    async def hf_asr():
+        # Opens the pooled HF session and wakes a scaled-to-zero endpoint; not cached
+        scheduler = get_scheduler(TranscriptionMode.HF.value, model_name="large")
+        await scheduler.transcribe(encode_wav(SILENCE), samples=SILENCE, cache=False)
+        if not hf_inference.session_open():
+            return "no HF session was opened"
+
+    async def anthropic():
+        # Listing models is free; it creates the clients and leaves a TLS connection in each pool
+        calls = []
+        for service in anthropic_services:
+            service._system_prompt("translate")
+            calls += [
+                asyncio.to_thread(service.client.models.list, limit=1),
+                service.async_client.models.list(limit=1),
+            ]
+        await asyncio.gather(*calls)
+
+    async def tts():
+        await asyncio.to_thread(pht.PHT)
+
+    return {
+        "imports": imports,
+        "langdetect": langdetect,
+        "dsp": dsp,
+        "gender": gender,
+        "whisper_local": whisper_local,
+        "hf_asr": hf_asr,
+        "anthropic": anthropic,
+        "tts": tts,
+    }
@@ -0,0 +1 @@
+# Benchmarks are standalone scripts: python -m app.tests.benchmarks.<name>
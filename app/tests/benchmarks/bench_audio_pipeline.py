@@ -0,0 +1,83 @@
+"""Per-clip throughput of the NumPy preprocessing pipeline.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_audio_pipeline [--seconds 5 30] [--clips 50]
+
+Clips are synthetic 44.1kHz stereo 16-bit WAVs, i.e. the worst case for the
+decode/mono/resample path. If pydub is installed, its equivalent
+normalize/filter/mono/resample chain is timed on the same clips for
+comparison (WAV input doesn't need ffmpeg there either, so this understates
+pydub's cost for compressed formats).
+"""
+import argparse
+import io
+import time
+
+import numpy as np
+import soundfile as sf
+
+from app.service.audio_dsp import decode_and_process, encode_wav
+
+SOURCE_RATE = 44100
+
+
+def make_clip(seconds: float, rng: np.random.Generator) -> bytes:
+    n = int(seconds * SOURCE_RATE)
+    t = np.arange(n) / SOURCE_RATE
+    voice = np.sin(2 * np.pi * 180 * t) * (np.sin(2 * np.pi * 3 * t) > 0) + 0.05 * rng.standard_normal(n)
+    stereo = np.stack([voice, voice * 0.8], axis=1) * 0.3
+    buffer = io.BytesIO()
+    sf.write(buffer, stereo, SOURCE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def numpy_pipeline(clip: bytes) -> bytes:
+    return encode_wav(decode_and_process(clip))
+
+
+def pydub_pipeline(clip: bytes) -> bytes:
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(io.BytesIO(clip), format="wav")
+    audio = audio.normalize().high_pass_filter(100).low_pass_filter(8000)
+    audio = audio.set_channels(1).set_frame_rate(16000)
+    output = io.BytesIO()
+    audio.export(output, format="wav")
+    return output.getvalue()
+
+
+def measure(name: str, pipeline, clip: bytes, seconds: float, clips: int):
+    pipeline(clip)  # warm up
+    timings = []
+    for _ in range(clips):
+        start = time.perf_counter()
+        pipeline(clip)
+        timings.append(time.perf_counter() - start)
+    timings = np.array(timings)
+    print(f"  {name:<6} {1 / timings.mean():8.1f} clips/s   {timings.mean() * 1000:7.2f} ms/clip   "
+          f"{seconds / timings.mean():8.0f}x realtime")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5, 30])
+    parser.add_argument("--clips", type=int, default=50)
+    args = parser.parse_args()
+
+    try:
+        import pydub  # noqa: F401
+        pipelines = [("numpy", numpy_pipeline), ("pydub", pydub_pipeline)]
+    except ImportError:
+        pipelines = [("numpy", numpy_pipeline)]
+
+    rng = np.random.default_rng(0)
+    for seconds in args.seconds:
+        clip = make_clip(seconds, rng)
+        print(f"{seconds:g}s clip, {len(clip) / 1024:.0f} KiB:")
+        for name, pipeline in pipelines:
+            measure(name, pipeline, clip, seconds, args.clips)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Accuracy and latency of the local pitch-based gender classifier.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_gender_detection [--samples-dir DIR]
+
+Synthetic voices are generated on the fly. Recorded clips can be added with
+--samples-dir; any audio file whose name starts with "male" or "female" is
+used and labelled by that prefix.
+"""
+import argparse
+import io
+import time
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from app.config import GENDER_PITCH_CONFIDENCE
+from app.service.pht import classify_gender_by_pitch
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_voice(f0: float, seconds: float, rng: np.random.Generator) -> bytes:
+    """Harmonic source with vibrato, jitter, syllable gaps and background noise, as WAV bytes."""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    contour = f0 * (1 + 0.04 * np.sin(2 * np.pi * 4.5 * t) + 0.01 * rng.standard_normal(n).cumsum() / np.sqrt(n))
+    phase = 2 * np.pi * np.cumsum(contour) / SAMPLE_RATE
+    harmonics = np.arange(1, 16)[:, None]
+    voice = (np.sin(harmonics * phase) / harmonics ** 1.2).sum(axis=0)
+    syllables = (np.sin(2 * np.pi * 3.0 * t + rng.uniform(0, np.pi)) > -0.3).astype(np.float64)
+    signal = 0.3 * voice / np.abs(voice).max() * syllables + 0.01 * rng.standard_normal(n)
+    buffer = io.BytesIO()
+    sf.write(buffer, signal.astype(np.float32), SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def synthetic_samples(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        label = "male" if i % 2 == 0 else "female"
+        f0 = rng.uniform(85, 155) if label == "male" else rng.uniform(165, 255)
+        yield f"synthetic-{label}-{f0:.0f}Hz", label, synthetic_voice(f0, rng.uniform(1.5, 6.0), rng)
+
+
+def recorded_samples(samples_dir: Path):
+    for path in sorted(samples_dir.iterdir()):
+        name = path.name.lower()
+        label = "female" if name.startswith("female") else "male" if name.startswith("male") else None
+        if label:
+            yield path.name, label, path.read_bytes()
+
+
+def run(samples):
+    rows = []
+    for name, label, audio in samples:
+        start = time.perf_counter()
+        predicted, confidence = classify_gender_by_pitch(audio)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        rows.append((name, label, predicted, confidence, elapsed_ms))
+    return rows
+
+
+def report(title: str, rows):
+    if not rows:
+        print(f"{title}: no samples")
+        return
+    accepted = [r for r in rows if r[2] is not None and r[3] >= GENDER_PITCH_CONFIDENCE]
+    correct = sum(r[1] == r[2] for r in rows)
+    accepted_correct = sum(r[1] == r[2] for r in accepted)
+    latencies = np.array([r[4] for r in rows])
+    print(f"{title}: {len(rows)} samples")
+    print(f"  overall accuracy:      {correct / len(rows):.1%}")
+    print(f"  fast-path acceptance:  {len(accepted) / len(rows):.1%} (confidence >= {GENDER_PITCH_CONFIDENCE})")
+    if accepted:
+        print(f"  fast-path accuracy:    {accepted_correct / len(accepted):.1%}")
+    print(f"  latency p50/p95/max:   {np.percentile(latencies, 50):.1f} / "
+          f"{np.percentile(latencies, 95):.1f} / {latencies.max():.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=200, help="number of synthetic voices")
+    parser.add_argument("--samples-dir", type=Path, help="directory of recorded male*/female* clips")
+    args = parser.parse_args()
+
+    # The first YIN call JIT-compiles; keep it out of the latency numbers
+    classify_gender_by_pitch(synthetic_voice(120.0, 1.0, np.random.default_rng(1)))
+
+    report("synthetic", run(synthetic_samples(args.synthetic)))
+    if args.samples_dir:
+        report("recorded", run(recorded_samples(args.samples_dir)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Concurrent HF transcriptions against a local fake inference endpoint.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_hf_transcription [--latency-ms 300] [--concurrency 1 8 32]
+
+Compares the old pattern (a blocking HTTP call inside the coroutine) with the
+pooled async client. The fake endpoint runs on its own thread and event loop
+so the blocking variant cannot stall it.
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import numpy as np
+import requests
+from aiohttp import web
+
+from app.service.hf_inference import HFInferenceClient, close_session
+
+MODEL = "openai/whisper-small"
+AUDIO = b"OggS" + bytes(20000)  # roughly a 5s Telegram voice note
+
+
+def start_fake_endpoint(latency: float) -> str:
+    ready = threading.Event()
+    address = {}
+
+    async def transcribe(request):
+        await request.read()
+        await asyncio.sleep(latency)
+        return web.json_response({"text": "hola como estas"})
+
+    async def serve():
+        app = web.Application(client_max_size=10 * 1024 * 1024)
+        app.router.add_post("/models/{org}/{name}", transcribe)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        address["url"] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/models"
+        ready.set()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return address["url"]
+
+
+async def blocking_transcribe(session: requests.Session, url: str) -> float:
+    start = time.perf_counter()
+    session.post(f"{url}/{MODEL}", data=AUDIO, headers={"Content-Type": "audio/ogg"}).json()
+    return time.perf_counter() - start
+
+
+async def async_transcribe(client: HFInferenceClient) -> float:
+    start = time.perf_counter()
+    await client.automatic_speech_recognition(AUDIO)
+    return time.perf_counter() - start
+
+
+async def measure(name: str, make_call, concurrency: int, rounds: int):
+    await make_call()  # open connections before timing
+    start = time.perf_counter()
+    latencies = []
+    for _ in range(rounds):
+        latencies += await asyncio.gather(*(make_call() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    print(f"  {name:<9} {len(latencies) / wall:8.1f} req/s   "
+          f"p50 {np.percentile(latencies, 50):7.0f} ms   p95 {np.percentile(latencies, 95):7.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    url = start_fake_endpoint(args.latency_ms / 1000)
+    client = HFInferenceClient(MODEL, token="fake", base_url=url)
+    session = requests.Session()
+    print(f"fake endpoint latency {args.latency_ms:.0f} ms")
+    for concurrency in args.concurrency:
+        print(f"concurrency {concurrency}:")
+        await measure("blocking", lambda: blocking_transcribe(session, url), concurrency, args.rounds)
+        await measure("async", lambda: async_transcribe(client), concurrency, args.rounds)
+    await close_session()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
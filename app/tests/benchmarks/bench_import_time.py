@@ -0,0 +1,88 @@
+"""Cold-start import time of app.main, per module.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_import_time [--module app.main] [--runs 5] [--top 20]
+
+Each run imports the module in a fresh interpreter with `-X importtime`, so
+nothing is cached in sys.modules. The report lists the median total and the
+modules with the largest cumulative import time, then what each lazily
+imported dependency costs on first use (the latency the first request that
+needs it pays instead).
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+FIRST_USE_SCRIPT = """
+import json, time
+import {module}
+from app.service.lazy_import import _registry
+costs = {{}}
+for lazy in _registry:
+    started = time.perf_counter()
+    try:
+        lazy._load()
+        costs[lazy._name] = round((time.perf_counter() - started) * 1000, 1)
+    except Exception as e:
+        costs[lazy._name] = repr(e)
+print(json.dumps(costs))
+"""
+
+
+def import_times(module: str):
+    """(total_us, {module: cumulative_us}) for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|").split("|"))
+        cumulative[name] = int(cumulative_us)
+    return cumulative.get(module, max(cumulative.values())), cumulative
+
+
+def first_use_costs(module: str):
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_USE_SCRIPT.format(module=module)], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    totals = []
+    per_module = defaultdict(list)
+    for _ in range(args.runs):
+        total, cumulative = import_times(args.module)
+        totals.append(total)
+        for name, us in cumulative.items():
+            per_module[name].append(us)
+
+    print(f"import {args.module}: median {statistics.median(totals) / 1000:.0f}ms over {args.runs} cold runs "
+          f"(min {min(totals) / 1000:.0f}ms, max {max(totals) / 1000:.0f}ms)")
+    print(f"\n{'module':50} {'cumulative ms':>14}")
+    ranked = sorted(per_module.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, samples in ranked[:args.top]:
+        print(f"{name:50} {statistics.median(samples) / 1000:14.1f}")
+
+    # Loaded in declaration order, so a name sharing a package with an earlier one shows only its own increment
+    print(f"\n{'deferred until first use':50} {'ms':>14}")
+    costs = first_use_costs(args.module)
+    for name, cost in sorted(costs.items(), key=lambda item: item[1] if isinstance(item[1], float) else -1, reverse=True):
+        print(f"{name:50} {cost:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Hot-path cost of the pipeline metrics.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_metrics [--iterations 200000] [--series 50]
+
+Times an empty loop, a bare Histogram.observe, a `with Stage(...)` block and
+a /metrics render with --series label combinations already recorded, so the
+per-stage overhead can be compared with stages that take milliseconds.
+"""
+import argparse
+import time
+
+from app.service.metrics import Histogram, Registry, Stage
+
+
+def per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200_000)
+    parser.add_argument("--series", type=int, default=50)
+    args = parser.parse_args()
+
+    histogram = Histogram("bench_seconds", "Benchmark", ("pipeline", "stage", "mode", "model", "outcome"))
+
+    def observe():
+        histogram.observe(0.12, pipeline="telegram_voice", stage="translate", mode="", model="anthropic", outcome="ok")
+
+    def stage():
+        with Stage("telegram_voice", "translate", model="anthropic"):
+            pass
+
+    baseline = per_call_ns(lambda: None, args.iterations)
+    print(f"{'empty call':24} {baseline:8.0f}ns")
+    print(f"{'Histogram.observe':24} {per_call_ns(observe, args.iterations) - baseline:8.0f}ns")
+    print(f"{'with Stage(...)':24} {per_call_ns(stage, args.iterations) - baseline:8.0f}ns")
+
+    registry = Registry()
+    histogram = registry.register(Histogram("render_seconds", "Benchmark", ("stage",)))
+    for i in range(args.series):
+        histogram.observe(0.1, stage=f"stage{i}")
+    started = time.perf_counter()
+    text = registry.render()
+    print(f"{'render':24} {(time.perf_counter() - started) * 1000:8.2f}ms for {args.series} series "
+          f"({len(text) / 1024:.0f}KB)")
+
+
+if __name__ == "__main__":
+    main()
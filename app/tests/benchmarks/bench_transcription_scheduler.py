@@ -0,0 +1,86 @@
+"""Segments per second through the transcription scheduler at 1, 8 and 32 concurrent streams.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_transcription_scheduler [--streams 1 8 32]
+
+The backend is simulated so the numbers isolate scheduling: a batched local
+inference costs --batch-ms plus --item-ms per segment (encoder work amortizes
+across a batch) on each of --workers workers. Every stream sends its next
+segment as soon as the previous one is transcribed. "direct" sends one
+request per segment to the same backend, as the handlers did before.
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.service.audio_transcription import Transcription
+from app.service.transcription_scheduler import TranscriptionScheduler
+
+
+class SimulatedBackend:
+    def __init__(self, workers: int, batch_ms: float, item_ms: float):
+        self.workers = asyncio.Semaphore(workers)
+        self.batch_cost = batch_ms / 1000
+        self.item_cost = item_ms / 1000
+
+    async def transcribe_batch(self, items, cache=None):
+        async with self.workers:
+            await asyncio.sleep(self.batch_cost + self.item_cost * len(items))
+        return [Transcription(text="hola") for _ in items]
+
+
+async def stream(transcribe, segments: int, latencies: list):
+    for _ in range(segments):
+        start = time.perf_counter()
+        await transcribe(bytearray(b"segment"))
+        latencies.append(time.perf_counter() - start)
+
+
+async def run(name: str, transcribe, streams: int, segments: int):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(stream(transcribe, segments, latencies) for _ in range(streams)))
+    wall = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    print(f"  {name:<10} {len(latencies) / wall:7.1f} segments/s   "
+          f"p50 {np.percentile(latencies, 50):6.0f} ms   p95 {np.percentile(latencies, 95):6.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--segments", type=int, default=10, help="segments per stream")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-ms", type=float, default=300)
+    parser.add_argument("--item-ms", type=float, default=40)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    for streams in args.streams:
+        print(f"{streams} concurrent streams:")
+        backend = SimulatedBackend(args.workers, args.batch_ms, args.item_ms)
+
+        async def direct(voice_data):
+            return (await backend.transcribe_batch([(voice_data, False, None)]))[0]
+
+        await run("direct", direct, streams, args.segments)
+
+        scheduler = TranscriptionScheduler(
+            SimulatedBackend(args.workers, args.batch_ms, args.item_ms),
+            max_batch_size=args.max_batch,
+            max_wait_ms=args.wait_ms,
+            max_concurrent_batches=args.workers,
+        )
+        await run("scheduled", scheduler.transcribe, streams, args.segments)
+        await scheduler.close()
+        stats = scheduler.stats()
+        print(f"             batch sizes {stats['batch_size_distribution']}, "
+              f"queue delay p50 {stats['queue_delay_ms']['p50']} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
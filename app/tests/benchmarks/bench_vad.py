@@ -0,0 +1,65 @@
+"""CPU cost per WebSocket stream of the frame-level VAD.
+
+Run from the repository root:
+
+    python -m app.tests.benchmarks.bench_vad [--seconds 60] [--chunk-ms 100 250 500]
+
+A synthetic stream (background noise with voiced bursts) is fed through
+FrameVAD in client-sized chunks. The report shows CPU time per second of
+audio and how many concurrent real-time streams one core could keep up
+with. The legacy whole-chunk mean-amplitude check is timed alongside for
+reference.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.service.vad import FrameVAD
+
+SAMPLE_RATE = 16000
+
+
+def make_stream(seconds: float, rng: np.random.Generator) -> bytes:
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    phase = 2 * np.pi * 140 * t
+    voice = sum(np.sin(k * phase) / k for k in range(1, 20)) * 0.05
+    gate = (np.sin(2 * np.pi * 0.2 * t) > 0).astype(np.float64)  # 2.5s speech / 2.5s pause
+    signal = voice * gate + 0.003 * rng.standard_normal(n)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def legacy_is_speech(chunk: bytes, threshold: float = 0.0125) -> bool:
+    audio = np.frombuffer(chunk[:len(chunk) - len(chunk) % 2], dtype=np.int16)
+    return np.mean(np.abs(audio)) / 32768.0 > threshold
+
+
+def measure(name: str, feed, pcm: bytes, chunk_bytes: int, seconds: float):
+    chunks = [pcm[i:i + chunk_bytes] for i in range(0, len(pcm), chunk_bytes)]
+    start = time.process_time()
+    for chunk in chunks:
+        feed(chunk)
+    elapsed = time.process_time() - start
+    per_second = elapsed / seconds
+    print(f"  {name:<7} {per_second * 1000:7.3f} ms CPU per audio second   "
+          f"{1 / per_second if per_second else float('inf'):8.0f} streams/core")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--chunk-ms", type=int, nargs="+", default=[100, 250, 500])
+    args = parser.parse_args()
+
+    pcm = make_stream(args.seconds, np.random.default_rng(0))
+    FrameVAD().process(pcm[:SAMPLE_RATE * 2])  # warm up
+    for chunk_ms in args.chunk_ms:
+        chunk_bytes = SAMPLE_RATE * chunk_ms // 1000 * 2
+        print(f"{chunk_ms}ms chunks, {args.seconds:g}s stream:")
+        measure("frame", FrameVAD().process, pcm, chunk_bytes, args.seconds)
+        measure("legacy", legacy_is_speech, pcm, chunk_bytes, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
+import asyncio
 import unittest
-from unittest.mock import patch
-from app.service.anthropic import AnthropicService
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.service.anthropic import AnthropicService, format_prompt
 from app.service.prompts.prompts import PROMPTS
 
 class TestAnthropicService(unittest.TestCase):
@@ -48,5 +50,187 @@ class TestAnthropicService(unittest.TestCase):
         self.assertEqual(response, "")
         mock_logger.error.assert_called_once_with("Error getting response from Anthropics API: API failure")
 
+class FakeStream:
+    """Stands in for AsyncMessageStream: yields deltas, then the final message"""
+
+    def __init__(self, model, deltas, fail_at=None, cache_read=0):
+        self.model = model
+        self.deltas = deltas
+        self.fail_at = fail_at
+        self.cache_read = cache_read
+        self.closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+
+    @property
+    async def text_stream(self):
+        for i, text in enumerate(self.deltas):
+            if i == self.fail_at:
+                raise RuntimeError("overloaded")
+            await asyncio.sleep(0)
+            yield text
+
+    async def get_final_message(self):
+        usage = SimpleNamespace(input_tokens=900, output_tokens=len(self.deltas),
+                                cache_read_input_tokens=self.cache_read, cache_creation_input_tokens=0)
+        return SimpleNamespace(model=self.model, stop_reason="end_turn", usage=usage)
+
+class TestStreamResponse(unittest.IsolatedAsyncioTestCase):
+    def service(self, *streams):
+        self.enterContext(patch('app.service.anthropic.Anthropic'))
+        MockAsync = self.enterContext(patch('app.service.anthropic.AsyncAnthropic'))
+        service = AnthropicService()
+        calls = iter(streams)
+        MockAsync.return_value.messages.stream.side_effect = lambda **kwargs: next(calls)
+        return service, MockAsync.return_value.messages.stream
+
+    async def test_streams_deltas_then_metadata(self):
+        service, create = self.service(FakeStream("primary", ["Hola", " amigo"], cache_read=850))
+        events = [event async for event in service.stream_response(user_input="Hi friend")]
+
+        self.assertEqual([event["text"] for event in events[:-1]], ["Hola", " amigo"])
+        done = events[-1]
+        self.assertEqual((done["type"], done["model"], done["cache_hit"]), ("done", "primary", True))
+        self.assertEqual(set(done["latency_ms"]), {"first_token", "generation", "total"})
+        system = create.call_args.kwargs["system"]
+        self.assertEqual(system[0]["cache_control"], {"type": "ephemeral"})
+
+    async def test_falls_back_only_before_first_token(self):
+        service, create = self.service(FakeStream("primary", ["x"], fail_at=0), FakeStream("fallback", ["Hola"]))
+        events = [event async for event in service.stream_response(user_input="Hi")]
+        self.assertEqual(events[-1]["model"], "fallback")
+        self.assertEqual(create.call_count, 2)
+
+        service, create = self.service(FakeStream("primary", ["Ho", "la"], fail_at=1))
+        with self.assertRaises(RuntimeError):
+            [event async for event in service.stream_response(user_input="Hi")]
+        self.assertEqual(create.call_count, 1)
+
+    async def test_closing_the_generator_closes_the_upstream_stream(self):
+        stream = FakeStream("primary", ["a", "b", "c"])
+        service, _ = self.service(stream)
+        events = service.stream_response(user_input="Hi")
+        self.assertEqual((await events.__anext__())["text"], "a")
+        await events.aclose()
+        self.assertTrue(stream.closed)
+
+    async def test_missing_input(self):
+        service, create = self.service()
+        with self.assertRaises(ValueError):
+            [event async for event in service.stream_response(user_input="")]
+        create.assert_not_called()
+
+class TestTranslateMany(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.enterContext(patch('app.service.anthropic.Anthropic'))
+        MockAsync = self.enterContext(patch('app.service.anthropic.AsyncAnthropic'))
+        self.service = AnthropicService()
+        self.calls = []
+        self.cancelled = []
+        languages = {}
+        system_prompt = self.service._system_prompt
+
+        def record_prompt(prompt_key, language=None, locale=None):
+            self.calls.append((language, locale))
+            prompt = system_prompt(prompt_key, language, locale)
+            languages[prompt] = language
+            return prompt
+
+        async def create(**kwargs):
+            language = languages[kwargs["system"]]
+            try:
+                await asyncio.sleep({"french": 0.03, "german": 0.01, "spanish": 0.02, "italian": 10}[language])
+            except asyncio.CancelledError:
+                self.cancelled.append(language)
+                raise
+            return MagicMock(content=[MagicMock(text=f"{kwargs['messages'][0]['content']} in {language}")])
+
+        self.service._system_prompt = record_prompt
+        MockAsync.return_value.messages.create.side_effect = create
+        self.sync_create = self.service.client.messages.create
+
+    async def test_targets_run_concurrently_and_arrive_as_they_finish(self):
+        targets = [{"language": "french", "locale": "Paris, France"}, {"language": "german"}, {"language": "spanish"}]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = [result async for result in self.service.translate_many("hi", targets)]
+
+        self.assertLess(loop.time() - started, 0.06)
+        self.assertEqual([result["language"] for result in results], ["german", "spanish", "french"])
+        self.assertEqual(results[0]["translated_text"], "hi in german")
+        # a target without a locale is written for its language, not the service's default locale
+        self.assertIn(("german", None), self.calls)
+        self.assertEqual(results[0]["locale"], "german")
+        self.assertNotIn(self.service.locale, self.service._system_prompt("translate", "german"))
+        self.assertIn(("french", "Paris, France"), self.calls)
+        self.sync_create.assert_not_called()
+
+    async def test_closing_cancels_unfinished_targets(self):
+        results = self.service.translate_many("hi", [{"language": "german"}, {"language": "italian"}])
+        self.assertEqual((await results.__anext__())["language"], "german")
+        await results.aclose()
+        await asyncio.sleep(0)
+        self.assertEqual(self.cancelled, ["italian"])
+
+    def test_prompts_are_formatted_once_per_target(self):
+        format_prompt.cache_clear()
+        for _ in range(3):
+            self.service._system_prompt("translate", "french", "Paris, France")
+            self.service._system_prompt("translate")
+        info = format_prompt.cache_info()
+        self.assertEqual((info.misses, info.hits), (2, 4))
+        self.assertIn("Paris, France", self.service._system_prompt("translate", "french", "Paris, France"))
+        self.assertIn(self.service.locale, self.service._system_prompt("translate", self.service.language))
+
+class TestTranslateTextStreamRoute(unittest.TestCase):
+    def test_sse_events(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.api import routes
+
+        async def stream_response(user_input, language=None, locale=None):
+            yield {"type": "delta", "text": "Ho"}
+            yield {"type": "delta", "text": "la"}
+            yield {"type": "done", "model": "m", "cache_hit": False, "latency_ms": {"total": 1.0}}
+
+        app = FastAPI()
+        app.include_router(routes.router)
+        with patch.object(routes.anthropic_service, "stream_response", stream_response):
+            response = TestClient(app).post("/api/v1/translate/text/stream", json={"text": "Hello"})
+
+        self.assertEqual(response.headers["content-type"].split(";")[0], "text/event-stream")
+        blocks = [block for block in response.text.split("\n\n") if block]
+        self.assertEqual(blocks[:2], ['event: delta\ndata: {"text": "Ho"}', 'event: delta\ndata: {"text": "la"}'])
+        self.assertTrue(blocks[2].startswith("event: done"))
+        self.assertIn('"request":', blocks[2])
+
+    def test_targets_route(self):
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+        from app.api import routes
+
+        async def translate_many(text, targets):
+            for target in reversed(targets):
+                yield {"language": target["language"], "locale": target["locale"], "translated_text": text, "latency_ms": 1.0}
+
+        app = FastAPI()
+        app.include_router(routes.router)
+        client = TestClient(app)
+        with patch.object(routes.anthropic_service, "translate_many", translate_many):
+            response = client.post("/api/v1/translate/text/targets",
+                                   json={"text": "Hello", "targets": [{"language": "french"}, {"language": "german"}]})
+            too_many = client.post("/api/v1/translate/text/targets",
+                                   json={"text": "Hello", "targets": [{"language": "x"}] * 100})
+
+        blocks = [block for block in response.text.split("\n\n") if block]
+        self.assertEqual([block.split("\n")[0] for block in blocks], ["event: translation"] * 2 + ["event: done"])
+        self.assertIn('"language": "german"', blocks[0])
+        self.assertIn('"failed": 0', blocks[2])
+        self.assertEqual(too_many.status_code, 422)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,62 @@
+import io
+import unittest
+import numpy as np
+import soundfile as sf
+from app.service.audio_dsp import (
+    UnsupportedAudioFormat,
+    band_limit,
+    decode_wav,
+    encode_wav,
+    load_audio,
+    resample,
+)
+
+def make_wav(samples, sr, subtype):
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sr, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+class TestDecodeWav(unittest.TestCase):
+    def setUp(self):
+        t = np.arange(4410) / 44100
+        tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+        self.stereo = np.stack([tone, -tone], axis=1).astype(np.float32)
+
+    def test_decodes_pcm_and_float_encodings(self):
+        for subtype, tolerance in [("PCM_U8", 1e-2), ("PCM_16", 1e-4), ("PCM_24", 1e-6), ("PCM_32", 1e-6), ("FLOAT", 0)]:
+            with self.subTest(subtype=subtype):
+                samples, sr = decode_wav(make_wav(self.stereo, 44100, subtype))
+                self.assertEqual(sr, 44100)
+                self.assertEqual(samples.shape, self.stereo.shape)
+                np.testing.assert_allclose(samples, self.stereo, atol=tolerance)
+
+    def test_rejects_other_containers(self):
+        with self.assertRaises(UnsupportedAudioFormat):
+            decode_wav(b"OggS" + bytes(100))
+
+class TestAudioPipeline(unittest.IsolatedAsyncioTestCase):
+    def test_resample_length(self):
+        self.assertEqual(len(resample(np.zeros(44100, dtype=np.float32), 44100)), 16000)
+
+    def test_highpass_removes_dc(self):
+        filtered = band_limit(np.full(16000, 0.5, dtype=np.float32), 16000)
+        self.assertLess(abs(filtered[-1000:]).max(), 1e-3)
+
+    async def test_load_audio_outputs_normalized_16k_mono(self):
+        t = np.arange(48000) / 48000
+        stereo = np.stack([0.1 * np.sin(2 * np.pi * 300 * t)] * 2, axis=1)
+
+        samples = await load_audio(make_wav(stereo, 48000, "PCM_16"))
+
+        self.assertEqual(samples.ndim, 1)
+        self.assertEqual(len(samples), 16000)
+        self.assertAlmostEqual(float(np.abs(samples).max()), 10 ** (-0.1 / 20), places=3)
+
+    def test_encode_wav_round_trip(self):
+        samples = np.linspace(-0.5, 0.5, 1600, dtype=np.float32)
+        decoded, sr = decode_wav(encode_wav(samples))
+        self.assertEqual(sr, 16000)
+        np.testing.assert_allclose(decoded[:, 0], samples, atol=1e-4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.service.hf_inference import (
+    HFInferenceClient,
+    HFInferenceError,
+    close_session,
+    get_session,
+    sniff_audio_content_type,
+)
+
+class TestSniffAudioContentType(unittest.TestCase):
+    def test_known_containers(self):
+        self.assertEqual(sniff_audio_content_type(b"RIFF\x00\x00\x00\x00WAVEfmt "), "audio/wav")
+        self.assertEqual(sniff_audio_content_type(b"OggS\x00\x02"), "audio/ogg")
+        self.assertEqual(sniff_audio_content_type(b"ID3\x04"), "audio/mpeg")
+        self.assertEqual(sniff_audio_content_type(b"\x00\x01\x02\x03"), "application/octet-stream")
+
+class TestHFInferenceClient(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.requests = []
+        self.responses = []
+
+        async def handler(request):
+            self.requests.append((request.headers["Content-Type"], await request.read()))
+            status, body, *headers = self.responses.pop(0)
+            return web.json_response(body, status=status, headers=headers[0] if headers else None)
+
+        app = web.Application()
+        app.router.add_post("/models/{org}/{name}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.client = HFInferenceClient(
+            "openai/whisper-small",
+            token="token",
+            base_url=str(self.server.make_url("/models")),
+            backoff=0,
+        )
+
+    async def asyncTearDown(self):
+        await close_session()
+        await self.server.close()
+
+    async def test_sends_raw_bytes_with_content_type(self):
+        self.responses = [(200, {"text": "hola"})]
+
+        text = await self.client.automatic_speech_recognition(b"OggS audio")
+
+        self.assertEqual(text, "hola")
+        self.assertEqual(self.requests, [("audio/ogg", b"OggS audio")])
+
+    async def test_retries_transient_errors(self):
+        self.responses = [(503, {"error": "loading"}), (200, {"text": "hello"})]
+
+        self.assertEqual(await self.client.automatic_speech_recognition(b"RIFF"), "hello")
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_client_errors_are_not_retried(self):
+        self.responses = [(400, {"error": "bad audio"})]
+
+        with self.assertRaises(HFInferenceError):
+            await self.client.automatic_speech_recognition(b"RIFF")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_retry_after_is_capped_at_the_timeout(self):
+        self.responses = [(429, {"error": "slow down"}, {"Retry-After": "3600"}), (200, {"text": "hello"})]
+
+        started = time.monotonic()
+        with patch("app.service.hf_inference.HF_TIMEOUT_SECONDS", 0.05):
+            self.assertEqual(await self.client.automatic_speech_recognition(b"RIFF"), "hello")
+        self.assertLess(time.monotonic() - started, 1)
+
+class TestSession(unittest.TestCase):
+    def test_session_is_recreated_on_a_new_loop(self):
+        async def session():
+            return get_session()
+
+        first = asyncio.run(session())
+        second = asyncio.run(session())
+        self.assertIsNot(first, second)
+        asyncio.run(close_session())
+
+if __name__ == '__main__':
+    unittest.main()
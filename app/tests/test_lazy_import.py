@@ -0,0 +1,67 @@
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.service.lazy_import import LazyImport, is_loaded, lazy_import_stats
+
+# Dependencies only some request paths need; importing app.main must not pull them in
+HEAVY_MODULES = ["anthropic", "scipy.signal", "pyht", "telegram", "faster_whisper", "aiohttp", "av"]
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+class TestLazyImport(unittest.TestCase):
+    def test_imports_on_first_use(self):
+        lazy = LazyImport("colorsys", "rgb_to_hsv")
+        self.assertFalse(is_loaded(lazy))
+        self.assertEqual(lazy(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(is_loaded(lazy))
+        self.assertIsNotNone(lazy_import_stats()["colorsys.rgb_to_hsv"])
+
+        module = LazyImport("json")
+        self.assertEqual(module.dumps([1]), "[1]")
+        # members of the target are never shadowed by the proxy's own
+        self.assertEqual(module.load, __import__("json").load)
+
+    def test_missing_module_fails_on_use_not_on_declaration(self):
+        lazy = LazyImport("no_such_module_for_tests")
+        with self.assertRaises(ImportError):
+            lazy.anything
+        self.assertFalse(is_loaded(lazy))
+
+    def test_app_main_defers_heavy_dependencies(self):
+        script = (
+            "import sys, json; import app.main; "
+            f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+        )
+        # From the repository root, so `app` is importable wherever pytest was started
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=REPO_ROOT
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "[]")
+
+
+class TestReadiness(unittest.TestCase):
+    def test_ready_reports_engines(self):
+        from app import main
+
+        client = TestClient(main.fastapi_app)
+        main.ready = False
+        try:
+            response = client.get("/ready")
+            self.assertEqual(response.status_code, 503)
+            main.ready = True
+            body = client.get("/ready").json()
+        finally:
+            main.ready = False
+        self.assertTrue(body["ready"])
+        self.assertEqual(set(body["engines"]), {"anthropic", "tts", "audio_dsp", "hf_inference", "whisper_local", "telegram"})
+        self.assertIn("scipy.signal", body["lazy_imports_ms"])
+        self.assertIn("anthropic", body["warmup"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+from app.service.audio_transcription import (
+    LocalWhisperEngine,
+    Transcription,
+    TranscriptionMode,
+    WhisperHandler,
+    WhisperModelCache,
+    parse_model_spec,
+)
+from app.service.transcription_cache import transcription_cache
+
+@patch.dict('os.environ', {'ENV': 'prod'})
+class TestLocalTranscription(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        transcription_cache.clear()
+        self.addCleanup(transcription_cache.clear)
+        self.engine = AsyncMock()
+        patcher = patch.object(LocalWhisperEngine, 'get_instance', return_value=self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_transcribe_voice_uses_pool(self):
+        self.engine.transcribe.return_value = Transcription("hola", "es", "/data/models/small")
+        handler = WhisperHandler(TranscriptionMode.LOCAL.value, "small")
+
+        result = await handler.transcribe_voice(bytearray(b"audio"))
+
+        self.assertEqual(result, "hola")
+        audio, model_path, _, languages = self.engine.transcribe.call_args.args
+        self.assertEqual(audio, b"audio")
+        self.assertEqual(model_path, "/data/models/small")
+        self.assertEqual(languages, ["en", "es"])
+
+    async def test_detect_language_lifts_language_restriction(self):
+        self.engine.transcribe.return_value = Transcription("bonjour", "fr")
+        handler = WhisperHandler(TranscriptionMode.LOCAL.value)
+
+        result = await handler.transcribe(bytearray(b"audio"), detect_language=True)
+
+        self.assertEqual(result.language, "fr")
+        self.assertIsNone(self.engine.transcribe.call_args.args[3])
+
+    async def test_worker_failure_returns_empty_text(self):
+        self.engine.transcribe.side_effect = RuntimeError("worker died")
+        handler = WhisperHandler(TranscriptionMode.LOCAL.value)
+
+        self.assertEqual(await handler.transcribe_voice(bytearray(b"audio")), "")
+
+class TestLocalWhisperEngine(unittest.TestCase):
+    def test_cpu_threads_split_across_workers(self):
+        engine = LocalWhisperEngine(workers=3, cpu_threads=16)
+        self.addCleanup(engine.shutdown)
+        self.assertEqual(engine.threads_per_worker, 5)
+
+    @patch('app.service.audio_transcription.WHISPER_MODEL_PATH', '/models')
+    def test_model_path_is_a_directory_of_models(self):
+        self.assertEqual(parse_model_spec("base"), ("/models/base", "int8"))
+        self.assertEqual(parse_model_spec("large:float32"), ("/models/large", "float32"))
+
+    def test_model_stats_reach_every_worker(self):
+        engine = LocalWhisperEngine(workers=3, cpu_threads=3)
+        self.addCleanup(engine.shutdown)
+        self.assertEqual(len(asyncio.run(engine.model_stats())), 3)
+
+MB = 1024 * 1024
+
+@patch('app.service.audio_transcription._resident_bytes', return_value=0)
+@patch('app.service.audio_transcription._model_disk_bytes')
+@patch('app.service.audio_transcription.WhisperModel')
+class TestWhisperModelCache(unittest.TestCase):
+    def setUp(self):
+        WhisperModelCache.clear()
+        self.addCleanup(WhisperModelCache.clear)
+        patcher = patch.object(WhisperModelCache, 'budget_bytes', 1000 * MB)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_models_stay_resident_across_switches(self, mock_model, mock_disk, _):
+        mock_model.side_effect = lambda *args, **kwargs: Mock()
+        mock_disk.return_value = 100 * MB
+
+        base = WhisperModelCache.get("/data/models/base")
+        small = WhisperModelCache.get("/data/models/small")
+
+        self.assertIs(WhisperModelCache.get("/data/models/base"), base)
+        self.assertIs(WhisperModelCache.get("/data/models/small"), small)
+        self.assertEqual(mock_model.call_count, 2)
+
+    def test_least_recently_used_model_is_evicted(self, mock_model, mock_disk, _):
+        mock_model.side_effect = lambda *args, **kwargs: Mock()
+        mock_disk.return_value = 400 * MB
+
+        WhisperModelCache.get("/data/models/base")
+        WhisperModelCache.get("/data/models/small")
+        WhisperModelCache.get("/data/models/base")  # small is now least recently used
+        WhisperModelCache.get("/data/models/large")
+
+        models = [entry["model"] for entry in WhisperModelCache.stats()]
+        self.assertEqual(models, ["/data/models/base", "/data/models/large"])
+
+    def test_stats_report_load_time_and_size(self, mock_model, mock_disk, _):
+        mock_disk.return_value = 150 * MB
+
+        WhisperModelCache.get("/data/models/small", "float32")
+
+        [entry] = WhisperModelCache.stats()
+        self.assertEqual(entry["compute_type"], "float32")
+        self.assertEqual(entry["resident_mb"], 150.0)
+        self.assertGreaterEqual(entry["load_seconds"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
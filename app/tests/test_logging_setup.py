@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import logging.handlers
+import queue
+import time
+import unittest
+
+from fastapi.testclient import TestClient
+
+from app.service.logging_setup import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    current_context,
+    log_context,
+)
+
+
+class SlowHandler(logging.Handler):
+    """Stands in for a stalled disk."""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.lines = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.lines.append(self.format(record))
+
+
+def record(level=logging.DEBUG, msg="chunk %d", args=(1,), lineno=10):
+    return logging.LogRecord("app.test", level, "/app/stream.py", lineno, msg, args, None)
+
+
+class TestLoggingSetup(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.queue = queue.Queue(maxsize=1000)
+        self.output = SlowHandler(0)
+        self.output.setFormatter(JsonFormatter())
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, self.output)
+        self.listener.start()
+        self.logger = logging.getLogger("app.tests.logging_setup")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+
+    def lines(self):
+        self.listener.stop()
+        self.listener.start()
+        return [json.loads(line) for line in self.output.lines]
+
+    async def test_json_with_correlation_ids_from_tasks(self):
+        async def segment(segment_id):
+            with log_context(segment_id=segment_id):
+                await asyncio.sleep(0)
+                self.logger.info("Transcribed segment %d", segment_id)
+
+        with log_context(session_id="abc"):
+            await asyncio.gather(segment(1), segment(2))
+        self.logger.warning("outside")
+
+        lines = self.lines()
+        self.assertEqual({(line["session_id"], line["segment_id"]) for line in lines[:2]}, {("abc", 1), ("abc", 2)})
+        self.assertEqual(lines[0]["logger"], "app.tests.logging_setup")
+        self.assertNotIn("session_id", lines[2])
+        self.assertEqual(lines[2]["level"], "WARNING")
+
+    def test_exceptions_are_rendered_before_queueing(self):
+        try:
+            raise ValueError("bad audio")
+        except ValueError:
+            self.logger.exception("Failed")
+        line = self.lines()[0]
+        self.assertEqual(line["message"], "Failed")
+        self.assertIn("ValueError: bad audio", line["exc_info"])
+
+    def test_slow_output_does_not_block_callers(self):
+        self.output.delay = 0.05
+        started = time.perf_counter()
+        for i in range(20):
+            self.logger.info("record %d", i)
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertEqual(len(self.lines()), 20)
+
+    def test_full_queue_drops(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        for _ in range(5):
+            handler.handle(record(logging.INFO))
+        self.assertEqual(handler.dropped, 3)
+
+    def test_sampling_keeps_one_in_n_debug_records_per_call_site(self):
+        sampler = SamplingFilter(every=10)
+        kept = [sampler.filter(record()) for _ in range(25)]
+        self.assertEqual(sum(kept), 3)
+        self.assertTrue(kept[0])
+        self.assertTrue(sampler.filter(record(lineno=20)))
+        self.assertTrue(all(sampler.filter(record(logging.INFO)) for _ in range(5)))
+
+
+class TestRequestIds(unittest.TestCase):
+    def test_request_id_is_echoed_or_generated(self):
+        from app import main
+        client = TestClient(main.fastapi_app)
+        self.assertEqual(client.get("/ready", headers={"X-Request-ID": "req-1"}).headers["x-request-id"], "req-1")
+        self.assertTrue(client.get("/ready").headers["x-request-id"])
+
+    def test_request_id_covers_streaming_bodies(self):
+        from fastapi import FastAPI
+        from fastapi.responses import StreamingResponse
+        from app.main import CorrelateRequests
+
+        app = FastAPI()
+        app.add_middleware(CorrelateRequests)
+
+        @app.get("/events")
+        async def events():
+            async def body():
+                await asyncio.sleep(0)
+                yield str(current_context().get("request_id"))
+            return StreamingResponse(body())
+
+        response = TestClient(app).get("/events", headers={"X-Request-ID": "req-2"})
+        self.assertEqual(response.text, "req-2")
+        self.assertEqual(response.headers["x-request-id"], "req-2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.service.long_audio import AudioChunk, join_entries, split_at_silence, translate_chunks
+from app.tests.test_vad import SR, voice
+
+
+def chunks(count, seconds=1.0):
+    return [AudioChunk(i, i * seconds, (i + 1) * seconds, np.zeros(int(seconds * SR), dtype=np.float32)) for i in range(count)]
+
+
+class TestSplitAtSilence(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def noise(self, seconds, amp=0.003):
+        return amp * self.rng.standard_normal(int(seconds * SR))
+
+    def test_utterances_are_merged_up_to_the_chunk_length(self):
+        # Six 3s utterances separated by 1.5s pauses: 25.5s of audio
+        parts = [self.noise(1)]
+        for _ in range(6):
+            parts += [voice(3) + self.noise(3), self.noise(1.5)]
+        signal = np.concatenate(parts).astype(np.float32)
+
+        result = split_at_silence(signal, max_seconds=10)
+        self.assertEqual(len(result), 3)
+        self.assertEqual([chunk.index for chunk in result], [0, 1, 2])
+        for chunk in result:
+            self.assertLessEqual(chunk.end - chunk.start, 10)
+            self.assertEqual(len(chunk.samples), int(chunk.end * SR) - int(chunk.start * SR))
+        for previous, chunk in zip(result, result[1:]):
+            self.assertGreater(chunk.start, previous.end)
+
+    def test_long_speech_is_cut(self):
+        # 30s of talking with only sub-hangover pauses
+        talk = np.concatenate([np.concatenate([voice(1.8), np.zeros(int(0.2 * SR))]) for _ in range(15)])
+        signal = np.concatenate([self.noise(1), talk + self.noise(30), self.noise(1)]).astype(np.float32)
+        result = split_at_silence(signal, max_seconds=10)
+        self.assertGreaterEqual(len(result), 3)
+        self.assertTrue(all(chunk.end - chunk.start <= 10 for chunk in result))
+        self.assertGreater(result[-1].end, 30)
+
+    def test_silence_has_no_chunks(self):
+        self.assertEqual(split_at_silence(self.noise(5).astype(np.float32)), [])
+
+
+class TestTranslateChunks(unittest.IsolatedAsyncioTestCase):
+    async def test_parallelism_bounds_wall_clock_and_keeps_order(self):
+        running = 0
+        peak = 0
+
+        async def transcribe(chunk):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            # later chunks finish first
+            await asyncio.sleep(0.05 - chunk.index * 0.005)
+            running -= 1
+            return f"text {chunk.index}"
+
+        async def translate(text):
+            return text.upper()
+
+        progress = []
+        started = time.monotonic()
+        entries = await translate_chunks(chunks(8), transcribe, translate, parallelism=4,
+                                         on_chunk=lambda done, total: progress.append((done, total)))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(peak, 4)
+        self.assertLess(elapsed, 0.2)
+        self.assertEqual([entry["translated_text"] for entry in entries], [f"TEXT {i}" for i in range(8)])
+        self.assertEqual(progress[-1], (8, 8))
+
+    async def test_failures_and_skips_are_per_chunk(self):
+        async def transcribe(chunk):
+            if chunk.index == 1:
+                raise RuntimeError("asr down")
+            return "thank you" if chunk.index == 2 else "hola"
+
+        async def translate(text):
+            return "hello"
+
+        async def synthesize(text):
+            return b"mp3"
+
+        entries = await translate_chunks(
+            chunks(4), transcribe, translate, synthesize,
+            accept=lambda text: "filler_phrase" if text == "thank you" else None,
+        )
+        self.assertEqual(entries[1]["error"], "asr down")
+        self.assertEqual(entries[2]["skipped"], "filler_phrase")
+
+        result = join_entries(entries)
+        self.assertEqual(result["transcribed_text"], "hola hola")
+        self.assertEqual(result["translated_text"], "hello hello")
+        self.assertEqual(result["audio"], b"mp3mp3")
+        self.assertNotIn("audio", result["segments"][0])
+        self.assertEqual((result["segments"][3]["start"], result["segments"][3]["end"]), (3.0, 4.0))
+
+
+class TestLongAudioRoute(unittest.TestCase):
+    def post(self, chunk_list, transcription):
+        from app import main
+        from app.api import routes
+        scheduler = MagicMock(transcribe=AsyncMock(return_value=MagicMock(text=transcription)))
+        with patch.object(routes, "load_audio", AsyncMock(return_value=np.zeros(SR, dtype=np.float32))), \
+                patch.object(routes, "PHT", MagicMock()), \
+                patch.object(routes, "split_at_silence", return_value=chunk_list), \
+                patch.object(routes, "get_scheduler", return_value=scheduler), \
+                patch.object(routes.anthropic_service, "get_response", AsyncMock(return_value="hello")):
+            client = TestClient(main.fastapi_app)
+            return client.post("/api/v1/translate/audio?long_audio=true", files={"audio_data": ("a.ogg", b"ogg")})
+
+    def test_no_speech_is_unprocessable(self):
+        response = self.post([], "")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["reason"], "no_speech")
+
+        response = self.post(chunks(2), "hola hola hola hola hola hola hola hola hola hola")
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["reason"], "repetitive")
+
+    def test_speech_is_translated(self):
+        response = self.post(chunks(2), "hola amigos")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["translated_text"], "hello hello")
+
+
+if __name__ == '__main__':
+    unittest.main()
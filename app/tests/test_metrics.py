@@ -0,0 +1,85 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.service import metrics
+from app.service.metrics import Counter, Histogram, Registry, Stage, timed
+
+
+class TestMetrics(unittest.IsolatedAsyncioTestCase):
+    def test_histogram_exposition(self):
+        histogram = Histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, stage="asr")
+        self.assertEqual(histogram.samples(), [
+            'latency_seconds_bucket{stage="asr",le="0.1"} 2',
+            'latency_seconds_bucket{stage="asr",le="1.0"} 3',
+            'latency_seconds_bucket{stage="asr",le="+Inf"} 4',
+            'latency_seconds_sum{stage="asr"} 3.65',
+            'latency_seconds_count{stage="asr"} 4',
+        ])
+
+    def test_counter_and_registry(self):
+        registry = Registry()
+        counter = registry.register(Counter("requests", 'Requests "handled"', ("outcome",)))
+        counter.inc(outcome="ok")
+        counter.inc(2, outcome='say "hi"\n')
+        text = registry.render()
+        self.assertIn("# TYPE requests counter", text)
+        self.assertIn('requests_total{outcome="ok"} 1', text)
+        self.assertIn('requests_total{outcome="say \\"hi\\"\\n"} 2', text)
+        with self.assertRaises(ValueError):
+            registry.register(Counter("requests", "again"))
+
+    async def test_stage_outcomes(self):
+        labels = {"pipeline": "test_stage", "stage": "translate", "mode": "", "model": "anthropic"}
+        with Stage("test_stage", "translate", model="anthropic") as timer:
+            timer.outcome = "empty"
+        with self.assertRaises(RuntimeError):
+            with Stage("test_stage", "translate", model="anthropic"):
+                raise RuntimeError("boom")
+
+        task = asyncio.create_task(timed(asyncio.sleep(10), "test_stage", "translate", model="anthropic"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        for outcome in ("empty", "error", "cancelled"):
+            self.assertEqual(metrics.STAGE_SECONDS.count(outcome=outcome, **labels), 1)
+
+    async def test_model_calls_are_timed(self):
+        from app.service.anthropic import AnthropicService
+        service = AnthropicService()
+        before = metrics.MODEL_SECONDS.count(model=service.sonnet_35_20241022, outcome="ok")
+        client = MagicMock()
+        client.messages.create.side_effect = [RuntimeError("overloaded"), MagicMock(content=[MagicMock(text="Hola")])]
+        with patch.object(AnthropicService, "client", client):
+            self.assertEqual(await service.get_response(user_input="Hello"), "Hola")
+        self.assertGreaterEqual(metrics.MODEL_SECONDS.count(model=service.sonnet_37_20250219, outcome="error"), 1)
+        self.assertEqual(metrics.MODEL_SECONDS.count(model=service.sonnet_35_20241022, outcome="ok"), before + 1)
+
+    def test_rest_pipeline_stages_on_metrics_endpoint(self):
+        from app import main
+        from app.api import routes
+        scheduler = MagicMock(transcribe_voice=AsyncMock(return_value="hola amigos como estan"))
+        pht = MagicMock(detect_gender=AsyncMock(return_value="female"), text_to_speech=AsyncMock(return_value=b"mp3"))
+        before = metrics.REQUESTS.value(pipeline="rest_audio", outcome="ok")
+        with patch.object(routes, "get_scheduler", return_value=scheduler), \
+                patch.object(routes, "PHT", return_value=pht), \
+                patch.object(routes.anthropic_service, "get_response", AsyncMock(return_value="hello friends")):
+            client = TestClient(main.fastapi_app)
+            response = client.post("/api/v1/translate/audio", files={"audio_data": ("a.ogg", b"ogg")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.REQUESTS.value(pipeline="rest_audio", outcome="ok"), before + 1)
+
+        text = client.get("/metrics")
+        self.assertTrue(text.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        for stage in ("transcribe", "translate", "tts", "gender"):
+            self.assertIn(f'translator_stage_seconds_count{{pipeline="rest_audio",stage="{stage}"', text.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
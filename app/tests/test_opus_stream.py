@@ -0,0 +1,63 @@
+import io
+import unittest
+from unittest.mock import AsyncMock, Mock
+import numpy as np
+import soundfile as sf
+from app.service.audio_transcription import OggOpusStreamDecoder, download_voice
+
+def make_voice_note(seconds=2.0, sr=48000):
+    t = np.arange(int(seconds * sr)) / sr
+    tone = (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    buffer = io.BytesIO()
+    sf.write(buffer, tone, sr, format="OGG", subtype="OPUS")
+    return buffer.getvalue()
+
+class TestOggOpusStreamDecoder(unittest.TestCase):
+    def setUp(self):
+        self.note = make_voice_note()
+
+    def decode(self, chunk_size):
+        decoder = OggOpusStreamDecoder()
+        pieces = [decoder.feed(self.note[i:i + chunk_size]) for i in range(0, len(self.note), chunk_size)]
+        pieces.append(decoder.flush())
+        return pieces
+
+    def test_decodes_to_16k_with_exact_length(self):
+        samples = np.concatenate(self.decode(len(self.note)))
+        self.assertEqual(len(samples), 32000)
+        # 440Hz tone at 16kHz: dominant FFT bin should be 440Hz
+        spectrum = np.abs(np.fft.rfft(samples))
+        self.assertAlmostEqual(np.argmax(spectrum) * 16000 / len(samples), 440, delta=2)
+
+    def test_small_chunks_produce_audio_incrementally(self):
+        pieces = self.decode(97)
+        # Audio is released page by page, well before the stream ends
+        self.assertGreater(sum(len(piece) > 0 for piece in pieces[:-1]), 1)
+        np.testing.assert_allclose(np.concatenate(pieces), np.concatenate(self.decode(len(self.note))), atol=1e-6)
+
+    def test_rejects_non_ogg(self):
+        with self.assertRaises(ValueError):
+            OggOpusStreamDecoder().feed(b"RIFF" + bytes(64))
+
+class TestDownloadVoice(unittest.IsolatedAsyncioTestCase):
+    async def test_local_file_path_is_decoded(self):
+        note = make_voice_note(1.0)
+        file = Mock(file_path="/var/lib/bot/voice.oga")
+        file.download_as_bytearray = AsyncMock(return_value=bytearray(note))
+
+        data, samples = await download_voice(file)
+
+        self.assertEqual(bytes(data), note)
+        self.assertEqual(len(samples), 16000)
+
+    async def test_undecodable_audio_returns_raw_bytes_only(self):
+        file = Mock(file_path="/var/lib/bot/voice.mp3")
+        file.download_as_bytearray = AsyncMock(return_value=bytearray(b"ID3" + bytes(64)))
+
+        data, samples = await download_voice(file)
+
+        self.assertEqual(len(data), 67)
+        self.assertIsNone(samples)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+from app.service.partial_transcript import LocalAgreement
+
+class TestLocalAgreement(unittest.TestCase):
+    def test_commits_words_two_hypotheses_agree_on(self):
+        agreement = LocalAgreement(n=2)
+        self.assertEqual(agreement.update("hello there"), ("", "hello there"))
+        self.assertEqual(agreement.update("hello, there. how"), ("hello, there.", "how"))
+        self.assertEqual(agreement.update("Hello there how are"), ("hello, there. how", "are"))
+
+    def test_committed_words_are_never_retracted(self):
+        agreement = LocalAgreement(n=2)
+        agreement.update("I want to")
+        agreement.update("I want to go")
+        self.assertEqual(agreement.update("I wanted two goes"), ("I want to", "goes"))
+        # A contradicting pair of hypotheses commits nothing further
+        self.assertEqual(agreement.update("I wanted two goes home"), ("I want to", "goes home"))
+        self.assertEqual(agreement.committed, ["I", "want", "to"])
+
+    def test_single_hypothesis_agreement_commits_immediately(self):
+        agreement = LocalAgreement(n=1)
+        self.assertEqual(agreement.update("buenos dias"), ("buenos dias", ""))
+
+if __name__ == "__main__":
+    unittest.main()
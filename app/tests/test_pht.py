@@ -1,6 +1,9 @@
+import io
 import unittest
 from unittest.mock import Mock, patch
-from app.service.pht import PHT
+import numpy as np
+import soundfile as sf
+from app.service.pht import PHT, classify_gender_by_pitch
 import pytest
 from app.config import PLAY_HT_API_KEY, PLAY_HT_USER_ID
 
@@ -51,5 +54,33 @@ class TestPHT(unittest.TestCase):
         mock_detect.assert_called_with(text)
         mock_client_instance.tts.assert_called()
 
+def make_voice(f0, seconds=2.0, sr=16000):
+    t = np.arange(int(seconds * sr)) / sr
+    phase = 2 * np.pi * f0 * t
+    voice = sum(np.sin(k * phase) / k for k in range(1, 10))
+    buffer = io.BytesIO()
+    sf.write(buffer, (0.2 * voice).astype(np.float32), sr, format="WAV")
+    return buffer.getvalue()
+
+class TestGenderPitch(unittest.TestCase):
+    def test_low_pitch_is_male(self):
+        gender, confidence = classify_gender_by_pitch(make_voice(110))
+        self.assertEqual(gender, "male")
+        self.assertGreater(confidence, 0.9)
+
+    def test_high_pitch_is_female(self):
+        gender, confidence = classify_gender_by_pitch(make_voice(220))
+        self.assertEqual(gender, "female")
+        self.assertGreater(confidence, 0.9)
+
+    def test_boundary_pitch_is_ambiguous(self):
+        _, confidence = classify_gender_by_pitch(make_voice(162))
+        self.assertLess(confidence, 0.2)
+
+    def test_silence_has_no_label(self):
+        buffer = io.BytesIO()
+        sf.write(buffer, np.zeros(16000, dtype=np.float32), 16000, format="WAV")
+        self.assertEqual(classify_gender_by_pitch(buffer.getvalue()), (None, 0.0))
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from app.service.segmenter import SpeechSegmenter
+from app.service.vad import FrameVAD
+from app.tests.test_vad import SR, to_pcm, voice
+
+class TestSpeechSegmenter(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def noise(self, seconds, amp=0.003):
+        return amp * self.rng.standard_normal(int(seconds * SR))
+
+    def talk(self, seconds):
+        """Voiced bursts with short (sub-hangover) pauses, like continuous speech."""
+        parts = []
+        for _ in range(int(seconds / 2)):
+            parts += [voice(1.8), np.zeros(int(0.2 * SR))]
+        speech = np.concatenate(parts)
+        return speech + self.noise(len(speech) / SR)
+
+    def segment(self, signal, chunk_bytes=8000, **kwargs):
+        segmenter = SpeechSegmenter(vad=FrameVAD(sample_rate=SR, frame_ms=20, snr_db=6, onset_ms=60, hangover_ms=450), **kwargs)
+        pcm = to_pcm(signal)
+        segments = []
+        for i in range(0, len(pcm), chunk_bytes):
+            segments.extend(segmenter.feed(pcm[i:i + chunk_bytes]))
+        return segmenter, segments
+
+    def test_segment_includes_pre_roll_and_hangover(self):
+        signal = np.concatenate([self.noise(1), voice(2) + self.noise(2), self.noise(1.5)])
+        _, segments = self.segment(signal, max_seconds=15, pre_roll_ms=300)
+        self.assertEqual(len(segments), 1)
+        segment = segments[0]
+        self.assertFalse(segment.forced)
+        self.assertAlmostEqual(segment.start, 0.7, delta=0.1)
+        self.assertAlmostEqual(segment.end, 3.45, delta=0.1)
+        self.assertEqual(len(segment.pcm), round((segment.end - segment.start) * SR) * 2)
+        # The audio is the stream itself, not a copy of some other part of the ring
+        start = round(segment.start * SR) * 2
+        self.assertEqual(segment.pcm, to_pcm(signal)[start:start + len(segment.pcm)])
+
+    def test_long_speech_is_split_at_a_pause_with_overlap(self):
+        signal = np.concatenate([self.noise(1), self.talk(30), self.noise(2)])
+        segmenter, segments = self.segment(signal, max_seconds=8, split_search_ms=3000, overlap_ms=300)
+        self.assertGreaterEqual(len(segments), 4)
+        self.assertTrue(all(s.forced for s in segments[:-1]))
+        self.assertFalse(segments[-1].forced)
+        for previous, current in zip(segments, segments[1:]):
+            self.assertLessEqual(previous.end - previous.start, 8)
+            self.assertAlmostEqual(current.start, previous.end - 0.3, places=6)
+            # Pauses span 2.8-3.0s, 4.8-5.0s, ... of the stream; cuts land inside them
+            phase = (previous.end - 1) % 2
+            self.assertTrue(phase > 1.78 or phase < 0.02, previous.end)
+        # Memory stays bounded by the ring no matter how long the speech runs
+        self.assertEqual(segmenter._frames.shape[0], segmenter.capacity)
+
+    def test_chunk_size_does_not_matter(self):
+        signal = np.concatenate([self.noise(1), self.talk(12), self.noise(2)])
+        _, small = self.segment(signal, chunk_bytes=1001, max_seconds=5)
+        _, large = self.segment(signal, chunk_bytes=len(signal) * 2, max_seconds=5)
+        self.assertEqual([(s.start, s.end) for s in small], [(s.start, s.end) for s in large])
+
+    def test_flush_returns_open_segment(self):
+        segmenter, segments = self.segment(np.concatenate([self.noise(1), voice(1) + self.noise(1)]))
+        self.assertEqual(segments, [])
+        self.assertTrue(segmenter.active)
+        segment = segmenter.flush()
+        self.assertAlmostEqual(segment.end, 2.0, delta=0.05)
+        self.assertFalse(segmenter.active)
+        self.assertIsNone(segmenter.flush())
+
+if __name__ == "__main__":
+    unittest.main()
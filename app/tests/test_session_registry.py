@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from fastapi import FastAPI, WebSocketDisconnect
+from fastapi.testclient import TestClient
+from app.api import routes
+from app.api.session_registry import SessionRegistry
+from app.tests.test_stream_session import FakeWebSocket, ScriptedSession, segment
+
+class TestSessionRegistry(unittest.IsolatedAsyncioTestCase):
+    async def test_admits_up_to_max_sessions(self):
+        registry = SessionRegistry(max_sessions=2)
+        sessions = [ScriptedSession(FakeWebSocket()) for _ in range(3)]
+        self.assertEqual([registry.admit(session) for session in sessions], [True, True, False])
+        registry.remove(sessions[0])
+        self.assertTrue(registry.admit(sessions[2]))
+        self.assertEqual(registry.stats()["rejected"], 1)
+
+    async def test_drain_finishes_in_flight_segments_and_refuses_new_sessions(self):
+        registry = SessionRegistry()
+        websocket = FakeWebSocket()
+        release = asyncio.Event()
+        session = ScriptedSession(websocket, release=release, workers=1)
+        registry.admit(session)
+        run = asyncio.create_task(session.run())
+        await asyncio.sleep(0.01)
+        await session._enqueue(segment(0))
+        await asyncio.sleep(0.01)
+
+        drain = asyncio.create_task(registry.drain(timeout=5))
+        await asyncio.sleep(0.05)
+        self.assertFalse(drain.done())
+        self.assertFalse(registry.admit(ScriptedSession(FakeWebSocket())))
+
+        release.set()
+        await asyncio.wait_for(drain, 1)
+        await asyncio.wait_for(run, 1)
+        self.assertIn({"type": "transcription", "segment_id": 0}, websocket.sent)
+        self.assertEqual(websocket.closed, (1001, "server shutting down"))
+
+        registry.remove(session)
+        totals = registry.stats()["totals"]
+        self.assertEqual((totals["sessions"], totals["segments"]), (1, 1))
+        self.assertGreater(totals["bytes_out"], 0)
+
+    async def test_drain_gives_up_after_timeout(self):
+        registry = SessionRegistry()
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, release=asyncio.Event(), workers=1)
+        registry.admit(session)
+        run = asyncio.create_task(session.run())
+        await asyncio.sleep(0.01)
+        await session._enqueue(segment(0))
+        await registry.drain(timeout=0.05)
+        await asyncio.wait_for(run, 1)
+        self.assertEqual(websocket.closed[0], 1001)
+
+    async def test_idle_session_is_closed(self):
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, idle_timeout=0.05)
+        await asyncio.wait_for(session.run(), 1)
+        self.assertEqual(websocket.closed, (1000, "idle timeout"))
+
+    async def test_idle_timeout_waits_for_in_flight_results(self):
+        websocket = FakeWebSocket()
+        release = asyncio.Event()
+        session = ScriptedSession(websocket, release=release, workers=1, idle_timeout=0.05)
+        run = asyncio.create_task(session.run())
+        await asyncio.sleep(0.01)
+        await session._enqueue(segment(0))
+        await asyncio.sleep(0.15)
+        self.assertIsNone(websocket.closed)
+        release.set()
+        await asyncio.wait_for(run, 1)
+        self.assertIn({"type": "transcription", "segment_id": 0}, websocket.sent)
+
+class TestAdminSessionsEndpoint(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(routes.router)
+        self.client = TestClient(app)
+
+    def test_requires_token_when_configured(self):
+        with patch.object(routes, "ADMIN_API_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/api/v1/admin/sessions").status_code, 401)
+            response = self.client.get("/api/v1/admin/sessions", headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["active"], 0)
+
+    def test_refuses_connections_beyond_the_limit(self):
+        with patch.object(routes.session_registry, "max_sessions", 0):
+            # The handshake completes (a close before it would reach a real client as HTTP 403) ...
+            with self.client.websocket_connect("/api/v1/ws/stream-audio") as websocket:
+                # ... and the refusal arrives as a close frame the client can read
+                with self.assertRaises(WebSocketDisconnect) as refused:
+                    websocket.receive_json()
+        self.assertEqual((refused.exception.code, refused.exception.reason), (1013, "server busy"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.api.static_assets import IMMUTABLE, REVALIDATE, StaticAssets, etag_matches, parse_accept_encoding
+
+INDEX_HTML = b"<!doctype html><html><head><script src='main.1a2b3c4d5e6f7a8b.js'></script></head><body></body></html>"
+MAIN_JS = b"console.log('universal translator');\n" * 100
+FAVICON = b"\x00\x00\x01\x00" + bytes(range(64))
+
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "assets"))
+        for name, body in (("index.html", INDEX_HTML), ("main.1a2b3c4d5e6f7a8b.js", MAIN_JS),
+                           ("favicon.ico", FAVICON), ("assets/logo.svg", b"<svg/>")):
+            with open(os.path.join(self.root, name), "wb") as f:
+                f.write(body)
+        self.assets = StaticAssets(self.root, compress_min_bytes=1024)
+        self.assets.load()
+
+        from app import main
+        self.client = TestClient(main.fastapi_app)
+        self.enterContext(patch.object(main, "static_assets", self.assets))
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_index(self):
+        self.assertEqual(len(self.assets.assets), 4)
+        self.assertEqual(self.assets.stats()["immutable"], 1)
+        self.assertEqual(self.assets.stats()["compressed"], 1)
+
+    def test_hashed_bundle_is_immutable_and_gzipped(self):
+        response = self.client.get("/main.1a2b3c4d5e6f7a8b.js", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertTrue(response.headers["content-type"].startswith("application/javascript"))
+        self.assertTrue(response.headers["etag"].endswith('-gzip"'))
+        # TestClient decodes the body for us
+        self.assertEqual(response.content, MAIN_JS)
+        self.assertEqual(int(response.headers["content-length"]), len(gzip.compress(MAIN_JS, 9, mtime=0)))
+
+    def test_identity_when_encoding_refused(self):
+        response = self.client.get("/main.1a2b3c4d5e6f7a8b.js", headers={"Accept-Encoding": "gzip;q=0, identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, MAIN_JS)
+        self.assertEqual(int(response.headers["content-length"]), len(MAIN_JS))
+
+    def test_small_files_and_index_revalidate(self):
+        response = self.client.get("/favicon.ico", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.content, FAVICON)
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertTrue(response.headers["content-type"].startswith("image/"))
+        self.assertEqual(self.client.get("/").headers["cache-control"], REVALIDATE)
+        self.assertEqual(self.client.get("/assets/logo.svg").content, b"<svg/>")
+
+    def test_not_modified(self):
+        first = self.client.get("/main.1a2b3c4d5e6f7a8b.js", headers={"Accept-Encoding": "gzip"})
+        again = self.client.get("/main.1a2b3c4d5e6f7a8b.js",
+                                headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b"")
+        self.assertEqual(again.headers["etag"], first.headers["etag"])
+        changed = self.client.get("/main.1a2b3c4d5e6f7a8b.js", headers={"If-None-Match": '"something-else"'})
+        self.assertEqual(changed.status_code, 200)
+
+    def test_spa_routes_and_missing_files(self):
+        response = self.client.get("/settings/voices")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, INDEX_HTML)
+        self.assertEqual(self.client.get("/missing.7f00aa11bb22cc33.js").status_code, 404)
+        self.assertEqual(self.client.get("/api/v1/nope").status_code, 404)
+
+    def test_head(self):
+        response = self.client.head("/main.1a2b3c4d5e6f7a8b.js", headers={"Accept-Encoding": "identity"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(int(response.headers["content-length"]), len(MAIN_JS))
+
+    def test_served_without_disk(self):
+        shutil.rmtree(self.root)
+        with patch("builtins.open", side_effect=AssertionError("read from disk")):
+            response = self.client.get("/main.1a2b3c4d5e6f7a8b.js")
+        self.assertEqual(response.content, MAIN_JS)
+
+    def test_missing_bundle(self):
+        empty = StaticAssets(os.path.join(self.root, "does-not-exist"))
+        self.assertEqual(empty.load(), 0)
+        from app import main
+        with patch.object(main, "static_assets", empty):
+            self.assertEqual(self.client.get("/").json(), {"error": "Frontend not available"})
+
+
+class TestHeaders(unittest.TestCase):
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding("gzip, deflate, br;q=0.5, *;q=0"),
+                         {"gzip": 1.0, "deflate": 1.0, "br": 0.5, "*": 0.0})
+        self.assertEqual(parse_accept_encoding(""), {})
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"abc"', '"abc"'))
+        self.assertTrue(etag_matches('W/"abc-gzip"', '"abc"'))
+        self.assertTrue(etag_matches('"x", "abc-br"', '"abc-gzip"'))
+        self.assertTrue(etag_matches("*", '"abc"'))
+        self.assertFalse(etag_matches('"abd"', '"abc"'))
+        self.assertFalse(etag_matches("", '"abc"'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from app.api.stream_protocol import (
+    FLAG_END,
+    FRAME_AUDIO,
+    FRAME_TTS,
+    HEADER,
+    ProtocolError,
+    decode_frame,
+    encode_frame,
+    tts_frames,
+)
+
+class TestStreamProtocol(unittest.TestCase):
+    def test_round_trip(self):
+        frame = decode_frame(encode_frame(FRAME_AUDIO, 0, 41, b"opus packet"))
+        self.assertEqual((frame.type, frame.flags, frame.segment_id, frame.sequence, frame.payload), (FRAME_AUDIO, 0, 0, 41, b"opus packet"))
+
+    def test_rejects_short_and_foreign_frames(self):
+        with self.assertRaises(ProtocolError):
+            decode_frame(b"\x02\x01")
+        with self.assertRaises(ProtocolError):
+            decode_frame(b"\x00" * 64)  # raw PCM from a version 1 client
+
+    def test_tts_frames_split_and_flag_the_last_chunk(self):
+        audio = bytes(range(256)) * 100
+        frames = [decode_frame(data) for data in tts_frames(7, audio, chunk_bytes=10000)]
+        self.assertEqual([f.sequence for f in frames], [0, 1, 2])
+        self.assertTrue(all(f.type == FRAME_TTS and f.segment_id == 7 for f in frames))
+        self.assertEqual([f.flags & FLAG_END for f in frames], [0, 0, FLAG_END])
+        self.assertEqual(b"".join(f.payload for f in frames), audio)
+        self.assertTrue(all(len(data) <= 10000 + HEADER.size for data in tts_frames(7, audio, 10000)))
+
+    def test_empty_tts_still_ends_the_segment(self):
+        [frame] = [decode_frame(data) for data in tts_frames(3, b"", 1024)]
+        self.assertEqual(frame.flags, FLAG_END)
+
+if __name__ == "__main__":
+    unittest.main()
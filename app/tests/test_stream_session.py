@@ -0,0 +1,228 @@
+import asyncio
+import fractions
+import unittest
+import av
+import numpy as np
+from fastapi import WebSocketDisconnect
+from app.api.stream_protocol import FRAME_AUDIO, encode_frame
+from app.api.stream_session import AudioStreamSession
+from app.service.audio_transcription import Transcription
+from app.service.segmenter import SpeechSegment
+from app.tests.test_vad import SR, to_pcm, voice
+
+class FakeWebSocket:
+    def __init__(self, config=None):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.config = config
+        self.closed = None
+
+    async def receive_json(self):
+        if self.config is None:
+            raise asyncio.TimeoutError()
+        return self.config
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000, reason=None):
+        self.closed = (code, reason)
+
+class ScriptedSession(AudioStreamSession):
+    """Replaces transcription/translation/TTS with per-segment delays."""
+
+    def __init__(self, websocket, delays=None, release=None, **kwargs):
+        super().__init__(websocket, anthropic_service=None, **kwargs)
+        self.delays = delays or {}
+        self.release = release
+        self.started = []
+
+    async def process_segment(self, job):
+        self.started.append(job.id)
+        if self.release is not None:
+            await self.release.wait()
+        await asyncio.sleep(self.delays.get(job.id, 0))
+        return [{"type": "transcription", "segment_id": job.id}]
+
+class GrowingScheduler:
+    """Transcribes a prefix as one word per 0.5s of audio (WAV header aside)."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def transcribe(self, voice_data, detect_language=False, samples=None, cache=True):
+        self.calls.append(cache)
+        words = ["one", "two", "three", "four", "five", "six"]
+        return Transcription(text=" ".join(words[:int((len(voice_data) - 44) / 16000)]))
+
+def opus_packets(signal):
+    """Encode 16kHz float audio into raw 20ms Opus packets, as a WebCodecs client would."""
+    encoder = av.CodecContext.create("libopus", "w")
+    encoder.sample_rate, encoder.layout, encoder.format, encoder.bit_rate = 48000, "mono", "s16", 24000
+    encoder.time_base = fractions.Fraction(1, 48000)
+    upsampled = np.repeat(signal, 3)  # crude 16k -> 48k; Opus doesn't care for this test
+    pcm = (np.clip(upsampled, -1, 1) * 32767).astype(np.int16)
+    packets = []
+    for pts in range(0, len(pcm) - 960 + 1, 960):
+        frame = av.AudioFrame.from_ndarray(pcm[None, pts:pts + 960], format="s16", layout="mono")
+        frame.sample_rate, frame.pts = 48000, pts
+        packets += [bytes(packet) for packet in encoder.encode(frame)]
+    return packets + [bytes(packet) for packet in encoder.encode(None)]
+
+def segment(index):
+    return SpeechSegment(pcm=bytes(32000), start=index, end=index + 1)
+
+class TestAudioStreamSession(unittest.IsolatedAsyncioTestCase):
+    async def start(self, session):
+        task = asyncio.create_task(session.run())
+        await asyncio.sleep(0.01)  # connection and config handshake
+        self.addAsyncCleanup(self.stop, task)
+        return task
+
+    async def stop(self, task):
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    def results(self, websocket):
+        return [(m["type"], m.get("segment_id")) for m in websocket.sent if isinstance(m, dict) and m["type"] not in ("connection_status", "protocol")]
+
+    async def wait_for_results(self, websocket, count):
+        for _ in range(200):
+            if len(self.results(websocket)) >= count:
+                return
+            await asyncio.sleep(0.01)
+
+    async def test_results_are_delivered_in_segment_order(self):
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, delays={0: 0.1, 1: 0.0, 2: 0.02}, workers=3)
+        await self.start(session)
+        for i in range(3):
+            await session._enqueue(segment(i))
+        await self.wait_for_results(websocket, 3)
+        self.assertEqual(self.results(websocket), [("transcription", 0), ("transcription", 1), ("transcription", 2)])
+        # All three ran concurrently rather than one after another
+        self.assertEqual(sorted(session.started), [0, 1, 2])
+
+    async def test_backlog_drops_oldest_pending_segment(self):
+        websocket = FakeWebSocket()
+        release = asyncio.Event()
+        session = ScriptedSession(websocket, release=release, workers=1, max_pending=2)
+        await self.start(session)
+        await session._enqueue(segment(0))
+        await asyncio.sleep(0.01)  # worker picks up segment 0 and blocks
+        for i in range(1, 4):
+            await session._enqueue(segment(i))
+        release.set()
+        await self.wait_for_results(websocket, 4)
+        self.assertEqual(self.results(websocket), [
+            ("transcription", 0), ("segment_dropped", 1), ("transcription", 2), ("transcription", 3),
+        ])
+
+    async def test_stale_segments_are_skipped(self):
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, delays={0: 0.1}, workers=1, max_age=0.05)
+        await self.start(session)
+        await session._enqueue(segment(0))
+        await session._enqueue(segment(1))
+        await self.wait_for_results(websocket, 2)
+        self.assertEqual(self.results(websocket), [("transcription", 0), ("segment_dropped", 1)])
+
+    async def test_audio_is_segmented_while_a_segment_is_processing(self):
+        websocket = FakeWebSocket()
+        release = asyncio.Event()
+        session = ScriptedSession(websocket, release=release, workers=1)
+        task = await self.start(session)
+
+        rng = np.random.default_rng(0)
+        noise = lambda seconds: 0.003 * rng.standard_normal(int(seconds * SR))
+        pcm = to_pcm(np.concatenate([noise(1), voice(1) + noise(1), noise(1), voice(1) + noise(1), noise(1)]))
+        for i in range(0, len(pcm), 8000):
+            await websocket.incoming.put({"type": "websocket.receive", "bytes": pcm[i:i + 8000]})
+        for _ in range(200):
+            if session._next_id == 2:
+                break
+            await asyncio.sleep(0.01)
+        # The second utterance was segmented while the first was still blocked in processing
+        self.assertEqual(session._next_id, 2)
+        self.assertEqual(session.started, [0])
+
+        release.set()
+        await self.wait_for_results(websocket, 2)
+        self.assertEqual(self.results(websocket), [("transcription", 0), ("transcription", 1)])
+
+        await websocket.incoming.put({"type": "websocket.disconnect", "code": 1000})
+        with self.assertRaises(WebSocketDisconnect):
+            await task
+
+    async def test_partial_transcripts_while_speaking(self):
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, release=asyncio.Event(), workers=1)
+        session.scheduler = GrowingScheduler()
+        session.partials = True
+        await self.start(session)
+
+        rng = np.random.default_rng(0)
+        noise = lambda seconds: 0.003 * rng.standard_normal(int(seconds * SR))
+        pcm = to_pcm(np.concatenate([noise(1), voice(3) + noise(3)]))
+        for i in range(0, len(pcm), 3200):  # 100ms chunks, paced so partials can keep up
+            await websocket.incoming.put({"type": "websocket.receive", "bytes": pcm[i:i + 3200]})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.05)
+
+        partials = [m for m in websocket.sent if isinstance(m, dict) and m["type"] == "partial_transcription"]
+        self.assertGreaterEqual(len(partials), 3)
+        self.assertTrue(all(m["segment_id"] == 0 for m in partials))
+        self.assertEqual(session.started, [])  # the segment is still open
+        # Committed text only ever grows, and the final partial has committed earlier words
+        committed = [m["committed_text"] for m in partials]
+        for previous, current in zip(committed, committed[1:]):
+            self.assertTrue(current.startswith(previous))
+        self.assertTrue(committed[-1].startswith("one two"))
+        self.assertEqual(set(session.scheduler.calls), {False})
+
+    async def test_partials_are_off_by_default(self):
+        websocket = FakeWebSocket()
+        session = ScriptedSession(websocket, workers=1)
+        session.scheduler = GrowingScheduler()
+        await self.start(session)
+        pcm = to_pcm(voice(2))
+        for i in range(0, len(pcm), 3200):
+            await websocket.incoming.put({"type": "websocket.receive", "bytes": pcm[i:i + 3200]})
+        await asyncio.sleep(0.05)
+        self.assertEqual(session.scheduler.calls, [])
+
+    async def test_protocol_2_opus_uplink(self):
+        websocket = FakeWebSocket(config={"protocol": 2, "codec": "opus"})
+        session = ScriptedSession(websocket, workers=1)
+        await self.start(session)
+        self.assertIn({"type": "protocol", "version": 2, "codec": "opus", "downlink_chunk_bytes": 16384}, websocket.sent)
+
+        rng = np.random.default_rng(0)
+        noise = lambda seconds: 0.003 * rng.standard_normal(int(seconds * SR))
+        signal = np.concatenate([noise(1), voice(1.5) + noise(1.5), noise(1)])
+        packets = opus_packets(signal)
+        for sequence, packet in enumerate(packets):
+            if sequence != 10:  # one frame lost in transit
+                await websocket.incoming.put({"type": "websocket.receive", "bytes": encode_frame(FRAME_AUDIO, 0, sequence, packet)})
+        await self.wait_for_results(websocket, 1)
+
+        self.assertEqual(self.results(websocket), [("transcription", 0)])
+        self.assertEqual(session.lost_frames, 1)
+        # ~10x less than the 256 kbit/s of raw PCM
+        self.assertLess(sum(map(len, packets)) * 8 / (len(signal) / SR), 40000)
+
+    async def test_unsupported_protocol_falls_back_to_version_1(self):
+        websocket = FakeWebSocket(config={"protocol": 3, "codec": "opus"})
+        session = ScriptedSession(websocket, workers=1)
+        await self.start(session)
+        self.assertEqual(session.protocol, 1)
+        self.assertEqual(self.results(websocket), [("error", None)])
+
+if __name__ == "__main__":
+    unittest.main()
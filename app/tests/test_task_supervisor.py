@@ -0,0 +1,95 @@
+import asyncio
+import gc
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.service.task_supervisor import TaskSupervisor
+
+
+class TestTaskSupervisor(unittest.IsolatedAsyncioTestCase):
+    async def test_holds_tasks_until_done(self):
+        supervisor = TaskSupervisor()
+        release = asyncio.Event()
+        finished = []
+
+        async def work():
+            await release.wait()
+            finished.append(True)
+
+        supervisor.spawn(work(), "work")
+        gc.collect()
+        self.assertEqual(len(supervisor), 1)
+        release.set()
+        await asyncio.sleep(0.01)
+        self.assertEqual(finished, [True])
+        self.assertEqual(len(supervisor), 0)
+        self.assertEqual(supervisor.stats()["totals"]["completed"], 1)
+
+    async def test_failures_are_counted(self):
+        supervisor = TaskSupervisor()
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        with self.assertLogs("app.service.task_supervisor", "ERROR"):
+            supervisor.spawn(fail(), "fail")
+            await asyncio.sleep(0.01)
+        self.assertEqual(supervisor.stats()["totals"]["failed"], 1)
+
+    async def test_optional_tasks_dropped_when_full(self):
+        supervisor = TaskSupervisor(max_tasks=1)
+        release = asyncio.Event()
+        supervisor.spawn(release.wait(), "update")
+        self.assertTrue(supervisor.full)
+        self.assertIsNone(supervisor.spawn(asyncio.sleep(0), "typing", optional=True))
+        # Required work is never dropped
+        self.assertIsNotNone(supervisor.spawn(asyncio.sleep(0), "reply"))
+        stats = supervisor.stats()
+        self.assertEqual(stats["totals"]["dropped"], 1)
+        self.assertEqual(stats["running"]["update"]["count"], 1)
+        release.set()
+        await asyncio.sleep(0.01)
+
+    async def test_drain_waits_for_work_and_what_it_spawns(self):
+        supervisor = TaskSupervisor()
+        sent = []
+
+        async def reply():
+            await asyncio.sleep(0.05)
+            sent.append("reply")
+
+        async def update():
+            await asyncio.sleep(0.05)
+            supervisor.spawn(reply(), "reply")
+
+        supervisor.spawn(update(), "update")
+        warmup = supervisor.spawn(asyncio.sleep(10), "warmup", drain=False)
+        await supervisor.drain(timeout=2)
+        self.assertTrue(supervisor.full)
+        self.assertEqual(sent, ["reply"])
+        self.assertTrue(warmup.cancelled())
+
+    async def test_drain_cancels_after_deadline(self):
+        supervisor = TaskSupervisor()
+        task = supervisor.spawn(asyncio.sleep(10), "stuck")
+        await supervisor.drain(timeout=0.05)
+        self.assertTrue(task.cancelled())
+        self.assertEqual(len(supervisor), 0)
+        self.assertEqual(supervisor.stats()["totals"]["cancelled"], 1)
+
+
+class TestWebhookBackpressure(unittest.TestCase):
+    def test_webhook_refuses_while_draining(self):
+        from app import main
+        supervisor = TaskSupervisor()
+        supervisor.draining = True
+        with patch.object(main, "task_supervisor", supervisor), patch.object(main, "RUN_MODE", "webhook"), \
+                patch.object(main, "telegram_app", object()):
+            response = TestClient(main.fastapi_app).post(main.WEBHOOK_PATH, json={"update_id": 1})
+        self.assertEqual(response.status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
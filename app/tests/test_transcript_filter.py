@@ -0,0 +1,72 @@
+import json
+import os
+import tempfile
+import unittest
+
+from app.service.transcript_filter import TranscriptFilter, load_phrases, normalize
+
+
+class TestTranscriptFilter(unittest.TestCase):
+    def setUp(self):
+        self.filter = TranscriptFilter(load_phrases(None))
+
+    def test_normalize_keeps_accents(self):
+        self.assertEqual(normalize("  ¡Suscríbete,   al CANAL! "), "suscríbete al canal")
+
+    def test_filler_must_be_the_whole_utterance(self):
+        self.assertEqual(self.filter.check("Thank you."), "filler_phrase")
+        self.assertEqual(self.filter.check("Thank you. Thank you!"), "filler_phrase")
+        self.assertEqual(self.filter.check("Thanks for watching, please subscribe"), "filler_phrase")
+        self.assertIsNone(self.filter.check("Thank you for coming to the meeting"))
+        self.assertIsNone(self.filter.check("I want to say thank you"))
+
+    def test_spanish_fillers(self):
+        self.assertEqual(self.filter.check("¡Muchas gracias!", "es"), "filler_phrase")
+        self.assertEqual(self.filter.check("Suscríbete al canal.", "es"), "filler_phrase")
+        self.assertIsNone(self.filter.check("Gracias por la comida, estaba muy rica", "es"))
+
+    def test_language_restricts_patterns(self):
+        self.assertEqual(self.filter.check("gracias"), "filler_phrase")
+        self.assertIsNone(self.filter.check("gracias", "en"))
+        self.assertEqual(self.filter.check("gracias", "fr"), "filler_phrase")
+
+    def test_filler_phrases_can_be_kept(self):
+        # Voice notes and uploads: a deliberate "Gracias" is a message, loops are still rejected
+        self.assertIsNone(self.filter.check("Gracias", "es", filler_phrases=False))
+        self.assertIsNone(self.filter.check("Bye bye!", filler_phrases=False))
+        self.assertEqual(self.filter.check("I'm going to " * 5, filler_phrases=False), "repetitive")
+        self.assertEqual(self.filter.check("", filler_phrases=False), "empty")
+
+    def test_empty_and_short(self):
+        self.assertEqual(self.filter.check(""), "empty")
+        self.assertEqual(self.filter.check(" ... "), "empty")
+        self.assertIsNone(self.filter.check("Hola"))
+        self.assertEqual(self.filter.check("Hola", min_words=2), "too_short")
+        self.assertIsNone(self.filter.check("Hola amigo", min_words=2))
+
+    def test_repetition_loops(self):
+        self.assertEqual(self.filter.check("I'm going to " * 5), "repetitive")
+        self.assertEqual(self.filter.check("la la la la la la la la la la la"), "repetitive")
+        self.assertIsNone(self.filter.check("no no no"))
+        self.assertIsNone(self.filter.check(
+            "We went to the market and then we went to the beach before going home"
+        ))
+
+    def test_phrases_file_extends_defaults(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+            json.dump({"en": ["see you next time"], "fr": ["merci"]}, f)
+        try:
+            phrases = load_phrases(f.name)
+        finally:
+            os.unlink(f.name)
+        custom = TranscriptFilter(phrases)
+        self.assertEqual(custom.check("See you next time!", "en"), "filler_phrase")
+        self.assertEqual(custom.check("Merci.", "fr"), "filler_phrase")
+        self.assertEqual(custom.check("Thank you", "en"), "filler_phrase")
+
+    def test_unreadable_phrases_file_falls_back_to_defaults(self):
+        self.assertEqual(load_phrases("/nonexistent/phrases.json"), load_phrases(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+from app.service.audio_transcription import Transcription, TranscriptionMode, WhisperHandler
+from app.service.transcription_cache import TranscriptionCache, transcription_cache
+
+class TestTranscriptionCache(unittest.TestCase):
+    def test_keys_share_one_entry(self):
+        cache = TranscriptionCache()
+        cache.put(["b2:abc"], Transcription("hola", "es", "openai/whisper-small"))
+        cache.put(["tg:file", "b2:abc"], Transcription("hola", "es", "openai/whisper-small"))
+        cache.set_gender("tg:file", "female")
+
+        self.assertEqual(cache.get("tg:file").language, "es")
+        self.assertEqual(cache.get_entry("b2:abc").gender, "female")
+
+    def test_least_recently_used_key_is_evicted(self):
+        cache = TranscriptionCache(max_entries=2)
+        cache.put(["a"], Transcription("one"))
+        cache.put(["b"], Transcription("two"))
+        cache.get("a")
+        cache.put(["c"], Transcription("three"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").text, "one")
+
+    def test_limit_counts_entries_not_keys(self):
+        cache = TranscriptionCache(max_entries=2)
+        cache.put(["tg:a", "b2:a"], Transcription("one"))
+        cache.put(["tg:b", "b2:b"], Transcription("two"))
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.get("b2:a").text, "one")
+
+        cache.put(["tg:c"], Transcription("three"))
+        # the stale alias tg:a goes along the way, but entry "one" survives through b2:a
+        self.assertEqual((cache.stats()["entries"], cache.stats()["keys"]), (2, 2))
+        self.assertIsNone(cache.get("b2:b"))
+        self.assertEqual(cache.get("b2:a").text, "one")
+
+    def test_expired_entries_miss(self):
+        cache = TranscriptionCache(ttl=0)
+        cache.put(["a"], Transcription("one"))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+class TestHandlerUsesCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        transcription_cache.clear()
+        self.addCleanup(transcription_cache.clear)
+
+    async def test_same_audio_is_transcribed_once(self):
+        handler = WhisperHandler(TranscriptionMode.HF.value, "large")
+        with patch.object(handler.client, "automatic_speech_recognition", AsyncMock(return_value="hello there")) as asr:
+            first = await handler.transcribe(bytearray(b"RIFF" + bytes(100)))
+            second = await handler.transcribe(bytearray(b"RIFF" + bytes(100)))
+
+        self.assertEqual(asr.await_count, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(second.model, "openai/whisper-large-v3-turbo")
+
+    async def test_other_models_do_not_share_results(self):
+        audio = bytearray(b"RIFF" + bytes(100))
+        small = WhisperHandler(TranscriptionMode.HF.value, "small")
+        large = WhisperHandler(TranscriptionMode.HF.value, "large")
+        with patch.object(small.client, "automatic_speech_recognition", AsyncMock(return_value="hello")), \
+                patch.object(large.client, "automatic_speech_recognition", AsyncMock(return_value="hello there")) as asr:
+            await small.transcribe(audio)
+            result = await large.transcribe(audio)
+
+        self.assertEqual(asr.await_count, 1)
+        self.assertEqual(result.model, "openai/whisper-large-v3-turbo")
+        self.assertNotEqual(small.cache_variant(False), large.cache_variant(False))
+
+    async def test_empty_transcriptions_are_not_cached(self):
+        handler = WhisperHandler(TranscriptionMode.HF.value)
+        with patch.object(handler.client, "automatic_speech_recognition", AsyncMock(return_value="")) as asr:
+            await handler.transcribe(bytearray(b"RIFF" + bytes(100)))
+            await handler.transcribe(bytearray(b"RIFF" + bytes(100)))
+
+        self.assertEqual(asr.await_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
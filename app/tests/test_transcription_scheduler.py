@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from app.service.audio_transcription import Transcription
+from app.service.transcription_scheduler import TranscriptionScheduler
+
+class FakeHandler:
+    def __init__(self, delay=0.01, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    async def transcribe_batch(self, items, cache=None):
+        self.batches.append(len(items))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model crashed")
+        return [Transcription(text=bytes(voice_data).decode()) for voice_data, _, _ in items]
+
+    async def transcribe(self, voice_data, detect_language=False, samples=None, cache=True):
+        text = bytes(voice_data).decode()
+        await asyncio.sleep(self.delay * 10 if text == "slow" else self.delay)
+        return Transcription(text=text)
+
+class TestTranscriptionScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_requests_share_a_batch(self):
+        handler = FakeHandler()
+        scheduler = TranscriptionScheduler(handler, max_batch_size=8, max_wait_ms=20, max_concurrent_batches=1)
+
+        texts = await asyncio.gather(*(scheduler.transcribe_voice(bytearray(f"segment {i}".encode())) for i in range(6)))
+
+        self.assertEqual(texts, [f"segment {i}" for i in range(6)])
+        self.assertEqual(handler.batches, [6])
+        self.assertEqual(scheduler.stats()["batch_size_distribution"], {6: 1})
+        await scheduler.close()
+
+    async def test_requests_queue_behind_a_busy_backend(self):
+        handler = FakeHandler(delay=0.05)
+        scheduler = TranscriptionScheduler(handler, max_batch_size=8, max_wait_ms=20, max_concurrent_batches=1)
+
+        first = asyncio.create_task(scheduler.transcribe(bytearray(b"first")))
+        await asyncio.sleep(0.01)
+        rest = await asyncio.gather(*(scheduler.transcribe(bytearray(b"next")) for _ in range(4)))
+
+        self.assertEqual((await first).text, "first")
+        self.assertEqual(len(rest), 4)
+        self.assertEqual(handler.batches, [1, 4])
+        await scheduler.close()
+
+    async def test_batches_are_capped(self):
+        handler = FakeHandler()
+        scheduler = TranscriptionScheduler(handler, max_batch_size=4, max_wait_ms=20, max_concurrent_batches=2)
+
+        await asyncio.gather(*(scheduler.transcribe(bytearray(b"x")) for _ in range(10)))
+
+        self.assertEqual(sum(handler.batches), 10)
+        self.assertLessEqual(max(handler.batches), 4)
+        await scheduler.close()
+
+    async def test_batch_failure_reaches_every_caller(self):
+        scheduler = TranscriptionScheduler(FakeHandler(fail=True), max_wait_ms=5)
+
+        results = await asyncio.gather(
+            scheduler.transcribe(bytearray(b"a")), scheduler.transcribe(bytearray(b"b")), return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        await scheduler.close()
+
+    async def test_close_fails_requests_that_have_not_run(self):
+        handler = FakeHandler(delay=0.05)
+        scheduler = TranscriptionScheduler(handler, max_batch_size=2, max_wait_ms=20, max_concurrent_batches=1)
+
+        running = asyncio.create_task(scheduler.transcribe(bytearray(b"running")))
+        await asyncio.sleep(0.01)
+        # one batch waits for the busy slot, the rest stay queued
+        waiting = [asyncio.create_task(scheduler.transcribe(bytearray(b"waiting"))) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+
+        self.assertEqual((await running).text, "running")
+        results = await asyncio.wait_for(asyncio.gather(*waiting, return_exceptions=True), 1)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(handler.batches, [1])
+
+    async def test_unbatched_requests_finish_independently(self):
+        handler = FakeHandler(delay=0.02)
+        scheduler = TranscriptionScheduler(handler, max_batch_size=2, max_concurrent_batches=1, batching=False)
+
+        slow = asyncio.create_task(scheduler.transcribe(bytearray(b"slow")))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        fast = await asyncio.gather(*(scheduler.transcribe(bytearray(b"fast")) for _ in range(8)))
+
+        self.assertLess(loop.time() - started, 0.1)
+        self.assertEqual({result.text for result in fast}, {"fast"})
+        self.assertFalse(slow.done())
+        self.assertEqual((await slow).text, "slow")
+        self.assertEqual(handler.batches, [])
+        await scheduler.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import routes
+from app.service.translation_jobs import (
+    DONE,
+    FAILED,
+    INPUT_FILE,
+    QUEUED,
+    RUNNING,
+    Job,
+    JobManager,
+    JobQueueFull,
+    JobTooLarge,
+)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+class Processor:
+    """Upper-cases the upload; release gates completion, fail raises"""
+
+    def __init__(self, release=None, fail=False):
+        self.release = release
+        self.fail = fail
+        self.seen = []
+
+    async def __call__(self, job, audio, report):
+        self.seen.append(job.id)
+        report("transcribing", 0.3)
+        if self.release is not None:
+            await self.release.wait()
+        if self.fail:
+            raise ValueError("boom")
+        return {"text": audio.decode().upper()}, audio[::-1]
+
+
+class TestJobManager(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def manager(self, processor, **kwargs):
+        return JobManager(processor, directory=self.directory, **kwargs)
+
+    async def wait_for(self, manager, job_id, status):
+        for _ in range(200):
+            if manager.get(job_id).status == status:
+                return manager.get(job_id)
+            await asyncio.sleep(0.01)
+        self.fail(f"job never reached {status}")
+
+    async def test_job_runs_and_keeps_result_on_disk(self):
+        manager = self.manager(Processor())
+        job = await manager.submit(chunks(b"he", b"llo"), {"language": "es"})
+        self.assertEqual(job.input_bytes, 5)
+        job = await self.wait_for(manager, job.id, DONE)
+        await manager.stop()
+
+        self.assertEqual(job.result, {"text": "HELLO"})
+        with open(manager.audio_path(job), "rb") as f:
+            self.assertEqual(f.read(), b"olleh")
+        self.assertFalse(os.path.exists(os.path.join(self.directory, job.id, "input")))
+        self.assertIsNotNone(job.expires)
+
+        reloaded = self.manager(Processor())
+        await reloaded.start()
+        self.assertEqual(reloaded.get(job.id).result, {"text": "HELLO"})
+        await reloaded.stop()
+
+    async def test_failed_job_records_error(self):
+        manager = self.manager(Processor(fail=True))
+        job = await manager.submit(chunks(b"x"))
+        job = await self.wait_for(manager, job.id, FAILED)
+        await manager.stop()
+        self.assertEqual(job.error, "boom")
+        self.assertIsNone(manager.audio_path(job))
+        self.assertEqual(manager.stats()["failed"], 1)
+
+    async def test_worker_pool_is_bounded(self):
+        release = asyncio.Event()
+        processor = Processor(release=release)
+        manager = self.manager(processor, workers=2)
+        jobs = [await manager.submit(chunks(b"a")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(processor.seen), 2)
+        self.assertEqual(manager.stats()["jobs"]["queued"], 1)
+        release.set()
+        for job in jobs:
+            await self.wait_for(manager, job.id, DONE)
+        await manager.stop()
+
+    async def test_rejects_when_queue_is_full_or_upload_too_large(self):
+        manager = self.manager(Processor(release=asyncio.Event()), workers=1, max_queued=1, max_upload_bytes=4)
+        await manager.submit(chunks(b"a"))
+        await asyncio.sleep(0.01)
+        await manager.submit(chunks(b"b"))
+        with self.assertRaises(JobQueueFull):
+            await manager.submit(chunks(b"c"))
+        await manager.stop()
+
+        manager = self.manager(Processor(), max_upload_bytes=4)
+        with self.assertRaises(JobTooLarge):
+            await manager.submit(chunks(b"abc", b"de"))
+        await manager.stop()
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+
+    async def test_unfinished_jobs_resume_after_restart(self):
+        manager = self.manager(Processor(release=asyncio.Event()), workers=1)
+        running = await manager.submit(chunks(b"one"))
+        queued = await manager.submit(chunks(b"two"))
+        await asyncio.sleep(0.01)
+        await manager.stop()
+        self.assertEqual(manager.get(queued.id).status, QUEUED)
+
+        processor = Processor()
+        resumed = self.manager(processor, workers=1)
+        await resumed.start()
+        self.assertEqual((await self.wait_for(resumed, queued.id, DONE)).result, {"text": "TWO"})
+        # a run cut short by shutdown isn't held against the job
+        self.assertEqual((await self.wait_for(resumed, running.id, DONE)).attempts, 1)
+        self.assertEqual(processor.seen, [running.id, queued.id])
+        await resumed.stop()
+
+    async def test_jobs_that_keep_crashing_the_process_are_failed(self):
+        # what a crash mid-run leaves on disk: still running, without the shutdown bookkeeping
+        manager = self.manager(Processor(), workers=1, max_attempts=2)
+        job = Job(id="crashed", status=RUNNING, attempts=2)
+        os.makedirs(os.path.join(self.directory, job.id))
+        with open(os.path.join(self.directory, job.id, INPUT_FILE), "wb") as f:
+            f.write(b"one")
+        manager._save(job)
+
+        await manager.start()
+        failed = manager.get(job.id)
+        self.assertEqual((failed.status, failed.error), (FAILED, "Gave up after 2 interrupted attempts"))
+        await asyncio.sleep(0.01)
+        self.assertEqual(manager.processor.seen, [])
+        await manager.stop()
+
+    async def test_finished_jobs_expire(self):
+        manager = self.manager(Processor(), ttl=0.05)
+        job = await manager.submit(chunks(b"x"))
+        await self.wait_for(manager, job.id, DONE)
+        # the background sweeper runs every ttl seconds here
+        await asyncio.sleep(0.15)
+        self.assertEqual(manager.stats()["jobs"]["done"], 0)
+        self.assertIsNone(manager.get(job.id))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, job.id)))
+        await manager.stop()
+
+    async def test_watch_follows_progress_until_done(self):
+        release = asyncio.Event()
+        manager = self.manager(Processor(release=release))
+        job = await manager.submit(chunks(b"x"))
+        await asyncio.sleep(0.01)
+
+        async def collect():
+            return [snapshot async for snapshot in manager.watch(job.id, heartbeat=0.02)]
+
+        watcher = asyncio.create_task(collect())
+        await asyncio.sleep(0.05)
+        release.set()
+        snapshots = await asyncio.wait_for(watcher, 1)
+        await manager.stop()
+
+        self.assertEqual(snapshots[0]["stage"], "transcribing")
+        self.assertIn(None, snapshots)
+        self.assertEqual(snapshots[-1]["status"], DONE)
+        self.assertEqual(snapshots[-1]["result"], {"text": "X"})
+
+
+class TestJobRoutes(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manager = JobManager(Processor(), directory=self.directory)
+        self.patch = patch.object(routes, "job_manager", self.manager)
+        self.patch.start()
+        app = FastAPI()
+        app.include_router(routes.router)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.patch.stop()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_submit_poll_and_stream(self):
+        with self.client:
+            response = self.client.post("/api/v1/translate/audio/jobs", files={"audio_data": ("a.ogg", b"hola")})
+            self.assertEqual(response.status_code, 202)
+            job_id = response.json()["id"]
+
+            with self.client.stream("GET", f"/api/v1/jobs/{job_id}/events") as events:
+                body = "".join(events.iter_text())
+            self.assertIn("event: done", body)
+
+            job = self.client.get(f"/api/v1/jobs/{job_id}").json()
+            self.assertEqual(job["result"], {"text": "HOLA"})
+            self.assertEqual(self.client.get(job["audio_url"]).content, b"aloh")
+            self.assertEqual(self.client.get("/api/v1/jobs/unknown").status_code, 404)
+
+    def test_upload_too_large(self):
+        self.manager.max_upload_bytes = 2
+        response = self.client.post("/api/v1/translate/audio/jobs", files={"audio_data": ("a.ogg", b"hola")})
+        self.assertEqual(response.status_code, 413)
+
+
+    def test_routes_reachable_through_main_app(self):
+        # The Angular catch-all in main must not shadow the API's GET routes
+        from app import main
+        client = TestClient(main.fastapi_app)
+        response = client.post("/api/v1/translate/audio/jobs", files={"audio_data": ("a.ogg", b"hola")})
+        self.assertEqual(response.status_code, 202)
+        job = client.get(response.json()["status_url"])
+        self.assertEqual(job.status_code, 200)
+        self.assertEqual(job.json()["id"], response.json()["id"])
+        self.assertEqual(client.get("/api/v1/jobs").status_code, 200)
+        self.assertEqual(client.get("/api/v1/transcription/stats").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
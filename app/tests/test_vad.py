@@ -0,0 +1,74 @@
+import unittest
+import numpy as np
+from app.service.vad import FrameVAD
+
+SR = 16000
+
+def voice(seconds, amp=0.1, f0=140):
+    """Harmonic, pitch- and amplitude-modulated tone standing in for voiced speech."""
+    t = np.arange(int(seconds * SR)) / SR
+    phase = 2 * np.pi * f0 * (t + 0.02 * np.sin(2 * np.pi * 3 * t))
+    wave = sum(np.sin(k * phase) / k for k in range(1, 20))
+    return amp * wave / np.abs(wave).max() * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2)
+
+def to_pcm(signal):
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+
+class TestFrameVAD(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(0)
+
+    def noise(self, seconds, amp):
+        return amp * self.rng.standard_normal(int(seconds * SR))
+
+    def run_vad(self, signal, chunk_bytes=8192):
+        vad = FrameVAD(sample_rate=SR, frame_ms=20, snr_db=6, onset_ms=60, hangover_ms=450)
+        pcm = to_pcm(signal)
+        flags = np.concatenate([vad.process(pcm[i:i + chunk_bytes]) for i in range(0, len(pcm), chunk_bytes)])
+        return vad, flags
+
+    def test_detects_speech_with_hangover(self):
+        signal = np.concatenate([self.noise(2, 0.003), voice(2) + self.noise(2, 0.003), self.noise(2, 0.003)])
+        _, flags = self.run_vad(signal)
+        self.assertFalse(flags[:95].any())  # 2s of background
+        self.assertTrue(flags[105:195].all())
+        # Stays open through the 450ms hangover, then closes
+        self.assertTrue(flags[200:215].all())
+        self.assertFalse(flags[230:].any())
+
+    def test_quiet_speaker_is_not_cut_off(self):
+        signal = np.concatenate([self.noise(2, 0.003), voice(3, amp=0.015) + self.noise(3, 0.003), self.noise(1, 0.003)])
+        _, flags = self.run_vad(signal)
+        self.assertGreater(flags[100:250].mean(), 0.95)
+
+    def test_noise_is_not_speech(self):
+        cases = {
+            "step": np.concatenate([self.noise(2, 0.003), self.noise(2, 0.05), self.noise(2, 0.003)]),
+            "click": np.concatenate([self.noise(2, 0.003), self.noise(0.05, 0.3), self.noise(2, 0.003)]),
+        }
+        for name, signal in cases.items():
+            with self.subTest(name):
+                _, flags = self.run_vad(signal)
+                self.assertFalse(flags.any())
+
+    def test_noise_floor_adapts(self):
+        vad, flags = self.run_vad(np.concatenate([self.noise(1, 0.02), voice(2) + self.noise(2, 0.02), self.noise(2, 0.02)]))
+        self.assertAlmostEqual(vad.noise_floor_db, 20 * np.log10(0.02), delta=6)
+        self.assertFalse(flags[:50].any())
+        self.assertGreater(flags[55:150].mean(), 0.95)
+
+    def test_chunking_does_not_change_decisions(self):
+        signal = np.concatenate([self.noise(1, 0.003), voice(1) + self.noise(1, 0.003), self.noise(1, 0.003)])
+        _, whole = self.run_vad(signal, chunk_bytes=len(signal) * 2)
+        _, odd = self.run_vad(signal, chunk_bytes=1001)
+        self.assertEqual(len(whole), len(odd))
+        # The noise floor is updated per chunk, so allow a frame or two of difference at the edges
+        self.assertLessEqual(np.sum(whole != odd), 2)
+
+    def test_is_speech_needs_a_full_frame(self):
+        vad = FrameVAD(sample_rate=SR, frame_ms=20)
+        self.assertIsNone(vad.is_speech(b"\x00" * 100))
+        self.assertFalse(vad.is_speech(to_pcm(self.noise(0.5, 0.003))))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import asyncio
+import time
+import unittest
+
+from app.service.warmup import WarmUp, default_steps
+
+
+class TestWarmUp(unittest.IsolatedAsyncioTestCase):
+    async def test_steps_run_concurrently_with_timings(self):
+        async def slow():
+            await asyncio.sleep(0.05)
+
+        async def skipped():
+            return "not configured"
+
+        async def broken():
+            raise RuntimeError("no credentials")
+
+        warmup = WarmUp({"a": slow, "b": slow, "skip": skipped, "broken": broken, "off": slow},
+                        enabled=["a", "b", "skip", "broken"])
+        started = time.perf_counter()
+        results = await warmup.run()
+
+        self.assertLess(time.perf_counter() - started, 0.09)
+        self.assertTrue(warmup.done)
+        self.assertEqual(set(results), {"a", "b", "skip", "broken"})
+        self.assertEqual(results["a"]["status"], "ok")
+        self.assertGreaterEqual(results["a"]["ms"], 50)
+        self.assertEqual((results["skip"]["status"], results["skip"]["note"]), ("skipped", "not configured"))
+        self.assertEqual((results["broken"]["status"], results["broken"]["error"]), ("failed", "no credentials"))
+
+    async def test_timeout_still_finishes(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        warmup = WarmUp({"hang": hang}, enabled=["hang"], timeout=0.05)
+        results = await asyncio.wait_for(warmup.run(), 1)
+        self.assertTrue(warmup.done)
+        self.assertEqual(results["hang"]["status"], "timed_out")
+
+    async def test_local_steps(self):
+        steps = ["langdetect", "dsp", "gender", "whisper_local"]
+        results = await WarmUp(default_steps(), enabled=steps).run()
+        self.assertEqual([results[step]["status"] for step in steps], ["ok", "ok", "ok", "skipped"])
+
+
+if __name__ == '__main__':
+    unittest.main()